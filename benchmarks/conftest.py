@@ -0,0 +1,43 @@
+"""
+PyTest configuration for the benchmarks.
+
+Run the benchmarks with "pytest benchmarks". They are not collected by the unit test run.
+
+This file was created on October 17, 2026
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from param_persist.sqlalchemy.models import Base
+
+
+@pytest.fixture()
+def file_engine(tmp_path):
+    """
+    Create an engine for a file based SQLite database.
+    """
+    engine = create_engine(f'sqlite:///{tmp_path / "benchmark.db"}', echo=False)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def memory_engine():
+    """
+    Create an engine for an in-memory SQLite database, shared by all the connections of the engine.
+    """
+    engine = create_engine('sqlite://', echo=False, poolclass=StaticPool,
+                           connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(params=['file', 'memory'])
+def engine(request):
+    """
+    Create an engine for a file based or an in-memory SQLite database.
+    """
+    return request.getfixturevalue(f'{request.param}_engine')
@@ -0,0 +1,24 @@
+"""
+Helpers shared by the benchmarks.
+
+This file was created on October 17, 2026
+"""
+
+
+def populate(agent, instance, count, batch_size=10000):
+    """
+    Save copies of a parameterized instance to the database of an agent.
+
+    Args:
+        agent: The agent to save the copies with.
+        instance: The parameterized instance to save.
+        count: The number of copies to save.
+        batch_size: The number of copies to save per transaction.
+
+    Returns:
+        The list of the ids of the saved copies.
+    """
+    instance_ids = list()
+    for start in range(0, count, batch_size):
+        instance_ids.extend(agent.save_many([instance] * min(batch_size, count - start)))
+    return instance_ids
@@ -0,0 +1,54 @@
+"""
+Parameterized classes used by the benchmarks.
+
+This file was created on October 17, 2026
+"""
+import numpy
+import param
+
+
+class BenchmarkParam(param.Parameterized):
+    """
+    A param class with a handful of scalar parameters.
+    """
+    number_field_1 = param.Number(0.5)
+    number_field_2 = param.Number(1.5)
+    integer_field_1 = param.Integer(1)
+    integer_field_2 = param.Integer(2)
+    string_field_1 = param.String("My String")
+    string_field_2 = param.String("My Other String")
+    bool_field_1 = param.Boolean(False)
+    bool_field_2 = param.Boolean(True)
+    list_field = param.List([1, 2, 3])
+    dict_field = param.Dict({'key': 'value'})
+
+
+class ArrayBenchmarkParam(param.Parameterized):
+    """
+    A param class with a numpy array parameter, for values from a few bytes to many megabytes.
+    """
+    array_field = param.Array(numpy.zeros(1))
+
+
+def make_wide_param_class(param_count):
+    """
+    Create a param class with the given number of number parameters, named "number_field_<i>".
+
+    Args:
+        param_count: The number of parameters of the class.
+
+    Returns:
+        The param class, named "WideBenchmarkParam<param_count>".
+    """
+    name = f'WideBenchmarkParam{param_count}'
+    namespace = {f'number_field_{i}': param.Number(float(i)) for i in range(param_count)}
+    namespace.update({'__module__': __name__, '__qualname__': name,
+                      '__doc__': f'A param class with {param_count} number parameters.'})
+    return type(param.Parameterized)(name, (param.Parameterized,), namespace)
+
+
+# The classes are module attributes so that the agents can import them by class path when loading
+WideBenchmarkParam10 = make_wide_param_class(10)
+WideBenchmarkParam100 = make_wide_param_class(100)
+WideBenchmarkParam1000 = make_wide_param_class(1000)
+WIDE_PARAM_CLASSES = {10: WideBenchmarkParam10, 100: WideBenchmarkParam100, 1000: WideBenchmarkParam1000}
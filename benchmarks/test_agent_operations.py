@@ -0,0 +1,204 @@
+"""
+Benchmarks of the save, load, update and delete hot paths of the agent against file based and in-memory SQLite.
+
+The operations are measured against the number of params per instance, the size of the param values, the size of
+the params table and the batch size of save_many. Store the results of a commit with
+
+    pytest benchmarks/test_agent_operations.py --benchmark-autosave
+
+and compare a later run against them with "--benchmark-compare" to find regressions, e.g. with
+"--benchmark-compare-fail=mean:10%" to fail when an operation is more than ten percent slower.
+
+This file was created on October 17, 2026
+"""
+import random
+
+from benchmarks.helpers import populate
+from benchmarks.params import ArrayBenchmarkParam, BenchmarkParam, WIDE_PARAM_CLASSES
+import numpy
+import pytest
+from sqlalchemy import create_engine
+
+from param_persist.agents.codecs import default_codecs
+from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
+from param_persist.sqlalchemy.models import Base
+
+PARAM_COUNTS = sorted(WIDE_PARAM_CLASSES)
+# Number of float64 values of the arrays, from a scalar to 10 MB
+ARRAY_SIZES = [1, 1280, 128 * 1024, 1280 * 1024]
+# Number of rows of the params table, with one row per param of each instance
+TABLE_SIZES = [1000, 100000, 1000000]
+BATCH_SIZES = [None, 10, 100, 1000]
+BATCH_COUNT = 1000
+CODECS = [pytest.param(False, id='json'), pytest.param(True, id='codecs')]
+
+
+def make_wide_instance(param_count):
+    """
+    Create an instance of the param class with the given number of params.
+    """
+    return WIDE_PARAM_CLASSES[param_count]()
+
+
+@pytest.mark.parametrize('param_count', PARAM_COUNTS)
+def test_save(benchmark, engine, param_count):
+    """
+    Benchmark saving one instance.
+    """
+    agent = SqlAlchemyAgent(engine)
+    instance = make_wide_instance(param_count)
+
+    result = benchmark(lambda: agent.save(instance))
+
+    assert isinstance(result, str)
+
+
+@pytest.mark.parametrize('param_count', PARAM_COUNTS)
+def test_load(benchmark, engine, param_count):
+    """
+    Benchmark loading one instance.
+    """
+    agent = SqlAlchemyAgent(engine)
+    instance_id = agent.save(make_wide_instance(param_count))
+
+    result = benchmark(lambda: agent.load(instance_id))
+
+    assert isinstance(result, WIDE_PARAM_CLASSES[param_count])
+
+
+@pytest.mark.parametrize('param_count', PARAM_COUNTS)
+def test_update(benchmark, engine, param_count):
+    """
+    Benchmark updating one instance with one changed param.
+    """
+    agent = SqlAlchemyAgent(engine)
+    instance = make_wide_instance(param_count)
+    instance_id = agent.save(instance)
+
+    def update():
+        instance.number_field_0 += 1
+        return agent.update(instance, instance_id)
+
+    result = benchmark(update)
+
+    assert result == instance_id
+
+
+@pytest.mark.parametrize('param_count', PARAM_COUNTS)
+def test_delete(benchmark, engine, param_count):
+    """
+    Benchmark deleting one instance, saving a new one before each round.
+    """
+    agent = SqlAlchemyAgent(engine)
+    instance = make_wide_instance(param_count)
+
+    def setup():
+        return (agent.save(instance),), dict()
+
+    benchmark.pedantic(agent.delete, setup=setup, rounds=50)
+
+
+@pytest.mark.parametrize('use_codecs', CODECS)
+@pytest.mark.parametrize('array_size', ARRAY_SIZES)
+def test_save_array(benchmark, engine, array_size, use_codecs):
+    """
+    Benchmark saving one instance with an array of the given number of float64 values.
+    """
+    agent = SqlAlchemyAgent(engine, codecs=default_codecs() if use_codecs else None)
+    instance = ArrayBenchmarkParam(array_field=numpy.random.default_rng(0).random(array_size))
+
+    result = benchmark.pedantic(agent.save, args=(instance,), rounds=10)
+
+    assert isinstance(result, str)
+
+
+@pytest.mark.parametrize('use_codecs', CODECS)
+@pytest.mark.parametrize('array_size', ARRAY_SIZES)
+def test_load_array(benchmark, engine, array_size, use_codecs):
+    """
+    Benchmark loading one instance with an array of the given number of float64 values.
+    """
+    agent = SqlAlchemyAgent(engine, codecs=default_codecs() if use_codecs else None)
+    instance_id = agent.save(ArrayBenchmarkParam(array_field=numpy.random.default_rng(0).random(array_size)))
+
+    result = benchmark.pedantic(agent.load, args=(instance_id,), rounds=10)
+
+    assert result.array_field.shape == (array_size,)
+
+
+@pytest.mark.parametrize('batch_size', BATCH_SIZES, ids=lambda x: f'batch_{x or "all"}')
+def test_save_many(benchmark, engine, batch_size):
+    """
+    Benchmark saving a batch of instances with the given number of rows per insert statement.
+    """
+    agent = SqlAlchemyAgent(engine)
+    instances = [BenchmarkParam(integer_field_1=x) for x in range(BATCH_COUNT)]
+
+    result = benchmark.pedantic(agent.save_many, args=(instances,), kwargs={'batch_size': batch_size}, rounds=5)
+
+    assert len(result) == BATCH_COUNT
+
+
+@pytest.mark.parametrize('batch_size', BATCH_SIZES, ids=lambda x: f'batch_{x or "all"}')
+def test_load_many(benchmark, engine, batch_size):
+    """
+    Benchmark loading a batch of instances with the given number of ids per query.
+    """
+    agent = SqlAlchemyAgent(engine)
+    instance_ids = agent.save_many([BenchmarkParam(integer_field_1=x) for x in range(BATCH_COUNT)])
+
+    result = benchmark.pedantic(agent.load_many, args=(instance_ids,), kwargs={'batch_size': batch_size}, rounds=5)
+
+    assert len(result) == BATCH_COUNT
+
+
+@pytest.fixture(scope='module', params=TABLE_SIZES, ids=lambda x: f'{x}_rows')
+def populated_agent(request, tmp_path_factory):
+    """
+    Create an agent for a file based SQLite database with a params table of the given number of rows.
+
+    The database is shared by the benchmarks of a table size, since filling the largest one takes a while.
+    """
+    engine = create_engine(f'sqlite:///{tmp_path_factory.mktemp("table") / "benchmark.db"}', echo=False)
+    Base.metadata.create_all(engine)
+    agent = SqlAlchemyAgent(engine)
+    agent.instance_ids = populate(agent, BenchmarkParam(), request.param // len(BenchmarkParam.param.objects()) + 1)
+    yield agent
+    engine.dispose()
+
+
+def test_load_by_table_size(benchmark, populated_agent):
+    """
+    Benchmark loading a random instance from a params table of the given number of rows.
+    """
+    random_ids = random.Random(0)
+
+    result = benchmark(lambda: populated_agent.load(random_ids.choice(populated_agent.instance_ids)))
+
+    assert isinstance(result, BenchmarkParam)
+
+
+def test_update_by_table_size(benchmark, populated_agent):
+    """
+    Benchmark updating a random instance in a params table of the given number of rows.
+    """
+    random_ids = random.Random(0)
+    instance = BenchmarkParam()
+
+    def update():
+        instance.integer_field_1 += 1
+        return populated_agent.update(instance, random_ids.choice(populated_agent.instance_ids))
+
+    result = benchmark(update)
+
+    assert isinstance(result, str)
+
+
+def test_delete_by_table_size(benchmark, populated_agent):
+    """
+    Benchmark deleting an instance from a params table of the given number of rows, saving it before each round.
+    """
+    def setup():
+        return (populated_agent.save(BenchmarkParam()),), dict()
+
+    benchmark.pedantic(populated_agent.delete, setup=setup, rounds=50)
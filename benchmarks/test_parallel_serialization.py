@@ -0,0 +1,57 @@
+"""
+Benchmarks of saving and loading large batches with the serialization spread over the workers of a process pool.
+
+Compare the scaling with the number of workers with
+"pytest benchmarks/test_parallel_serialization.py --benchmark-group-by=func".
+
+This file was created on October 17, 2026
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from benchmarks.params import BenchmarkParam
+import pytest
+
+from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
+
+COUNT = 5000
+WORKERS = sorted({1, 2, 4, os.cpu_count() or 1})
+
+
+@pytest.fixture(params=[None] + WORKERS, ids=lambda x: 'serial' if x is None else f'{x}_workers')
+def executor(request):
+    """
+    Create a process pool with the given number of workers, or None to serialize in the calling process.
+    """
+    if request.param is None:
+        yield None
+        return
+
+    with ProcessPoolExecutor(max_workers=request.param) as executor:
+        # Start the workers before the benchmark runs
+        list(executor.map(abs, range(request.param)))
+        yield executor
+
+
+def test_save_many(benchmark, file_engine, executor):
+    """
+    Benchmark saving a large batch of instances.
+    """
+    agent = SqlAlchemyAgent(file_engine)
+    instances = [BenchmarkParam(integer_field_1=x) for x in range(COUNT)]
+
+    instance_ids = benchmark.pedantic(agent.save_many, args=(instances,), kwargs={'executor': executor}, rounds=3)
+
+    assert len(instance_ids) == COUNT
+
+
+def test_load_many(benchmark, file_engine, executor):
+    """
+    Benchmark loading a large batch of instances.
+    """
+    agent = SqlAlchemyAgent(file_engine)
+    instance_ids = agent.save_many([BenchmarkParam(integer_field_1=x) for x in range(COUNT)])
+
+    instances = benchmark.pedantic(agent.load_many, args=(instance_ids,), kwargs={'executor': executor}, rounds=3)
+
+    assert instances[instance_ids[-1]].integer_field_1 == COUNT - 1
@@ -0,0 +1,100 @@
+"""
+Micro-benchmarks of the param serialization with and without the JSON string round-trip.
+
+Compare the results with "pytest benchmarks/test_serialization.py --benchmark-group-by=func,param:payload".
+
+This file was created on October 17, 2026
+"""
+import json
+
+import param
+from param.serializer import JSONSerialization
+import pytest
+
+from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
+
+SIZE = 100000
+
+
+def make_list_instance():
+    """
+    Make an instance with a large list param.
+    """
+    class ListParam(param.Parameterized):
+        value = param.List()
+
+    return ListParam(value=list(range(SIZE)))
+
+
+def make_array_instance():
+    """
+    Make an instance with a large array param.
+    """
+    np = pytest.importorskip('numpy')
+
+    class ArrayParam(param.Parameterized):
+        value = param.Array()
+
+    return ArrayParam(value=np.arange(SIZE, dtype=float))
+
+
+def make_dataframe_instance():
+    """
+    Make an instance with a large DataFrame param.
+    """
+    np = pytest.importorskip('numpy')
+    pd = pytest.importorskip('pandas')
+
+    class DataFrameParam(param.Parameterized):
+        value = param.DataFrame()
+
+    return DataFrameParam(value=pd.DataFrame({'x': np.arange(SIZE // 10), 'y': np.arange(SIZE // 10, dtype=float)}))
+
+
+PAYLOADS = [
+    pytest.param(make_list_instance, id='list'),
+    pytest.param(make_array_instance, id='array'),
+    pytest.param(make_dataframe_instance, id='dataframe'),
+]
+ROUND_TRIP = [pytest.param(True, id='json_round_trip'), pytest.param(False, id='dict')]
+
+
+@pytest.mark.parametrize('round_trip', ROUND_TRIP)
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_serialize(benchmark, payload, round_trip):
+    """
+    Benchmark serializing the params of an instance into JSON compatible values.
+    """
+    agent = SqlAlchemyAgent(None)
+    instance = payload()
+
+    if round_trip:
+        result = benchmark(lambda: json.loads(JSONSerialization.serialize_parameters(instance)))
+    else:
+        result = benchmark(lambda: agent.get_serialized_param(instance))
+
+    assert 'value' in result
+
+
+@pytest.mark.parametrize('round_trip', ROUND_TRIP)
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_deserialize(benchmark, payload, round_trip):
+    """
+    Benchmark deserializing JSON compatible values into the params of an instance.
+    """
+    agent = SqlAlchemyAgent(None)
+    instance = payload()
+    serialized_data = agent.get_serialized_param(instance)
+    serialized_data.pop('name')
+
+    if round_trip:
+        def deserialize():
+            values = JSONSerialization.deserialize_parameters(instance, json.dumps(serialized_data))
+            for key, value in values.items():
+                setattr(instance, key, value)
+            return instance
+        result = benchmark(deserialize)
+    else:
+        result = benchmark(lambda: agent.update_param_object(instance, serialized_data))
+
+    assert result is instance
@@ -0,0 +1,61 @@
+"""
+Benchmark of save and load with one row per param against a single document per instance.
+
+Compare the results with "pytest benchmarks/test_storage_layout.py --benchmark-group-by=func".
+
+This file was created on October 17, 2026
+"""
+from benchmarks.params import BenchmarkParam
+import pytest
+
+from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
+
+STORAGES = [
+    pytest.param({'storage': 'params'}, id='params'),
+    pytest.param({'storage': 'document'}, id='document'),
+    pytest.param({'storage': 'document', 'compress': True}, id='document_compressed'),
+]
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_save(benchmark, file_engine, storage):
+    """
+    Benchmark saving one instance.
+    """
+    agent = SqlAlchemyAgent(file_engine, **storage)
+    instance = BenchmarkParam()
+
+    result = benchmark(lambda: agent.save(instance))
+
+    assert isinstance(result, str)
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_load(benchmark, file_engine, storage):
+    """
+    Benchmark loading one instance.
+    """
+    agent = SqlAlchemyAgent(file_engine, **storage)
+    instance_id = agent.save(BenchmarkParam())
+
+    result = benchmark(lambda: agent.load(instance_id))
+
+    assert isinstance(result, BenchmarkParam)
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_update(benchmark, file_engine, storage):
+    """
+    Benchmark updating one instance with a changed param.
+    """
+    agent = SqlAlchemyAgent(file_engine, **storage)
+    instance = BenchmarkParam()
+    instance_id = agent.save(instance)
+
+    def update():
+        instance.integer_field_1 += 1
+        return agent.update(instance, instance_id)
+
+    result = benchmark(update)
+
+    assert result == instance_id
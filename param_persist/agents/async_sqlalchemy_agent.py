@@ -0,0 +1,281 @@
+"""
+The asyncio SqlAlchemy Agent.
+
+This file was created on October 17, 2026
+"""
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from param_persist.agents.sqlalchemy_agent import get_instance_rows_statement, SqlAlchemyAgent, SqlAlchemyTransaction
+
+
+class AsyncSqlAlchemyAgent(SqlAlchemyAgent):
+    """
+    An agent for persisting parameterized objects to SQL databases with a sqlalchemy AsyncEngine.
+
+    The functions of the agent are coroutines. Each one runs the matching SqlAlchemyAgent function on the sync session
+    of a new AsyncSession, so both agents share the same serialization and storage logic.
+    """
+
+    def __init__(self, engine, **kwargs):
+        """
+        The __init__ function for the the AsyncSqlAlchemyAgent.
+
+        Args:
+            engine: the AsyncEngine to use for persisting, e.g. from create_async_engine('sqlite+aiosqlite://').
+            kwargs: The options of the agent, as for SqlAlchemyAgent, e.g. "storage", "cache" or "track_changes".
+        """
+        super().__init__(engine, **kwargs)
+        self.make_session = sessionmaker(bind=self.engine, class_=AsyncSession)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run many agent functions as one unit of work that uses a single session and commits once at the end.
+
+        Everything done in the transaction is rolled back if an exception is raised in it. Example:
+
+            async with agent.transaction() as tx:
+                instance_id = await tx.save(instance)
+                await tx.update(other_instance, other_id)
+
+        Yields:
+            The SqlAlchemyTransaction to await the agent functions on.
+        """
+        async with self.make_session() as db_session:
+            self.start_transaction(db_session.sync_session)
+
+            try:
+                yield SqlAlchemyTransaction(self, db_session)
+                await db_session.commit()
+                self.end_transaction(db_session.sync_session, committed=True)
+            except Exception:
+                await db_session.rollback()
+                self.end_transaction(db_session.sync_session, committed=False)
+                raise
+
+    async def run_sync(self, function, *args, db_session=None, **kwargs):
+        """
+        Run a SqlAlchemyAgent function on the sync session of an AsyncSession.
+
+        Args:
+            function: The SqlAlchemyAgent function to run.
+            args: The positional arguments of the function.
+            db_session: The AsyncSession to run the function on. Defaults to a new one that is closed afterwards.
+            kwargs: The keyword arguments of the function.
+
+        Returns:
+            The return value of the function.
+        """
+        if db_session is not None:
+            return await db_session.run_sync(
+                lambda sync_session: function(self, *args, db_session=sync_session, **kwargs)
+            )
+
+        async with self.make_session() as db_session:
+            return await db_session.run_sync(
+                lambda sync_session: function(self, *args, db_session=sync_session, **kwargs)
+            )
+
+    async def save(self, instance, **kwargs):
+        """
+        Save a parameterized instance to a sqlalchemy database.
+
+        Args:
+            instance: The parameterized instance to be saved to the database.
+
+        Returns:
+            The id of the row in the database corresponding to the parameterized instance.
+        """
+        return await self.run_sync(SqlAlchemyAgent.save, instance, **kwargs)
+
+    async def save_many(self, instances, batch_size=None, **kwargs):
+        """
+        Save many parameterized instances to a sqlalchemy database in a single transaction.
+
+        Args:
+            instances: An iterable of parameterized instances to be saved to the database.
+            batch_size: The maximum number of rows to send in a single insert statement. Defaults to all of them.
+
+        Returns:
+            A list of the ids of the rows in the database, in the same order as the given instances.
+        """
+        return await self.run_sync(SqlAlchemyAgent.save_many, instances, batch_size=batch_size, **kwargs)
+
+    async def save_or_update(self, instance, instance_id=None, **kwargs):
+        """
+        Save a parameterized instance with the given id, replacing the instance saved with that id if there is one.
+
+        Args:
+            instance: The parameterized instance to save.
+            instance_id: The id to save the instance with, at most 36 characters. Defaults to a new uuid.
+
+        Returns:
+            The id of the instance.
+        """
+        return await self.run_sync(SqlAlchemyAgent.save_or_update, instance, instance_id, **kwargs)
+
+    async def load(self, instance_id, params=None, **kwargs):
+        """
+        Load a parameterized instance from the database.
+
+        Lazy params are not supported, since accessing a param cannot await its query.
+
+        Args:
+            instance_id: The id corresponding to the row in the database for the parameterized instance to load.
+            params: The names of the params to load. With "params" storage, accessing the other params raises a
+                RuntimeError, so does updating the instance unless the agent tracks changes and they were not
+                changed. Defaults to all of them.
+
+        Returns:
+            The parameterized instance populated from the database.
+        """
+        if kwargs.get('lazy_params', None):
+            raise ValueError('Lazy params are not supported by the AsyncSqlAlchemyAgent.')
+
+        return await self.run_sync(SqlAlchemyAgent.load, instance_id, params=params, **kwargs)
+
+    def load_serialized_params(self, instance_id, param_names, **kwargs):
+        """
+        Refuse to load params that were not selected by a load, since accessing a param cannot await its query.
+
+        Raises:
+            RuntimeError: Always.
+        """
+        raise RuntimeError(f'Params {sorted(param_names)} of instance "{instance_id}" were not loaded. Select them '
+                           f'with the "params" of load.')
+
+    async def load_many(self, instance_ids, batch_size=None, **kwargs):
+        """
+        Load many parameterized instances from the database using one query for the instances and one for the params.
+
+        Args:
+            instance_ids: An iterable of the ids of the parameterized instances to load.
+            batch_size: The maximum number of ids to put in a single query. Defaults to all of them.
+
+        Returns:
+            A dictionary of the loaded parameterized instances keyed by id, in the same order as the given ids.
+            Ids that do not exist in the database map to None.
+        """
+        return await self.run_sync(SqlAlchemyAgent.load_many, instance_ids, batch_size=batch_size, **kwargs)
+
+    async def exists(self, instance_id, **kwargs):
+        """
+        Check whether a parameterized instance exists in the database by querying its id only.
+
+        Args:
+            instance_id: The id of the parameterized instance.
+
+        Returns:
+            True if the instance exists, else False.
+        """
+        return await self.run_sync(SqlAlchemyAgent.exists, instance_id, **kwargs)
+
+    async def iter_instances(self, class_path=None, chunk_size=1000, raw=False, db_session=None):
+        """
+        Iterate over the saved instances, streaming the rows of the instances and their params in chunks.
+
+        Args:
+            class_path: The class path of the instances to iterate over. Defaults to all classes.
+            chunk_size: The number of rows to fetch from the database at a time.
+            raw: Whether to yield the serialized params of the instances instead of parameterized instances.
+            db_session: The AsyncSession to stream the rows with. Defaults to a new one that is closed afterwards.
+
+        Yields:
+            Tuples of the instance id and the parameterized instance, ordered by id. With "raw" the parameterized
+            instance is replaced by a dictionary of its "class_path" and its serialized "params".
+        """
+        if db_session is None:
+            async with self.make_session() as db_session:
+                async for item in self.iter_instances(class_path, chunk_size, raw, db_session=db_session):
+                    yield item
+            return
+
+        instance_rows = list()
+        async for row in await db_session.stream(get_instance_rows_statement(class_path, chunk_size)):
+            if instance_rows and row.id != instance_rows[0].id:
+                yield instance_rows[0].id, self.create_from_instance_rows(instance_rows, raw)
+                instance_rows = list()
+            instance_rows.append(row)
+
+        if instance_rows:
+            yield instance_rows[0].id, self.create_from_instance_rows(instance_rows, raw)
+
+    async def find(self, class_path=None, where=None, limit=None, offset=None, **kwargs):
+        """
+        Find the ids of saved instances by class path and param values, without loading the instances.
+
+        Args:
+            class_path: The class path of the instances to find. Defaults to all classes.
+            where: A dictionary of param values keyed by param name that the instances must have.
+            limit: The maximum number of ids to return. Defaults to all of them.
+            offset: The number of matching ids to skip.
+
+        Returns:
+            A list of the ids of the matching instances, ordered by id.
+        """
+        return await self.run_sync(SqlAlchemyAgent.find, class_path=class_path, where=where, limit=limit,
+                                   offset=offset, **kwargs)
+
+    async def delete(self, instance_id, **kwargs):
+        """
+        Delete a parameterized instance and its params from the database.
+
+        Args:
+            instance_id: The id of the parameterized instance to delete.
+        """
+        return await self.run_sync(SqlAlchemyAgent.delete, instance_id, **kwargs)
+
+    async def delete_many(self, instance_ids, batch_size=None, cascade=False, **kwargs):
+        """
+        Delete many parameterized instances and their params with set based DELETE statements, in one transaction.
+
+        Args:
+            instance_ids: An iterable of the ids of the parameterized instances to delete.
+            batch_size: The maximum number of ids to put in a single statement.
+            cascade: Whether to leave deleting the param rows to the "ON DELETE CASCADE" of the database.
+
+        Returns:
+            A dictionary of the number of deleted "instances" and "params" rows.
+        """
+        return await self.run_sync(SqlAlchemyAgent.delete_many, instance_ids, batch_size=batch_size, cascade=cascade,
+                                   **kwargs)
+
+    async def purge(self, class_path=None, older_than=None, cascade=False, **kwargs):
+        """
+        Delete all the instances of a class, or saved before a time, with set based DELETE statements.
+
+        Args:
+            class_path: The class path of the instances to delete.
+            older_than: A timedelta or datetime. The instances last written longer ago or before it are deleted.
+            cascade: Whether to leave deleting the param rows to the "ON DELETE CASCADE" of the database.
+
+        Returns:
+            A dictionary of the number of deleted "instances" and "params" rows.
+        """
+        return await self.run_sync(SqlAlchemyAgent.purge, class_path=class_path, older_than=older_than,
+                                   cascade=cascade, **kwargs)
+
+    async def delete_unused_blobs(self, **kwargs):
+        """
+        Delete the blobs that no param row references, e.g. after updating or deleting deduplicated instances.
+
+        Returns:
+            The number of deleted blobs.
+        """
+        return await self.run_sync(SqlAlchemyAgent.delete_unused_blobs, **kwargs)
+
+    async def update(self, instance, instance_id, **kwargs):
+        """
+        Update the rows in the database for a parameterized instance, writing only the differences.
+
+        Args:
+            instance: The parameterized instance to update from.
+            instance_id: The id of the parameterized instance in the database to update.
+
+        Returns:
+            The parameterized instance id.
+        """
+        return await self.run_sync(SqlAlchemyAgent.update, instance, instance_id, **kwargs)
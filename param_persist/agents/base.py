@@ -6,8 +6,105 @@ This file was created on August 12, 2020
 from abc import ABC, abstractmethod
 import importlib
 import json
+import time
 
-from param.serializer import JSONSerialization
+from param_persist.agents.codecs import decode, DecodedValue
+from param_persist.agents.instrumentation import CONSTRUCT, current_operation, InstrumentationEvent, RESOLVE
+from param_persist.agents.lazy import get_persisted_class, load_lazy_params
+
+
+def is_default(value, default):
+    """
+    Check whether a param value is equal to the default of its param.
+
+    Args:
+        value: The param value.
+        default: The default of the param.
+
+    Returns:
+        True if the value is the default, False if it is not or cannot be compared to it.
+    """
+    if value is default:
+        return True
+
+    try:
+        return type(value) is type(default) and bool(value == default)
+    except (TypeError, ValueError):
+        return False
+
+
+class ParamClassInfo:
+    """
+    The information about a parameterized class that agents need, computed once per class.
+    """
+
+    def __init__(self, parameterized_class):
+        """
+        The __init__ for the param class info.
+
+        Args:
+            parameterized_class: The parameterized class to compute the information for.
+        """
+        parameters = parameterized_class.param.objects(instance=False)
+
+        self.parameterized_class = parameterized_class
+        self.param_names = sorted(parameters)
+        self.param_types = {name: '.'.join([type(parameter).__module__, type(parameter).__name__])
+                            for name, parameter in parameters.items()}
+        self.serializers = {name: parameter.serialize for name, parameter in parameters.items()}
+        self.deserializers = {name: parameter.deserialize for name, parameter in parameters.items()}
+        self.defaults = {name: parameter.default for name, parameter in parameters.items()}
+
+    def serialize(self, instance, param_names=None):
+        """
+        Serialize the param values of an instance of the class into JSON compatible values.
+
+        Args:
+            instance: The parameterized instance to serialize.
+            param_names: The names of the params to serialize. Defaults to all of them.
+
+        Returns:
+            A dictionary of the serialized param values keyed by param name.
+        """
+        if param_names is None:
+            param_names = self.serializers.keys()
+
+        return {name: self.serializers[name](instance.param.get_value_generator(name)) for name in param_names}
+
+    def get_non_default_param_names(self, instance, param_names=None):
+        """
+        Get the names of the params of an instance of the class whose value is not the default of the class.
+
+        Values that cannot be compared to the default, e.g. numpy arrays, count as changed.
+
+        Args:
+            instance: The parameterized instance.
+            param_names: The names of the params to check. Defaults to all of them.
+
+        Returns:
+            A list of param names.
+        """
+        if param_names is None:
+            param_names = self.param_names
+
+        return [name for name in param_names
+                if name not in self.defaults or not is_default(instance.param.get_value_generator(name),
+                                                               self.defaults[name])]
+
+    def deserialize(self, serialized_data):
+        """
+        Deserialize the param values of the class, ignoring the values of params the class does not have.
+
+        Values decoded by a codec are used as is.
+
+        Args:
+            serialized_data: A dictionary of the serialized param values keyed by param name.
+
+        Returns:
+            A dictionary of the deserialized param values keyed by param name.
+        """
+        return {key: value.value if isinstance(value, DecodedValue) else self.deserializers[key](value)
+                for key, value in serialized_data.items() if key in self.deserializers}
 
 
 class AgentBase(ABC):
@@ -23,6 +120,8 @@ class AgentBase(ABC):
             engine: the engine to use for persisting.
         """
         self.engine = engine
+        self.param_classes = dict()
+        self.listeners = list()
         super().__init__()
 
     @abstractmethod
@@ -53,67 +152,221 @@ class AgentBase(ABC):
         """
         raise NotImplementedError('The "update" function must be overridden in the agent child class.')
 
-    def get_serialized_param(self, instance):
+    def save_many(self, instances, **kwargs):
         """
-        Get the serialized parameter data.
+        Save many parameterized instances.
+
+        Agents that can write in bulk should override this. The default implementation calls "save" once per instance.
 
         Args:
-            instance: The instance to serialize
+            instances: An iterable of parameterized instances to save.
 
         Returns:
-            Json serialization of the parameterized instance.
+            A list of the ids of the saved instances, in the same order as the given instances.
         """
-        return json.loads(JSONSerialization.serialize_parameters(instance))
+        return [self.save(instance, **kwargs) for instance in instances]
 
-    @staticmethod
-    def get_param_names(param_object):
+    def load_many(self, instance_ids, **kwargs):
         """
-        Return list of all the names in param.
+        Load many persisted parameterized instances.
+
+        Agents that can read in bulk should override this. The default implementation calls "load" once per id.
+
+        Args:
+            instance_ids: An iterable of the ids of the parameterized instances to load.
+
+        Returns:
+            A dictionary of the loaded parameterized instances keyed by id, in the same order as the given ids.
+        """
+        return {instance_id: self.load(instance_id, **kwargs) for instance_id in instance_ids}
+
+    def exists(self, instance_id, **kwargs):
         """
-        param_items = param_object.param.get_param_values()
-        param_names = list()
-        for item in param_items:
-            param_names.append(item[0])
+        Check whether a parameterized instance is persisted.
 
-        return param_names
+        Agents that can check without loading the instance should override this. The default implementation loads it.
 
-    @staticmethod
-    def get_param_object_from_instance(instance_model):
+        Args:
+            instance_id: The id of the parameterized instance.
+
+        Returns:
+            True if the instance exists, else False.
         """
-        Given an instance_model, return an associated param object.
+        return self.load_many([instance_id], **kwargs)[instance_id] is not None
+
+    def add_listener(self, listener):
+        """
+        Add an instrumentation listener, called with an InstrumentationEvent for each phase of the agent operations.
+
+        Listeners are called synchronously by the thread running the operation, so they should be quick. Without
+        listeners the phases are not timed.
+
+        Args:
+            listener: A callable that takes an InstrumentationEvent, e.g. a LoggingListener.
+
+        Returns:
+            The listener.
+        """
+        self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        """
+        Remove an instrumentation listener added with add_listener.
+
+        Args:
+            listener: The listener to remove.
         """
-        # Getting param_object
+        self.listeners.remove(listener)
+
+    def start_phase(self):
+        """
+        Start timing a phase of an operation.
+
+        Returns:
+            The start time to give to end_phase, or None if the agent has no listeners.
+        """
+        return time.perf_counter() if self.listeners else None
+
+    def end_phase(self, start, phase, param_count=None, size=None):
+        """
+        Report a phase of an operation to the listeners, if it was timed.
+
+        Args:
+            start: The start time returned by start_phase.
+            phase: The name of the phase, e.g. "db_read".
+            param_count: The number of params the phase handled, if known.
+            size: The size of the serialized params the phase handled in bytes, if known.
+        """
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            self.emit_event(InstrumentationEvent(current_operation.get(), phase, elapsed, param_count, size))
+
+    def emit_event(self, event):
+        """
+        Call the listeners with an instrumentation event.
+
+        Args:
+            event: The InstrumentationEvent.
+        """
+        for listener in self.listeners:
+            listener(event)
+
+    def register(self, parameterized_class):
+        """
+        Register a parameterized class so that loading its instances does not need to import it.
+
+        Can be used as a class decorator.
+
+        Args:
+            parameterized_class: The parameterized class to register.
+
+        Returns:
+            The parameterized class.
+        """
+        self.get_param_class_info(parameterized_class)
+        return parameterized_class
+
+    def get_param_class_info(self, parameterized_class):
+        """
+        Get the cached information of a parameterized class, computing it the first time the class is seen.
+
+        Args:
+            parameterized_class: The parameterized class to get the information for.
+
+        Returns:
+            The ParamClassInfo of the class.
+        """
+        parameterized_class = get_persisted_class(parameterized_class)
+        class_path = self.get_class_path_from_param_class(parameterized_class)
+        param_class_info = self.param_classes.get(class_path, None)
+        if param_class_info is None or param_class_info.parameterized_class is not parameterized_class:
+            param_class_info = ParamClassInfo(parameterized_class)
+            self.param_classes[class_path] = param_class_info
+
+        return param_class_info
+
+    def get_param_class_info_from_path(self, class_path):
+        """
+        Get the cached information of a parameterized class from its class path, importing the class if needed.
+
+        Args:
+            class_path: The class path of the parameterized class, as saved in the database.
+
+        Returns:
+            The ParamClassInfo of the class.
+        """
+        param_class_info = self.param_classes.get(class_path, None)
+        if param_class_info is not None:
+            return param_class_info
+
         try:
-            class_base_path, class_name = instance_model.class_path.rsplit('.', 1)
+            class_base_path, class_name = class_path.rsplit('.', 1)
             param_module = importlib.import_module(class_base_path)
             parameterized_class = getattr(param_module, class_name)
         except ImportError:
             raise RuntimeError(f'Defined param class "class_path" was not importable.'
-                               f' Given path is "{instance_model.class_path}"')
+                               f' Given path is "{class_path}"')
+
+        param_class_info = ParamClassInfo(parameterized_class)
+        self.param_classes[class_path] = param_class_info
+
+        return param_class_info
+
+    def create_param_object(self, class_path, serialized_data):
+        """
+        Create a param object directly from its serialized data.
+
+        Args:
+            class_path: The class path of the param object, as saved in the database.
+            serialized_data: A dictionary of the serialized param values keyed by param name.
 
-        param_object = parameterized_class()
+        Returns:
+            The param object.
+        """
+        start = self.start_phase()
+        param_class_info = self.get_param_class_info_from_path(class_path)
+        self.end_phase(start, RESOLVE)
+
+        start = self.start_phase()
+        param_object = param_class_info.parameterized_class(**param_class_info.deserialize(serialized_data))
+        self.end_phase(start, CONSTRUCT, len(serialized_data))
 
         return param_object
 
-    def update_param_object(self, param_object, serialized_data):
+    def get_serialized_param(self, instance, param_names=None):
         """
-        Update param_object data with given serialized data. Use JSONSerialization from param to deserialize the data.
+        Get the serialized parameter data.
+
+        Args:
+            instance: The instance to serialize
+            param_names: The names of the params to serialize. Defaults to all of them.
+
+        Returns:
+            A dictionary of the JSON compatible param values of the parameterized instance keyed by param name.
         """
-        # Update param object using deserialized data.
-        param_names = self.get_param_names(param_object)
+        load_lazy_params(instance, param_names)
+        return self.get_param_class_info(type(instance)).serialize(instance, param_names)
 
-        # Remove extra args if needed.
-        keys_to_remove = list()
-        for key, _ in serialized_data.items():
-            if key not in param_names:
-                keys_to_remove.append(key)
+    @staticmethod
+    def get_param_names(param_object):
+        """
+        Return list of all the names in param.
+        """
+        return sorted(param_object.param.objects('existing'))
 
-        for key in keys_to_remove:
-            serialized_data.pop(key)
+    def get_param_object_from_instance(self, instance_model):
+        """
+        Given an instance_model, return an associated param object.
+        """
+        return self.get_param_class_info_from_path(instance_model.class_path).parameterized_class()
 
+    def update_param_object(self, param_object, serialized_data):
+        """
+        Update param_object data with given serialized data. Params the param_object does not have are ignored.
+        """
         # Deserialize param data
-        param_model_deserialize = JSONSerialization. \
-            deserialize_parameters(pobj=param_object, serialization=json.dumps(serialized_data))
+        param_model_deserialize = self.get_param_class_info(type(param_object)).deserialize(serialized_data)
 
         for key, value in param_model_deserialize.items():
             setattr(param_object, key, value)
@@ -124,14 +377,18 @@ class AgentBase(ABC):
     def load_serialized_data_from_param_model(param_models):
         """
         Load serialized data from param models in appropriated format.
+
+        Values encoded by a codec in the data column are decoded into DecodedValue objects.
         """
-        param_models_json = [x.value for x in param_models]
         # Create serialized dictionary data in param serialized format to deserialize
         param_model_serialized_data = dict()
 
-        for item in param_models_json:
-            item = json.loads(item)
-            param_model_serialized_data[item['name']] = item['value']
+        for param_model in param_models:
+            data = getattr(param_model, 'data', None)
+            if data is not None:
+                param_model_serialized_data[param_model.name] = DecodedValue(decode(data))
+            else:
+                param_model_serialized_data[param_model.name] = json.loads(param_model.value)
 
         return param_model_serialized_data
 
@@ -155,3 +412,10 @@ class AgentBase(ABC):
             instance.__class__.__name__,
         ])
         return class_path
+
+    @staticmethod
+    def get_class_path_from_param_class(parameterized_class):
+        """
+        Get the class path of a parameterized class as it is saved in the database.
+        """
+        return '.'.join([parameterized_class.__module__, parameterized_class.__name__])
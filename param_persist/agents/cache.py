@@ -0,0 +1,125 @@
+"""
+In-process cache of loaded parameterized instances for agents.
+
+This file was created on October 17, 2026
+"""
+from collections import OrderedDict
+import copy
+import threading
+import time
+
+
+class InstanceCache:
+    """
+    A least recently used cache of the serialized params of loaded instances, keyed by instance id.
+
+    The cache holds the class path and the JSON compatible param values of each instance. Values are copied going in and
+    out of the cache so the parameterized instances handed to callers never share state with it.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None):
+        """
+        The __init__ for the instance cache.
+
+        Args:
+            max_entries: The maximum number of instances to keep. None for no limit.
+            max_bytes: The maximum total size of the instances to keep, as given to "put". None for no limit.
+            ttl: The number of seconds an instance is kept before it has to be loaded again. None to keep it until it
+                is evicted or invalidated.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        The number of instances in the cache.
+        """
+        return len(self._entries)
+
+    def get(self, instance_id):
+        """
+        Get the cached serialized params of an instance.
+
+        Args:
+            instance_id: The id of the instance.
+
+        Returns:
+            A tuple of the class path and a copy of the serialized params of the instance, or None if it is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(instance_id, None)
+            if entry is not None and entry[3] is not None and entry[3] <= time.monotonic():
+                self._remove(instance_id)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(instance_id)
+            self.hits += 1
+            class_path, serialized_data = entry[0], entry[1]
+
+        return class_path, copy.deepcopy(serialized_data)
+
+    def put(self, instance_id, class_path, serialized_data, size=0):
+        """
+        Add the serialized params of an instance to the cache, evicting the least recently used instances if needed.
+
+        Args:
+            instance_id: The id of the instance.
+            class_path: The class path of the instance.
+            serialized_data: A dictionary of the serialized param values keyed by param name.
+            size: The size of the instance in bytes, used to bound the cache with "max_bytes".
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.invalidate(instance_id)
+            return
+
+        serialized_data = copy.deepcopy(serialized_data)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            self._remove(instance_id)
+            self._entries[instance_id] = (class_path, serialized_data, size, expires)
+            self.size += size
+
+            while (self.max_entries is not None and len(self._entries) > self.max_entries) or \
+                    (self.max_bytes is not None and self.size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, instance_id):
+        """
+        Remove an instance from the cache.
+
+        Args:
+            instance_id: The id of the instance.
+        """
+        with self._lock:
+            self._remove(instance_id)
+
+    def clear(self):
+        """
+        Remove all the instances from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, instance_id):
+        """
+        Remove an instance from the cache. The lock must be held by the caller.
+        """
+        entry = self._entries.pop(instance_id, None)
+        if entry is not None:
+            self.size -= entry[2]
@@ -0,0 +1,329 @@
+"""
+Binary codecs for storing large param values, e.g. numpy arrays, without converting them to JSON.
+
+This file was created on October 17, 2026
+"""
+import io
+import json
+import struct
+import zlib
+
+import param
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover
+    lz4_frame = None
+
+HEADER_SEPARATOR = b'\n'
+MAX_HEADER_LENGTH = 64
+
+
+def get_compressions():
+    """
+    Get the compressions that can be used with the installed packages.
+
+    Returns:
+        A dictionary of tuples of the compress and decompress functions keyed by compression name.
+    """
+    compressions = {'zlib': (zlib.compress, zlib.decompress)}
+    if zstandard is not None:
+        compressions['zstd'] = (zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress)
+    if lz4_frame is not None:
+        compressions['lz4'] = (lz4_frame.compress, lz4_frame.decompress)
+    return compressions
+
+
+class DecodedValue:
+    """
+    A param value decoded by a codec, which is set on the instance as is instead of being deserialized from JSON.
+    """
+
+    def __init__(self, value):
+        """
+        The __init__ for the decoded value.
+
+        Args:
+            value: The decoded param value.
+        """
+        self.value = value
+
+
+class Codec:
+    """
+    The base class for codecs, which encode param values into bytes with a header naming the codec and compression.
+
+    Codecs return None for the values they cannot encode, which are then stored as JSON.
+    """
+    name = None
+
+    def __init__(self, compression=None):
+        """
+        The __init__ for the codec.
+
+        Args:
+            compression: The name of the compression to apply to the encoded values, "zlib", "zstd" or "lz4". zstd and
+                lz4 need the "zstandard" and "lz4" packages. None for no compression.
+        """
+        if compression is not None and compression not in get_compressions():
+            raise RuntimeError(f'Compression "{compression}" is not available. Available compressions are '
+                               f'"{", ".join(get_compressions())}".')
+
+        self.compression = compression
+
+    def encode(self, value):
+        """
+        Encode a param value into bytes that "decode" can decode.
+
+        Args:
+            value: The param value.
+
+        Returns:
+            The encoded value as bytes, or None if the codec cannot encode the value.
+        """
+        payload = self.encode_payload(value)
+        if payload is None:
+            return None
+
+        compression = self.compression or ''
+        if self.compression is not None:
+            payload = get_compressions()[self.compression][0](payload)
+
+        return f'{self.name};{compression}'.encode('ascii') + HEADER_SEPARATOR + payload
+
+    def encode_payload(self, value):
+        """
+        Encode a param value into bytes, without the header and compression.
+
+        Args:
+            value: The param value.
+
+        Returns:
+            The encoded value as bytes, or None if the codec cannot encode the value.
+        """
+        raise NotImplementedError('The "encode_payload" function must be overridden in the codec child class.')
+
+    @staticmethod
+    def decode_payload(payload):
+        """
+        Decode a param value encoded with "encode_payload".
+
+        Args:
+            payload: The encoded value as a bytes-like object.
+
+        Returns:
+            The param value.
+        """
+        raise NotImplementedError('The "decode_payload" function must be overridden in the codec child class.')
+
+
+def encode_npy(array):
+    """
+    Encode a numpy array into the bytes of a .npy file.
+    """
+    buffer = io.BytesIO()
+    numpy.lib.format.write_array(buffer, numpy.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def decode_npy(payload):
+    """
+    Decode the bytes of a .npy file into a numpy array that shares the memory of the bytes, so it is read only.
+    """
+    payload = memoryview(payload)
+    length_size = 2 if payload[6] == 1 else 4
+    offset = 8 + length_size + int.from_bytes(payload[8:8 + length_size], 'little')
+
+    buffer = io.BytesIO(bytes(payload[:offset]))
+    version = numpy.lib.format.read_magic(buffer)
+    if version == (1, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(buffer)
+    else:
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(buffer)
+
+    array = numpy.frombuffer(payload, dtype=dtype, count=int(numpy.prod(shape)), offset=offset)
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+
+class ArrayCodec(Codec):
+    """
+    Encodes numpy arrays as .npy bytes. Arrays of python objects are not encoded.
+
+    Decoded arrays share the memory of the loaded bytes when they are not compressed, so they are read only and must
+    be copied to be changed in place.
+    """
+    name = 'npy'
+
+    def encode_payload(self, value):
+        """
+        Encode a numpy array as .npy bytes.
+        """
+        if not isinstance(value, numpy.ndarray) or value.dtype.hasobject:
+            return None
+        return encode_npy(value)
+
+    @staticmethod
+    def decode_payload(payload):
+        """
+        Decode .npy bytes into a numpy array.
+        """
+        return decode_npy(payload)
+
+
+class ListCodec(Codec):
+    """
+    Encodes long lists of only ints or only floats as .npy bytes of int64 or float64 values.
+    """
+    name = 'list'
+
+    def __init__(self, compression=None, min_length=256):
+        """
+        The __init__ for the list codec.
+
+        Args:
+            compression: The name of the compression to apply to the encoded values. See Codec.
+            min_length: The minimum length of the lists to encode. Shorter lists are stored as JSON.
+        """
+        super().__init__(compression)
+        self.min_length = min_length
+
+    def encode_payload(self, value):
+        """
+        Encode a list of only ints or only floats as .npy bytes.
+        """
+        if not isinstance(value, list) or not value or len(value) < self.min_length:
+            return None
+
+        value_type = type(value[0])
+        if value_type not in (int, float) or any(type(x) is not value_type for x in value):
+            return None
+
+        try:
+            array = numpy.array(value, dtype=numpy.int64 if value_type is int else numpy.float64)
+        except OverflowError:
+            return None
+
+        return encode_npy(array)
+
+    @staticmethod
+    def decode_payload(payload):
+        """
+        Decode .npy bytes into a list.
+        """
+        return decode_npy(payload).tolist()
+
+
+class DataFrameCodec(Codec):
+    """
+    Encodes pandas DataFrames with only numeric or boolean columns as the raw bytes of their columns.
+
+    Like the JSON serialization of param, the index of the DataFrame is not stored.
+    """
+    name = 'dataframe'
+
+    def encode_payload(self, value):
+        """
+        Encode a DataFrame as a length prefixed JSON description of its columns followed by the bytes of each column.
+        """
+        if not hasattr(value, 'columns') or not hasattr(value, 'dtypes'):
+            return None
+        if not all(isinstance(x, str) for x in value.columns) or value.columns.has_duplicates:
+            return None
+        if not all(x.kind in 'biuf' for x in value.dtypes):
+            return None
+
+        arrays = [numpy.ascontiguousarray(value[x].to_numpy()) for x in value.columns]
+        columns = [[name, array.dtype.str] for name, array in zip(value.columns, arrays)]
+        description = json.dumps({'columns': columns, 'rows': len(value)}).encode('utf-8')
+
+        return b''.join([struct.pack('<I', len(description)), description] + [x.tobytes() for x in arrays])
+
+    @staticmethod
+    def decode_payload(payload):
+        """
+        Decode the bytes of a DataFrame.
+        """
+        import pandas
+
+        payload = memoryview(payload)
+        offset = struct.calcsize('<I') + struct.unpack_from('<I', payload)[0]
+        description = json.loads(bytes(payload[struct.calcsize('<I'):offset]))
+
+        data = dict()
+        for name, dtype in description['columns']:
+            dtype = numpy.dtype(dtype)
+            data[name] = numpy.frombuffer(payload, dtype=dtype, count=description['rows'], offset=offset)
+            offset += dtype.itemsize * description['rows']
+
+        return pandas.DataFrame(data, columns=[x[0] for x in description['columns']])
+
+
+CODECS = {x.name: x for x in (ArrayCodec, ListCodec, DataFrameCodec)}
+
+
+def decode(data):
+    """
+    Decode a param value encoded by a codec, whichever codec and compression it was encoded with.
+
+    Args:
+        data: The encoded value as a bytes-like object.
+
+    Returns:
+        The param value.
+    """
+    data = memoryview(data)
+    header = bytes(data[:MAX_HEADER_LENGTH])
+    header_end = header.index(HEADER_SEPARATOR)
+    name, compression = header[:header_end].decode('ascii').split(';')
+    if name not in CODECS:
+        raise RuntimeError(f'Param value was encoded with unknown codec "{name}".')
+
+    payload = data[header_end + 1:]
+    if compression:
+        payload = get_compressions()[compression][1](payload)
+
+    return CODECS[name].decode_payload(payload)
+
+
+def default_codecs(compression=None, min_list_length=256):
+    """
+    Get the codecs for the array, DataFrame and list params, keyed by param type as the agents record it.
+
+    Args:
+        compression: The name of the compression to apply to the encoded values. See Codec.
+        min_list_length: The minimum length of the lists to encode. Shorter lists are stored as JSON.
+
+    Returns:
+        A dictionary of codecs keyed by param type string, empty if numpy is not installed.
+    """
+    if numpy is None:
+        return dict()
+
+    return {
+        get_param_type(param.Array): ArrayCodec(compression),
+        get_param_type(param.DataFrame): DataFrameCodec(compression),
+        get_param_type(param.List): ListCodec(compression, min_list_length),
+    }
+
+
+def get_param_type(parameter_class):
+    """
+    Get the param type string of a param class, as ParamClassInfo records it, e.g. "param.List".
+
+    Args:
+        parameter_class: The param class, e.g. param.List.
+
+    Returns:
+        The module and name of the class joined with a dot. The module depends on the param version.
+    """
+    return '.'.join([parameter_class.__module__, parameter_class.__name__])
@@ -0,0 +1,413 @@
+"""
+The File Agent, which persists parameterized instances to append-only log files without a database.
+
+This file was created on October 17, 2026
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+from param_persist.agents.base import AgentBase
+from param_persist.agents.instrumentation import DB_READ, DB_WRITE, instrumented, SERIALIZE
+
+log = logging.getLogger('param_persist')
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+# Kind of record, length of the id, length of the payload and CRC-32 of the id and payload
+RECORD_HEADER = struct.Struct('<BHII')
+PUT_RECORD = 1
+DELETE_RECORD = 2
+
+
+def get_segment_name(segment_number):
+    """
+    Get the file name of a segment.
+
+    Args:
+        segment_number: The number of the segment.
+
+    Returns:
+        The file name.
+    """
+    return f'{SEGMENT_PREFIX}{segment_number:06d}{SEGMENT_SUFFIX}'
+
+
+def encode_record(kind, instance_id, payload=b''):
+    """
+    Encode a record of the log.
+
+    Args:
+        kind: The kind of record, PUT_RECORD or DELETE_RECORD.
+        instance_id: The id of the instance.
+        payload: The serialized instance for PUT_RECORD.
+
+    Returns:
+        The record as bytes.
+    """
+    key = instance_id.encode('utf-8')
+    return RECORD_HEADER.pack(kind, len(key), len(payload), zlib.crc32(payload, zlib.crc32(key))) + key + payload
+
+
+def iter_records(data):
+    """
+    Iterate over the records of a segment, stopping at the first incomplete or corrupt record.
+
+    Args:
+        data: The content of the segment as a bytes-like object, e.g. an mmap.
+
+    Yields:
+        Tuples of the kind, instance id, offset of the payload, length of the payload and offset of the next record.
+    """
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        kind, key_length, payload_length, crc = RECORD_HEADER.unpack_from(data, offset)
+        key_offset = offset + RECORD_HEADER.size
+        payload_offset = key_offset + key_length
+        end = payload_offset + payload_length
+        if kind not in (PUT_RECORD, DELETE_RECORD) or end > len(data):
+            return
+        key = data[key_offset:payload_offset]
+        if zlib.crc32(data[payload_offset:end], zlib.crc32(key)) != crc:
+            return
+        yield kind, bytes(key).decode('utf-8'), payload_offset, payload_length, end
+        offset = end
+
+
+class FileAgent(AgentBase):
+    """
+    An agent for persisting parameterized objects to append-only log files in a directory.
+
+    Saves, updates and deletes append a record to the active segment file, and an in-memory index maps each instance
+    id to the offset of its latest record. Loads read the record from the memory map of its segment. The index is
+    rebuilt by reading the segments when the agent is created, truncating a record left incomplete by a crash.
+    Updated and deleted records stay in the segments until "compact" rewrites them.
+    """
+
+    def __init__(self, path, segment_size=64 * 1024 * 1024, fsync=False):
+        """
+        The __init__ function for the FileAgent.
+
+        Args:
+            path: The directory to store the segment files in, created if it does not exist.
+            segment_size: The size in bytes after which a new segment file is started.
+            fsync: Whether to flush each write to disk with fsync before returning, so it survives a power loss.
+        """
+        os.makedirs(path, exist_ok=True)
+        super().__init__(path)
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.index = dict()
+        self.garbage_size = 0
+        self._maps = dict()
+        self._lock = threading.RLock()
+        self._file = None
+
+        segment_numbers = self.get_segment_numbers()
+        for segment_number in segment_numbers:
+            self.read_segment(segment_number)
+        self.active_segment = segment_numbers[-1] if segment_numbers else 1
+        self.open_active_segment()
+
+    def get_segment_numbers(self):
+        """
+        Get the numbers of the segment files in the directory of the agent.
+
+        Returns:
+            A sorted list of segment numbers.
+        """
+        segment_numbers = list()
+        for file_name in os.listdir(self.path):
+            if file_name.startswith(SEGMENT_PREFIX) and file_name.endswith(SEGMENT_SUFFIX):
+                segment_numbers.append(int(file_name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(segment_numbers)
+
+    def get_segment_path(self, segment_number):
+        """
+        Get the path of a segment file.
+        """
+        return os.path.join(self.path, get_segment_name(segment_number))
+
+    def read_segment(self, segment_number):
+        """
+        Add the records of a segment to the index, truncating the segment after its last valid record.
+
+        Args:
+            segment_number: The number of the segment.
+        """
+        segment_path = self.get_segment_path(segment_number)
+        with open(segment_path, 'rb') as segment_file:
+            data = segment_file.read()
+
+        end = 0
+        for kind, instance_id, payload_offset, payload_length, end in iter_records(data):
+            previous = self.index.pop(instance_id, None)
+            if previous is not None:
+                self.garbage_size += previous[2]
+            if kind == PUT_RECORD:
+                self.index[instance_id] = (segment_number, payload_offset, payload_length)
+            else:
+                self.garbage_size += payload_length
+
+        if end < len(data):
+            log.warning(f'truncating incomplete record at end of segment. segment="{segment_path}" offset="{end}"')
+            with open(segment_path, 'r+b') as segment_file:
+                segment_file.truncate(end)
+
+    def open_active_segment(self):
+        """
+        Open the active segment for appending, creating it if it does not exist.
+        """
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.get_segment_path(self.active_segment), 'ab')
+
+    def close(self):
+        """
+        Close the active segment and the memory maps of the segments. The agent must not be used afterwards.
+        """
+        with self._lock:
+            for segment_map in self._maps.values():
+                segment_map.close()
+            self._maps.clear()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def append(self, records):
+        """
+        Append records to the active segment, starting a new segment first if the active one is full.
+
+        Args:
+            records: A list of tuples of the kind, instance id and payload of each record.
+
+        Returns:
+            A list of tuples of the segment number, payload offset and payload length of each record.
+        """
+        start = self.start_phase()
+        if self._file.tell() >= self.segment_size:
+            self.active_segment += 1
+            self.open_active_segment()
+
+        offset = self._file.tell()
+        locations = list()
+        chunks = list()
+        for kind, instance_id, payload in records:
+            record = encode_record(kind, instance_id, payload)
+            locations.append((self.active_segment, offset + len(record) - len(payload), len(payload)))
+            chunks.append(record)
+            offset += len(record)
+
+        self._file.write(b''.join(chunks))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if start is not None:
+            self.end_phase(start, DB_WRITE, len(records), sum(x[2] for x in locations))
+
+        return locations
+
+    def put(self, records):
+        """
+        Append put records and point the index at them.
+
+        Args:
+            records: A list of tuples of the instance id and payload of each record.
+        """
+        with self._lock:
+            locations = self.append([(PUT_RECORD, instance_id, payload) for instance_id, payload in records])
+            for (instance_id, _), location in zip(records, locations):
+                previous = self.index.get(instance_id, None)
+                if previous is not None:
+                    self.garbage_size += previous[2]
+                self.index[instance_id] = location
+
+    def read(self, instance_id):
+        """
+        Read the payload of the latest record of an instance from the memory map of its segment.
+
+        Args:
+            instance_id: The id of the instance.
+
+        Returns:
+            The payload as bytes, or None if the instance does not exist.
+        """
+        with self._lock:
+            location = self.index.get(instance_id, None)
+            if location is None:
+                return None
+
+            segment_number, offset, length = location
+            segment_map = self._maps.get(segment_number, None)
+            if segment_map is None or offset + length > len(segment_map):
+                if segment_map is not None:
+                    segment_map.close()
+                with open(self.get_segment_path(segment_number), 'rb') as segment_file:
+                    segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment_number] = segment_map
+
+            return segment_map[offset:offset + length]
+
+    def serialize_instance(self, instance):
+        """
+        Serialize a parameterized instance into the payload of a record.
+
+        Args:
+            instance: The parameterized instance.
+
+        Returns:
+            The payload as bytes.
+        """
+        start = self.start_phase()
+        serialized_param = self.get_serialized_param(instance)
+        serialized_param.pop('name', None)
+        payload = json.dumps({'class_path': self.get_class_path_from_param_instance(instance),
+                              'params': serialized_param}, separators=(',', ':')).encode('utf-8')
+        self.end_phase(start, SERIALIZE, len(serialized_param), len(payload))
+
+        return payload
+
+    @instrumented
+    def save(self, instance, **kwargs):
+        """
+        Save a parameterized instance by appending it to the log.
+
+        Args:
+            instance: The parameterized instance to save.
+
+        Returns:
+            The id of the saved instance.
+        """
+        instance_id = str(uuid.uuid4())
+        self.put([(instance_id, self.serialize_instance(instance))])
+        return instance_id
+
+    @instrumented
+    def save_many(self, instances, **kwargs):
+        """
+        Save many parameterized instances by appending them to the log with a single write.
+
+        Args:
+            instances: An iterable of parameterized instances to save.
+
+        Returns:
+            A list of the ids of the saved instances, in the same order as the given instances.
+        """
+        records = [(str(uuid.uuid4()), self.serialize_instance(x)) for x in instances]
+        self.put(records)
+        return [x[0] for x in records]
+
+    @instrumented
+    def load(self, instance_id, **kwargs):
+        """
+        Load a parameterized instance from the log.
+
+        Args:
+            instance_id: The id of the parameterized instance to load.
+
+        Returns:
+            The parameterized instance, or None if it does not exist.
+        """
+        start = self.start_phase()
+        payload = self.read(instance_id)
+        if payload is None:
+            log.warning(f'unable to find instance with given instance id. id="{instance_id}"')
+            return None
+        self.end_phase(start, DB_READ, size=len(payload))
+
+        serialized_instance = json.loads(payload)
+        return self.create_param_object(serialized_instance['class_path'], serialized_instance['params'])
+
+    def exists(self, instance_id, **kwargs):
+        """
+        Check whether a parameterized instance is in the index of the log, without reading it.
+
+        Args:
+            instance_id: The id of the parameterized instance.
+
+        Returns:
+            True if the instance exists, else False.
+        """
+        with self._lock:
+            return instance_id in self.index
+
+    @instrumented
+    def update(self, instance, instance_id, **kwargs):
+        """
+        Update a saved parameterized instance by appending its new values to the log.
+
+        Args:
+            instance: The parameterized instance to update from.
+            instance_id: The id of the parameterized instance to update.
+
+        Returns:
+            The parameterized instance id.
+        """
+        payload = self.serialize_instance(instance)
+        with self._lock:
+            if instance_id not in self.index:
+                raise RuntimeError(f'Parameterized instance with id "{instance_id}" does not exist.')
+            self.put([(instance_id, payload)])
+
+        return instance_id
+
+    @instrumented
+    def delete(self, instance_id, **kwargs):
+        """
+        Delete a parameterized instance by appending a delete record to the log.
+
+        Args:
+            instance_id: The id of the parameterized instance to delete.
+        """
+        with self._lock:
+            location = self.index.pop(instance_id, None)
+            if location is None:
+                log.warning(f'unable to find instance with given instance id. id="{instance_id}"')
+                return
+            self.append([(DELETE_RECORD, instance_id, b'')])
+            self.garbage_size += location[2]
+
+    def compact(self):
+        """
+        Rewrite the latest record of each instance into new segments and remove the old segments.
+
+        The new segments are complete before the old ones are removed, so the log stays readable if the process stops
+        during compaction.
+
+        Returns:
+            The number of bytes of payload reclaimed.
+        """
+        with self._lock:
+            old_segment_numbers = self.get_segment_numbers()
+            records = [(instance_id, self.read(instance_id)) for instance_id in sorted(self.index)]
+            reclaimed_size = self.garbage_size
+
+            for segment_map in self._maps.values():
+                segment_map.close()
+            self._maps.clear()
+            self.active_segment += 1
+            self.open_active_segment()
+            self.index.clear()
+            batch = list()
+            batch_size = 0
+            for instance_id, payload in records:
+                batch.append((instance_id, payload))
+                batch_size += len(payload)
+                if batch_size >= self.segment_size:
+                    self.put(batch)
+                    batch = list()
+                    batch_size = 0
+            self.put(batch)
+            os.fsync(self._file.fileno())
+
+            for segment_number in old_segment_numbers:
+                os.remove(self.get_segment_path(segment_number))
+            self.garbage_size = 0
+
+        return reclaimed_size
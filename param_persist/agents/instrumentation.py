@@ -0,0 +1,105 @@
+"""
+Instrumentation of the operations of agents, reporting the elapsed time of each phase to listeners.
+
+This file was created on October 17, 2026
+"""
+from contextvars import ContextVar
+import logging
+import time
+
+OPERATION = 'operation'
+SERIALIZE = 'serialize'
+DB_WRITE = 'db_write'
+DB_READ = 'db_read'
+DESERIALIZE = 'deserialize'
+RESOLVE = 'resolve'
+CONSTRUCT = 'construct'
+
+current_operation = ContextVar('param_persist_operation', default=None)
+
+
+class InstrumentationEvent:
+    """
+    The measurement of one phase of an agent operation.
+
+    The phases are "serialize" (param values to JSON or codec bytes), "db_write" and "db_read" (statements and
+    commits), "deserialize" (JSON, documents and codec bytes to serialized params), "resolve" (finding or importing the
+    parameterized class) and "construct" (deserializing the params and creating the instance). The whole operation is
+    reported last with the "operation" phase.
+    """
+    __slots__ = ('operation', 'phase', 'elapsed', 'param_count', 'size')
+
+    def __init__(self, operation, phase, elapsed, param_count=None, size=None):
+        """
+        The __init__ for the instrumentation event.
+
+        Args:
+            operation: The name of the agent function, e.g. "load", or None outside of an instrumented function.
+            phase: The name of the phase.
+            elapsed: The elapsed time of the phase in seconds.
+            param_count: The number of params the phase handled, or None if it is not known.
+            size: The size of the serialized params the phase handled in bytes, or None if it is not known.
+        """
+        self.operation = operation
+        self.phase = phase
+        self.elapsed = elapsed
+        self.param_count = param_count
+        self.size = size
+
+    def __repr__(self):
+        """
+        String representation of the event.
+        """
+        return f'<InstrumentationEvent operation="{self.operation}" phase="{self.phase}" elapsed="{self.elapsed}" ' \
+               f'param_count="{self.param_count}" size="{self.size}">'
+
+
+class LoggingListener:
+    """
+    An instrumentation listener that logs each event, e.g. to find out where the time of slow loads is spent.
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        """
+        The __init__ for the logging listener.
+
+        Args:
+            logger: The logger to log the events with. Defaults to the "param_persist" logger.
+            level: The level to log the events at.
+        """
+        self.logger = logger or logging.getLogger('param_persist')
+        self.level = level
+
+    def __call__(self, event):
+        """
+        Log an instrumentation event.
+
+        Args:
+            event: The InstrumentationEvent.
+        """
+        self.logger.log(self.level, f'{event.operation} {event.phase} took {event.elapsed * 1000:.3f} ms. '
+                                    f'params="{event.param_count}" bytes="{event.size}"')
+
+
+def instrumented(wrapped_function):
+    """
+    Decorator for reporting the phases of an agent function under its name and the elapsed time of the whole function.
+
+    Does nothing but check the listeners of the agent when it has none.
+    """
+    operation = wrapped_function.__name__
+
+    def decorator_function(self, *args, **kwargs):
+        if not self.listeners:
+            return wrapped_function(self, *args, **kwargs)
+
+        token = current_operation.set(operation)
+        start = time.perf_counter()
+        try:
+            return wrapped_function(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_operation.reset(token)
+            self.emit_event(InstrumentationEvent(operation, OPERATION, elapsed))
+
+    return decorator_function
@@ -0,0 +1,211 @@
+"""
+Lazy loading of the params of parameterized instances, for agents.
+
+This file was created on October 17, 2026
+"""
+import threading
+
+import param
+
+LAZY_PARAMS_KEY = '_param_persist_lazy_params'
+PERSISTED_CLASS_KEY = '_param_persist_class'
+
+_lazy_classes = dict()
+_lazy_classes_lock = threading.Lock()
+
+
+class LazyParams:
+    """
+    The params of a parameterized instance that are not loaded yet and the function to load them with.
+    """
+
+    def __init__(self, parameterized_class, param_names, loader):
+        """
+        The __init__ for the lazy params.
+
+        Args:
+            parameterized_class: The parameterized class of the instance, restored once all the params are loaded.
+            param_names: The names of the params that are not loaded yet.
+            loader: A function that takes a list of param names and returns a dictionary of their deserialized values
+                keyed by param name.
+        """
+        self.parameterized_class = parameterized_class
+        self.param_names = set(param_names)
+        self.loader = loader
+
+    def load(self, instance, param_names):
+        """
+        Load params of an instance and set them without triggering the param watchers of the instance.
+
+        Args:
+            instance: The parameterized instance.
+            param_names: The names of the params to load.
+        """
+        param_names = sorted(self.param_names.intersection(param_names))
+        if not param_names:
+            return
+
+        values = self.loader(param_names)
+        with param.parameterized.discard_events(instance), param.parameterized.edit_constant(instance):
+            for key in param_names:
+                if key in values:
+                    setattr(instance, key, values[key])
+
+        self.discard(instance, param_names)
+
+    def discard(self, instance, param_names):
+        """
+        Stop deferring params of an instance, restoring its class once no param is deferred.
+
+        Args:
+            instance: The parameterized instance.
+            param_names: The names of the params that must no longer be loaded.
+        """
+        self.param_names.difference_update(param_names)
+        if not self.param_names and type(instance) is not self.parameterized_class:
+            object.__setattr__(instance, '__class__', self.parameterized_class)
+            instance.__dict__.pop(LAZY_PARAMS_KEY, None)
+
+
+def _lazy_getattribute(self, name):
+    """
+    Load a deferred param the first time it is accessed.
+    """
+    lazy_params = object.__getattribute__(self, '__dict__').get(LAZY_PARAMS_KEY, None)
+    if lazy_params is not None and name in lazy_params.param_names:
+        lazy_params.load(self, [name])
+    return object.__getattribute__(self, name)
+
+
+def _lazy_setattr(self, name, value):
+    """
+    Stop deferring a param that is assigned before it is accessed.
+    """
+    lazy_params = self.__dict__.get(LAZY_PARAMS_KEY, None)
+    if lazy_params is not None and name in lazy_params.param_names:
+        lazy_params.discard(self, [name])
+    object.__setattr__(self, name, value)
+
+
+def _lazy_reduce_ex(self, protocol):
+    """
+    Load all the deferred params before pickling or copying, so the instance is reduced as its persisted class.
+    """
+    load_lazy_params(self)
+    return self.__reduce_ex__(protocol)
+
+
+def _lazy_reduce(self):
+    """
+    Load all the deferred params before reducing, so the instance is reduced as its persisted class.
+    """
+    load_lazy_params(self)
+    return self.__reduce__()
+
+
+def get_lazy_class(parameterized_class):
+    """
+    Get the subclass of a parameterized class that loads deferred params on access, creating it the first time.
+
+    The subclass has the same name and module as the class, so the class path of its instances does not change.
+    Pickling or copying an instance of it loads all its deferred params, so it is pickled as an instance of the class.
+
+    Args:
+        parameterized_class: The parameterized class.
+
+    Returns:
+        The lazy subclass.
+    """
+    with _lazy_classes_lock:
+        lazy_class = _lazy_classes.get(parameterized_class, None)
+        if lazy_class is None:
+            namespace = {
+                '__module__': parameterized_class.__module__,
+                '__qualname__': parameterized_class.__qualname__,
+                '__doc__': parameterized_class.__doc__,
+                '__getattribute__': _lazy_getattribute,
+                '__setattr__': _lazy_setattr,
+                '__reduce_ex__': _lazy_reduce_ex,
+                '__reduce__': _lazy_reduce,
+                PERSISTED_CLASS_KEY: parameterized_class,
+            }
+            lazy_class = type(parameterized_class)(parameterized_class.__name__, (parameterized_class,), namespace)
+            _lazy_classes[parameterized_class] = lazy_class
+
+    return lazy_class
+
+
+def get_persisted_class(parameterized_class):
+    """
+    Get the class that is persisted for a parameterized class, which is the class itself unless it is a lazy subclass.
+
+    Args:
+        parameterized_class: The parameterized class.
+
+    Returns:
+        The parameterized class to persist.
+    """
+    return parameterized_class.__dict__.get(PERSISTED_CLASS_KEY, parameterized_class)
+
+
+def make_lazy(instance, param_names, loader):
+    """
+    Defer loading params of a parameterized instance until they are first accessed.
+
+    Until all the deferred params are loaded or assigned, the instance is an instance of a lazy subclass of its class
+    with the same name and module. Loading a deferred param does not trigger the param watchers of the instance.
+
+    Args:
+        instance: The parameterized instance.
+        param_names: The names of the params to defer. Names the class does not have are ignored.
+        loader: A function that takes a list of param names and returns a dictionary of their deserialized values
+            keyed by param name.
+
+    Returns:
+        The parameterized instance.
+    """
+    parameterized_class = type(instance)
+    param_names = set(param_names).intersection(parameterized_class.param.objects(instance=False))
+    if not param_names:
+        return instance
+
+    instance.__dict__[LAZY_PARAMS_KEY] = LazyParams(parameterized_class, param_names, loader)
+    instance.__class__ = get_lazy_class(parameterized_class)
+
+    return instance
+
+
+def load_lazy_params(instance, param_names=None):
+    """
+    Load the deferred params of a parameterized instance, e.g. before pickling, copying or serializing it.
+
+    Serializers must load the params first, since param reads the values of dynamic params, e.g. of Number params,
+    without accessing them on the instance.
+
+    Args:
+        instance: The parameterized instance.
+        param_names: The names of the params to load. Defaults to all of them, so the instance is an instance of its
+            own class again.
+
+    Returns:
+        The parameterized instance.
+    """
+    lazy_params = instance.__dict__.get(LAZY_PARAMS_KEY, None)
+    if lazy_params is not None:
+        lazy_params.load(instance, list(lazy_params.param_names if param_names is None else param_names))
+
+    return instance
+
+
+def get_lazy_param_names(instance):
+    """
+    Get the names of the params of a parameterized instance that are not loaded yet.
+
+    Args:
+        instance: The parameterized instance.
+
+    Returns:
+        A set of param names, empty if the instance has no deferred params.
+    """
+    lazy_params = instance.__dict__.get(LAZY_PARAMS_KEY, None)
+    return set(lazy_params.param_names) if lazy_params is not None else set()
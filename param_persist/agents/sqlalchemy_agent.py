@@ -3,113 +3,1309 @@ The SqlAlchemy Agent.
 
 This file was created on August 05, 2020
 """
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import contextvars
+import datetime
+from functools import partial
+import hashlib
+import inspect
+import itertools
 import json
 import logging
 import uuid
+import zlib
 
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
 
-from param_persist.agents.base import AgentBase
-from param_persist.sqlalchemy.models import InstanceModel, ParamModel
+from param_persist.agents.base import AgentBase, is_default
+from param_persist.agents.codecs import DecodedValue
+from param_persist.agents.instrumentation import DB_READ, DB_WRITE, DESERIALIZE, instrumented, SERIALIZE
+from param_persist.agents.lazy import load_lazy_params, make_lazy
+from param_persist.agents.tracking import ChangeTracker
+from param_persist.sqlalchemy.models import BlobModel, InstanceModel, ParamModel, ParamTypeModel
 
 log = logging.getLogger('param_persist')
 
+PARAMS_STORAGE = 'params'
+DOCUMENT_STORAGE = 'document'
+TRANSACTION_INFO_KEY = 'param_persist_transaction'
+TRACKED_INSTANCES_INFO_KEY = 'param_persist_tracked_instances'
+WRITTEN_IDS_INFO_KEY = 'param_persist_written_ids'
+MAX_IN_VALUES = 500
+EXECUTOR_CHUNK_SIZE = 100
+
 
 def sqlalchemy_session(wrapped_function):
     """
     Decorator for creating, closeing and rolling back an sqlalchemy session.
+
+    A session given with the "db_session" keyword argument is used as is and left to the caller to close. The session
+    of a generator function is closed when the generator is exhausted or closed.
     """
+    if inspect.isgeneratorfunction(wrapped_function):
+        return sqlalchemy_generator_session(wrapped_function)
+
     def decorator_function(self, *args, **kwargs):
+        db_session = kwargs.pop('db_session', None)
+        if db_session is not None:
+            return wrapped_function(self, *args, db_session=db_session, **kwargs)
+
+        db_session = self.make_session()
+
+        try:
+            return wrapped_function(self, *args, db_session=db_session, **kwargs)
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            db_session.close()
+
+    return decorator_function
+
+
+def sqlalchemy_generator_session(wrapped_function):
+    """
+    Decorator for creating, closeing and rolling back the sqlalchemy session of a generator function.
+    """
+    def decorator_function(self, *args, **kwargs):
+        db_session = kwargs.pop('db_session', None)
+        if db_session is not None:
+            yield from wrapped_function(self, *args, db_session=db_session, **kwargs)
+            return
+
+        db_session = self.make_session()
+
+        try:
+            yield from wrapped_function(self, *args, db_session=db_session, **kwargs)
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            db_session.close()
+
+    return decorator_function
+
+
+def get_transaction_session(db_session):
+    """
+    Get a session if it belongs to an agent transaction that has not ended, e.g. to load deferred params with later.
+
+    Args:
+        db_session: The session.
+
+    Returns:
+        The session, or None if it does not belong to a running transaction and a new session must be used.
+    """
+    return db_session if db_session.info.get(TRANSACTION_INFO_KEY, False) else None
+
+
+def commit_session(db_session):
+    """
+    Commit a session, or only flush it if it belongs to an agent transaction that commits when the transaction ends.
+
+    Args:
+        db_session: The session to commit.
+    """
+    if db_session.info.get(TRANSACTION_INFO_KEY, False):
+        db_session.flush()
+    else:
+        db_session.commit()
+
+
+def get_utc_now():
+    """
+    Get the current UTC time as a naive datetime, as stored in the instances.saved_at column.
+    """
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def get_saved_before(older_than):
+    """
+    Get the UTC time before which instances are older than a given age or time.
+
+    Args:
+        older_than: A timedelta of the age of the instances, or a datetime. Naive datetimes are taken as UTC.
+
+    Returns:
+        The UTC time as a naive datetime.
+    """
+    if isinstance(older_than, datetime.timedelta):
+        return get_utc_now() - older_than
+    if older_than.tzinfo is not None:
+        return older_than.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return older_than
+
+
+def delete_instance_rows(db_session, instance_condition, param_condition=None, cascade=False):
+    """
+    Delete instance rows and their param rows with one DELETE statement each, without loading them.
+
+    Args:
+        db_session: The session to execute the statements with.
+        instance_condition: The condition on the instances table of the rows to delete.
+        param_condition: The condition on the params table of the param rows to delete. Defaults to the param rows of
+            the instances that match instance_condition.
+        cascade: Whether to leave deleting the param rows to the "ON DELETE CASCADE" of the database.
+
+    Returns:
+        A dictionary of the number of deleted rows keyed by table name. The params count is None with cascade.
+    """
+    params_count = None
+    if not cascade:
+        if param_condition is None:
+            param_condition = ParamModel.instance_id.in_(select(InstanceModel.id).where(instance_condition))
+        params_count = db_session.execute(ParamModel.__table__.delete().where(param_condition)).rowcount
+    instances_count = db_session.execute(InstanceModel.__table__.delete().where(instance_condition)).rowcount
+
+    return {'instances': instances_count, 'params': params_count}
+
+
+def chunk_rows(rows, batch_size=None):
+    """
+    Split a list of rows into consecutive batches.
+
+    Args:
+        rows: The list of rows to split.
+        batch_size: The maximum number of rows in a batch. Defaults to all of them.
+
+    Returns:
+        A generator of lists of rows.
+    """
+    batch_size = batch_size or len(rows) or 1
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+def bulk_insert(db_session, table, rows, batch_size=None):
+    """
+    Insert rows into a table using executemany, optionally split into batches.
+
+    Args:
+        db_session: The session to execute the inserts with.
+        table: The table to insert the rows into.
+        rows: A list of dictionaries with the column values of each row.
+        batch_size: The maximum number of rows to insert with a single statement. Defaults to all of them.
+    """
+    if not rows:
+        return
+
+    for batch in chunk_rows(rows, batch_size):
+        db_session.execute(table.insert(), batch)
+
+
+def upsert(db_session, table, rows, index_elements):
+    """
+    Insert rows into a table, updating the rows that already exist, with "INSERT ... ON CONFLICT DO UPDATE".
+
+    Dialects without "ON CONFLICT" update each row and insert the rows that did not exist instead.
+
+    Args:
+        db_session: The session to execute the statements with.
+        table: The table to upsert the rows into.
+        rows: A list of dictionaries with the values of all the columns to write of each row.
+        index_elements: The names of the primary key columns that identify the rows.
+    """
+    if not rows:
+        return
+
+    update_columns = [x for x in rows[0] if x not in index_elements]
+    if not update_columns:
+        insert_missing(db_session, table, rows, index_elements)
+        return
+
+    dialect_name = db_session.get_bind().dialect.name
+    if dialect_name in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect_name == 'sqlite' else postgresql.insert
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements, set_={x: statement.excluded[x] for x in update_columns}
+        )
+        db_session.execute(statement, rows)
+        return
+
+    missing_rows = list()
+    for row in rows:
+        condition = [table.c[x] == row[x] for x in index_elements]
+        result = db_session.execute(table.update().where(*condition).values(**{x: row[x] for x in update_columns}))
+        if result.rowcount == 0:
+            missing_rows.append(row)
+    bulk_insert(db_session, table, missing_rows)
+
+
+def insert_missing(db_session, table, rows, index_elements):
+    """
+    Insert the rows into a table that do not exist yet, with "INSERT ... ON CONFLICT DO NOTHING".
+
+    Rows inserted by another session between checking and inserting are left alone instead of failing on the unique
+    constraint. Dialects without "ON CONFLICT" query each row and insert the rows that did not exist instead, which
+    can still fail if another session inserts the same rows concurrently.
+
+    Args:
+        db_session: The session to execute the statements with.
+        table: The table to insert the rows into.
+        rows: A list of dictionaries with the column values of each row.
+        index_elements: The names of the unique columns that identify the rows.
+    """
+    if not rows:
+        return
+
+    dialect_name = db_session.get_bind().dialect.name
+    if dialect_name in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect_name == 'sqlite' else postgresql.insert
+        db_session.execute(insert(table).on_conflict_do_nothing(index_elements=index_elements), rows)
+        return
+
+    missing_rows = list()
+    for row in rows:
+        condition = [table.c[x] == row[x] for x in index_elements]
+        if db_session.execute(select(table.c[index_elements[0]]).where(*condition)).first() is None:
+            missing_rows.append(row)
+    bulk_insert(db_session, table, missing_rows)
+
+
+def set_param_type_ids(db_session, param_rows):
+    """
+    Replace the type strings of param rows with the ids of their rows in the param types table, adding missing types.
+
+    Args:
+        db_session: The session to query and insert the param types with.
+        param_rows: A list of dictionaries with the column values of each param row and its type string as "type".
+    """
+    type_names = {x['type'] for x in param_rows}
+    if not type_names:
+        return
+
+    query = db_session.query(ParamTypeModel.name, ParamTypeModel.id)
+    type_ids = dict(query.filter(ParamTypeModel.name.in_(type_names)))
+    missing_type_names = type_names - type_ids.keys()
+    if missing_type_names:
+        insert_missing(db_session, ParamTypeModel.__table__, [{'name': x} for x in sorted(missing_type_names)],
+                       ['name'])
+        type_ids.update(query.filter(ParamTypeModel.name.in_(missing_type_names)))
+
+    for param_row in param_rows:
+        param_row['type_id'] = type_ids[param_row.pop('type')]
+
+
+def get_blob_hash(value, data=None):
+    """
+    Get the hash that identifies a param value in the blobs table.
+
+    Args:
+        value: The JSON serialized param value, or None if it is encoded by a codec.
+        data: The param value encoded by a codec, or None if it is JSON serialized.
+
+    Returns:
+        The SHA-256 hash of the value as a hex string.
+    """
+    if value is not None:
+        return hashlib.sha256(b'value:' + value.encode('utf-8')).hexdigest()
+    return hashlib.sha256(b'data:' + data).hexdigest()
+
+
+def set_blob_hashes(db_session, param_rows):
+    """
+    Move the values of param rows into the blobs table, inserting each distinct value once, and reference them by hash.
+
+    Args:
+        db_session: The session to query and insert the blobs with.
+        param_rows: A list of dictionaries with the column values of each param row.
+    """
+    blobs = dict()
+    for param_row in param_rows:
+        blob_hash = get_blob_hash(param_row['value'], param_row['data'])
+        blobs.setdefault(blob_hash, {'hash': blob_hash, 'value': param_row['value'], 'data': param_row['data']})
+        param_row.update(value=None, data=None, blob_hash=blob_hash)
+
+    existing_hashes = set()
+    for hashes in chunk_rows(list(blobs), MAX_IN_VALUES):
+        existing_hashes.update(x for x, in db_session.query(BlobModel.hash).filter(BlobModel.hash.in_(hashes)))
+
+    insert_missing(db_session, BlobModel.__table__, [x for x in blobs.values() if x['hash'] not in existing_hashes],
+                   ['hash'])
+
+
+def query_param_values(db_session, *columns):
+    """
+    Query the name, value and data columns of param rows, taking the value and data of deduplicated params from blobs.
+
+    Args:
+        db_session: The session to query with.
+        columns: Other columns to query before the name, value and data columns.
+
+    Returns:
+        The query.
+    """
+    return db_session.query(
+        *columns,
+        ParamModel.name,
+        func.coalesce(ParamModel.value, BlobModel.value).label('value'),
+        func.coalesce(ParamModel.data, BlobModel.data).label('data'),
+    ).outerjoin(BlobModel, ParamModel.blob_hash == BlobModel.hash)
+
+
+def get_serialized_size(rows):
+    """
+    Get the size of the serialized params in instance rows and param rows.
+
+    Args:
+        rows: A list of dictionaries with the column values of each row.
+
+    Returns:
+        The total length of the documents, values and encoded values of the rows.
+    """
+    size = 0
+    for row in rows:
+        serialized = row.get('document', None) or row.get('value', None) or row.get('data', None)
+        if serialized is not None:
+            size += len(serialized)
+    return size
+
+
+def get_instance_rows_statement(class_path=None, chunk_size=1000):
+    """
+    Get the statement that streams the instance rows joined with their param rows, ordered by instance.
+
+    Args:
+        class_path: The class path of the instances to select. Defaults to all classes.
+        chunk_size: The number of rows to fetch from the database at a time.
+
+    Returns:
+        The select statement, with one row per param or a single row for instances without param rows.
+    """
+    statement = select(
+        InstanceModel.id,
+        InstanceModel.class_path,
+        InstanceModel.document,
+        ParamModel.name,
+        func.coalesce(ParamModel.value, BlobModel.value).label('value'),
+        func.coalesce(ParamModel.data, BlobModel.data).label('data'),
+    ).select_from(InstanceModel). \
+        outerjoin(ParamModel, ParamModel.instance_id == InstanceModel.id). \
+        outerjoin(BlobModel, ParamModel.blob_hash == BlobModel.hash). \
+        order_by(InstanceModel.id). \
+        execution_options(stream_results=True, yield_per=chunk_size)
+
+    if class_path is not None:
+        statement = statement.where(InstanceModel.class_path == class_path)
+
+    return statement
+
+
+def get_param_condition(name, value, value_is_default=False):
+    """
+    Get the SQL condition that an instance has a param row with a JSON serialized value, for filtering instances.
+
+    Args:
+        name: The name of the param.
+        value: The JSON serialized param value.
+        value_is_default: Whether the value is the class default, so instances without a row for the param match too.
+
+    Returns:
+        The condition, correlated to the instances table.
+    """
+    matches = select(ParamModel.name).where(
+        ParamModel.instance_id == InstanceModel.id,
+        ParamModel.name == name,
+        or_(ParamModel.value == value, ParamModel.blob_hash == get_blob_hash(value)),
+    ).exists()
+    if not value_is_default:
+        return matches
+
+    missing = ~select(ParamModel.name). \
+        where(ParamModel.instance_id == InstanceModel.id, ParamModel.name == name).exists()
+    return or_(matches, missing)
+
+
+def match_document(serialized_data, serialized_where):
+    """
+    Check whether the serialized params of a document have the given param values.
+
+    Args:
+        serialized_data: A dictionary of the serialized param values of the document keyed by param name.
+        serialized_where: A dictionary of tuples of the JSON serialized param value and whether it is the class
+            default keyed by param name.
+
+    Returns:
+        True if the document has all the param values.
+    """
+    for name, (value, value_is_default) in serialized_where.items():
+        if name not in serialized_data:
+            if not value_is_default:
+                return False
+        elif serialized_data[name] != json.loads(value):
+            return False
+
+    return True
+
+
+def encode_document(serialized_data, compress=False):
+    """
+    Encode the serialized params of an instance into a document for the instances.document column.
+
+    Args:
+        serialized_data: A dictionary of the serialized param values keyed by param name.
+        compress: Whether to compress the document with zlib.
+
+    Returns:
+        The document as bytes.
+    """
+    document = json.dumps(serialized_data, separators=(',', ':')).encode('utf-8')
+    if compress:
+        document = zlib.compress(document)
+    return document
+
+
+def decode_document(document):
+    """
+    Decode a document from the instances.document column, whether it was compressed or not.
+
+    Args:
+        document: The document as bytes.
+
+    Returns:
+        A dictionary of the serialized param values keyed by param name.
+    """
+    if not document.startswith(b'{'):
+        document = zlib.decompress(document)
+    return json.loads(document)
+
+
+def get_rows_in_worker(agent_options, instances):
+    """
+    Get the rows of parameterized instances with a new agent without engine, in the worker of a process pool.
+
+    Args:
+        agent_options: A dictionary of the keyword arguments of the SqlAlchemyAgent that affect the rows.
+        instances: A list of parameterized instances.
+
+    Returns:
+        A list of tuples of the instance row and the list of param rows of each instance.
+    """
+    agent = SqlAlchemyAgent(None, **agent_options)
+    return [agent.get_rows_from_param_instance(x) for x in instances]
+
+
+def create_param_objects_in_worker(registered_classes, serialized_instances):
+    """
+    Create parameterized instances with a new agent without engine, in the worker of a process pool.
+
+    Args:
+        registered_classes: A list of the classes registered with the calling agent that the instances need.
+        serialized_instances: A list of tuples of the class path and serialized params of each instance.
+
+    Returns:
+        A list of the parameterized instances.
+    """
+    agent = SqlAlchemyAgent(None)
+    for parameterized_class in registered_classes:
+        agent.register(parameterized_class)
+    return [agent.create_param_object(*x) for x in serialized_instances]
+
+
+def map_chunks(executor, function, rows):
+    """
+    Call a function on consecutive chunks of rows in the workers of an executor.
+
+    Each chunk runs in a copy of the current context, so the instrumentation events of thread workers are reported
+    with the operation of the caller.
+
+    Args:
+        executor: A concurrent.futures executor.
+        function: The function to call on each list of rows. It returns a list of results.
+        rows: The list of rows.
+
+    Returns:
+        An iterator of the results of all chunks, in the same order as the rows.
+    """
+    chunks = list(chunk_rows(rows, EXECUTOR_CHUNK_SIZE))
+    if isinstance(executor, ProcessPoolExecutor):
+        results = executor.map(function, chunks)
+    else:
+        contexts = [contextvars.copy_context() for _ in chunks]
+        results = executor.map(lambda context, chunk: context.run(function, chunk), contexts, chunks)
+
+    return itertools.chain.from_iterable(results)
+
+
+class SqlAlchemyTransaction:
+    """
+    A unit of work of a SqlAlchemyAgent. The agent functions called on it share one session and commit together.
+    """
+
+    def __init__(self, agent, db_session):
+        """
+        The __init__ function for the SqlAlchemyTransaction.
+
+        Args:
+            agent: The agent of the transaction.
+            db_session: The session of the transaction.
+        """
+        self.agent = agent
+        self.db_session = db_session
+
+    def save(self, instance, **kwargs):
+        """
+        Save a parameterized instance in the transaction. See SqlAlchemyAgent.save.
+        """
+        return self.agent.save(instance, db_session=self.db_session, **kwargs)
+
+    def save_many(self, instances, **kwargs):
+        """
+        Save many parameterized instances in the transaction. See SqlAlchemyAgent.save_many.
+        """
+        return self.agent.save_many(instances, db_session=self.db_session, **kwargs)
+
+    def save_or_update(self, instance, instance_id=None, **kwargs):
+        """
+        Save or replace a parameterized instance in the transaction. See SqlAlchemyAgent.save_or_update.
+        """
+        return self.agent.save_or_update(instance, instance_id, db_session=self.db_session, **kwargs)
+
+    def load(self, instance_id, **kwargs):
+        """
+        Load a parameterized instance in the transaction. See SqlAlchemyAgent.load.
+        """
+        return self.agent.load(instance_id, db_session=self.db_session, **kwargs)
+
+    def load_many(self, instance_ids, **kwargs):
+        """
+        Load many parameterized instances in the transaction. See SqlAlchemyAgent.load_many.
+        """
+        return self.agent.load_many(instance_ids, db_session=self.db_session, **kwargs)
+
+    def iter_instances(self, **kwargs):
+        """
+        Iterate over the saved instances in the transaction. See SqlAlchemyAgent.iter_instances.
+        """
+        return self.agent.iter_instances(db_session=self.db_session, **kwargs)
+
+    def find(self, **kwargs):
+        """
+        Find the ids of saved instances in the transaction. See SqlAlchemyAgent.find.
+        """
+        return self.agent.find(db_session=self.db_session, **kwargs)
+
+    def delete(self, instance_id, **kwargs):
+        """
+        Delete a parameterized instance in the transaction. See SqlAlchemyAgent.delete.
+        """
+        return self.agent.delete(instance_id, db_session=self.db_session, **kwargs)
+
+    def delete_many(self, instance_ids, **kwargs):
+        """
+        Delete many parameterized instances in the transaction. See SqlAlchemyAgent.delete_many.
+        """
+        return self.agent.delete_many(instance_ids, db_session=self.db_session, **kwargs)
+
+    def purge(self, **kwargs):
+        """
+        Delete the instances of a class or saved before a time in the transaction. See SqlAlchemyAgent.purge.
+        """
+        return self.agent.purge(db_session=self.db_session, **kwargs)
+
+    def update(self, instance, instance_id, **kwargs):
+        """
+        Update a parameterized instance in the transaction. See SqlAlchemyAgent.update.
+        """
+        return self.agent.update(instance, instance_id, db_session=self.db_session, **kwargs)
+
+
+class SqlAlchemyAgent(AgentBase):
+    """
+    An agent for persisting parameterized objects to SQL databases.
+
+    Instances are saved with one row per param in the params table, or with "document" storage as a single document in
+    the instances table. Instances are loaded the same way regardless of which storage they were saved with.
+    """
+
+    def __init__(self, engine, storage=PARAMS_STORAGE, compress=False, cache=None, track_changes=False, codecs=None,
+                 dedup=False, skip_defaults=False):
+        """
+        The __init__ function for the the SqlAlchemyAgent.
+
+        Args:
+            engine: the engine to use for persisting.
+            storage: Where to save the params of the instances, either "params" or "document".
+            compress: Whether to compress the documents with zlib when using "document" storage.
+            cache: An optional InstanceCache to serve repeated loads from. The agent invalidates it on update and
+                delete, so it must not be shared with other writers of the database.
+            track_changes: Whether to watch the params of saved and loaded instances, so that update only serializes
+                and writes the params that were assigned since. Params changed in place must be marked with
+                "mark_dirty".
+            codecs: An optional dictionary of codecs keyed by param type string, e.g. from "default_codecs", to store
+                the values of those params in binary form with "params" storage instead of as JSON.
+            dedup: Whether to store each distinct param value once in the blobs table with "params" storage, with the
+                param rows referencing it by hash. Blobs are never deleted with the params, see "delete_unused_blobs".
+            skip_defaults: Whether to leave out the params that are at the default value of their class, so they
+                load with the default of the class at load time.
+        """
+        if storage not in (PARAMS_STORAGE, DOCUMENT_STORAGE):
+            raise ValueError(f'Storage must be "{PARAMS_STORAGE}" or "{DOCUMENT_STORAGE}".'
+                             f' Given storage is "{storage}"')
+
+        super().__init__(engine)
+        self.storage = storage
+        self.compress = compress
+        self.cache = cache
+        self.change_tracker = ChangeTracker() if track_changes else None
+        self.codecs = codecs or dict()
+        self.dedup = dedup
+        self.skip_defaults = skip_defaults
+        self.make_session = sessionmaker(bind=self.engine)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run many agent functions as one unit of work that uses a single session and commits once at the end.
+
+        Everything done in the transaction is rolled back if an exception is raised in it. Example:
+
+            with agent.transaction() as tx:
+                instance_id = tx.save(instance)
+                tx.update(other_instance, other_id)
+
+        Yields:
+            The SqlAlchemyTransaction to call the agent functions on.
+        """
         db_session = self.make_session()
+        self.start_transaction(db_session)
+
+        try:
+            yield SqlAlchemyTransaction(self, db_session)
+            db_session.commit()
+            self.end_transaction(db_session, committed=True)
+        except Exception:
+            db_session.rollback()
+            self.end_transaction(db_session, committed=False)
+            raise
+        finally:
+            db_session.close()
+
+    @staticmethod
+    def start_transaction(db_session):
+        """
+        Mark a session as the session of a transaction, which only flushes until the transaction commits.
+
+        Args:
+            db_session: The session of the transaction.
+        """
+        db_session.info[TRANSACTION_INFO_KEY] = True
+        db_session.info[TRACKED_INSTANCES_INFO_KEY] = list()
+        db_session.info[WRITTEN_IDS_INFO_KEY] = set()
+
+    def end_transaction(self, db_session, committed):
+        """
+        Invalidate the instances written in a transaction once it ended, and untrack instances if it rolled back.
+
+        Loads from other sessions may have cached the committed data of the instances while the transaction was
+        running. Loads in the transaction do not use the cache.
+
+        Args:
+            db_session: The session of the transaction.
+            committed: Whether the transaction committed.
+        """
+        written_ids = db_session.info.pop(WRITTEN_IDS_INFO_KEY, None) or set()
+        if self.cache is not None:
+            if None in written_ids:
+                self.cache.clear()
+            else:
+                for instance_id in written_ids:
+                    self.cache.invalidate(instance_id)
+
+        if not committed:
+            self.untrack_instances(db_session)
+        db_session.info.pop(TRANSACTION_INFO_KEY, None)
+
+    def invalidate_cache(self, db_session, instance_ids=None):
+        """
+        Remove written instances from the cache of the agent, and again when the transaction of the session ends.
+
+        Args:
+            db_session: The session the instances were written with.
+            instance_ids: An iterable of the ids of the instances. Defaults to all the instances.
+        """
+        written_ids = db_session.info.get(WRITTEN_IDS_INFO_KEY, None)
+        if self.cache is None and written_ids is None:
+            return
+
+        instance_ids = [None] if instance_ids is None else list(instance_ids)
+        if written_ids is not None:
+            written_ids.update(instance_ids)
+        if self.cache is not None:
+            if None in instance_ids:
+                self.cache.clear()
+            else:
+                for instance_id in instance_ids:
+                    self.cache.invalidate(instance_id)
+
+    def mark_dirty(self, instance, *param_names):
+        """
+        Mark params of an instance as changed so the next update writes them, e.g. after changing a list in place.
+
+        Args:
+            instance: The parameterized instance.
+            param_names: The names of the params that changed.
+        """
+        if self.change_tracker is not None:
+            self.change_tracker.mark_dirty(instance, *param_names)
+
+    def track_instance(self, instance, instance_id, db_session=None):
+        """
+        Start tracking the changes of an instance saved or loaded with an id, if the agent tracks changes.
+
+        Args:
+            instance: The parameterized instance.
+            instance_id: The id the instance was saved or loaded with.
+            db_session: The session the instance was saved or loaded with. If it belongs to a transaction, the
+                instance is untracked when the transaction rolls back.
+
+        Returns:
+            The parameterized instance.
+        """
+        if self.change_tracker is not None and instance is not None:
+            self.change_tracker.track(instance, instance_id)
+            self.untrack_on_rollback(db_session, instance)
+        return instance
+
+    @staticmethod
+    def untrack_on_rollback(db_session, instance):
+        """
+        Remember an instance whose tracking changed in a transaction, to untrack it if the transaction rolls back.
+
+        Args:
+            db_session: The session of the change, or None. Sessions outside of a transaction are ignored.
+            instance: The parameterized instance.
+        """
+        tracked_instances = None if db_session is None else db_session.info.get(TRACKED_INSTANCES_INFO_KEY, None)
+        if tracked_instances is not None:
+            tracked_instances.append(instance)
+
+    def untrack_instances(self, db_session):
+        """
+        Untrack the instances whose tracking changed in a transaction that rolled back, so updates write all params.
+
+        Args:
+            db_session: The session of the transaction.
+        """
+        tracked_instances = db_session.info.pop(TRACKED_INSTANCES_INFO_KEY, None) or list()
+        if self.change_tracker is not None:
+            for instance in tracked_instances:
+                self.change_tracker.untrack(instance)
+
+    @sqlalchemy_session
+    @instrumented
+    def save(self, instance, **kwargs):
+        """
+        Save a parameterized instance to a sqlalchemy database.
+
+        Args:
+            instance: The parameterized instance to be saved to the database.
+
+        Returns:
+            The id of the row in the database corresponding to the parameterized instance.
+        """
+        db_session = kwargs.get('db_session', None)
+
+        start = self.start_phase()
+        instance_row, param_rows = self.get_rows_from_param_instance(instance)
+        param_count, size = self.end_serialize_phase(start, [instance_row], param_rows)
+
+        start = self.start_phase()
+        set_param_type_ids(db_session, param_rows)
+        if self.dedup:
+            set_blob_hashes(db_session, param_rows)
+        bulk_insert(db_session, InstanceModel.__table__, [instance_row])
+        bulk_insert(db_session, ParamModel.__table__, param_rows)
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE, param_count, size)
+        self.invalidate_cache(db_session, [instance_row['id']])
+        self.track_instance(instance, instance_row['id'], db_session)
+
+        return instance_row['id']
+
+    @sqlalchemy_session
+    @instrumented
+    def save_or_update(self, instance, instance_id=None, **kwargs):
+        """
+        Save a parameterized instance with the given id, replacing the instance saved with that id if there is one.
+
+        The instance row and the param rows are written with "INSERT ... ON CONFLICT DO UPDATE" on SQLite and
+        PostgreSQL, and the params the instance no longer has are deleted, in a single transaction. Saving the same
+        instance with the same id again leaves the database unchanged, so callers can retry saves.
+
+        Args:
+            instance: The parameterized instance to save.
+            instance_id: The id to save the instance with, at most 36 characters. Defaults to a new uuid.
+
+        Returns:
+            The id of the instance.
+        """
+        db_session = kwargs.get('db_session', None)
+
+        start = self.start_phase()
+        instance_row, param_rows = self.get_rows_from_param_instance(instance, instance_id)
+        param_count, size = self.end_serialize_phase(start, [instance_row], param_rows)
+
+        start = self.start_phase()
+        set_param_type_ids(db_session, param_rows)
+        if self.dedup:
+            set_blob_hashes(db_session, param_rows)
+        upsert(db_session, InstanceModel.__table__, [{'document': None, **instance_row}], ['id'])
+        stale_params = ParamModel.__table__.delete().where(ParamModel.instance_id == instance_row['id'])
+        if param_rows:
+            stale_params = stale_params.where(ParamModel.name.notin_([x['name'] for x in param_rows]))
+        db_session.execute(stale_params)
+        upsert(db_session, ParamModel.__table__, param_rows, ['instance_id', 'name'])
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE, param_count, size)
+        self.invalidate_cache(db_session, [instance_row['id']])
+        self.track_instance(instance, instance_row['id'], db_session)
+
+        return instance_row['id']
+
+    @sqlalchemy_session
+    @instrumented
+    def save_many(self, instances, batch_size=None, executor=None, **kwargs):
+        """
+        Save many parameterized instances to a sqlalchemy database in a single transaction.
+
+        All instances are serialized before anything is written. The rows are then written with bulk inserts.
+
+        Args:
+            instances: An iterable of parameterized instances to be saved to the database.
+            batch_size: The maximum number of rows to send in a single insert statement. Defaults to all of them.
+            executor: An optional concurrent.futures executor to serialize the instances in, in chunks. The rows are
+                still written by the calling thread. Thread workers use this agent. With a ProcessPoolExecutor the
+                instances and codecs must be picklable.
+
+        Returns:
+            A list of the ids of the rows in the database, in the same order as the given instances.
+        """
+        db_session = kwargs.get('db_session', None)
+
+        start = self.start_phase()
+        instance_rows = list()
+        param_rows = list()
+        instances = list(instances)
+        if executor is None:
+            rows = self.get_rows_from_param_instances(instances)
+        elif isinstance(executor, ProcessPoolExecutor):
+            rows = map_chunks(executor, partial(get_rows_in_worker, self.get_serialization_options()), instances)
+        else:
+            rows = map_chunks(executor, self.get_rows_from_param_instances, instances)
+
+        for instance_row, instance_param_rows in rows:
+            instance_rows.append(instance_row)
+            param_rows.extend(instance_param_rows)
+        param_count, size = self.end_serialize_phase(start, instance_rows, param_rows)
+
+        start = self.start_phase()
+        set_param_type_ids(db_session, param_rows)
+        if self.dedup:
+            set_blob_hashes(db_session, param_rows)
+        bulk_insert(db_session, InstanceModel.__table__, instance_rows, batch_size)
+        bulk_insert(db_session, ParamModel.__table__, param_rows, batch_size)
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE, param_count, size)
+        self.invalidate_cache(db_session, [x['id'] for x in instance_rows])
+        for instance, instance_row in zip(instances, instance_rows):
+            self.track_instance(instance, instance_row['id'], db_session)
+
+        return [x['id'] for x in instance_rows]
+
+    @sqlalchemy_session
+    @instrumented
+    def load(self, instance_id, params=None, lazy_params=None, **kwargs):
+        """
+        Load a parameterized instance from the database.
+
+        Args:
+            instance_id: The id corresponding to the row in the database for the parameterized instance to load.
+            params: The names of the params to load now. The other params are loaded when they are first accessed,
+                like lazy_params, so the instance can be updated or saved like a fully loaded one. Defaults to all of
+                them.
+            lazy_params: The names of params to load only when they are first accessed on the instance. With
+                "params" storage they are queried on first access, with the session of the transaction if the
+                instance was loaded in one that is still running, else with their own session. Accessing them raises
+                a RuntimeError if the instance was deleted since. With "document" storage the document is read at once
+                but they are only deserialized on first access. Updating or saving the instance loads the params it
+                serializes first.
+
+        Returns:
+            The parameterized instance populated from the database.
+        """
+        db_session = kwargs.get('db_session', None)
+        cache = self.get_session_cache(db_session)
+        if cache is not None:
+            cached = cache.get(instance_id)
+            if cached is not None:
+                class_path, serialized_data = cached
+                if params is not None or lazy_params:
+                    param_object = self.create_partial_param_object(class_path, dict(serialized_data), params,
+                                                                    lazy_params)
+                else:
+                    param_object = self.create_param_object(class_path, serialized_data)
+                return self.track_instance(param_object, instance_id, db_session)
+
+        start = self.start_phase()
+        instance_model = db_session.query(InstanceModel).filter_by(id=instance_id).first()
+
+        if params is not None or lazy_params:
+            self.end_phase(start, DB_READ)
+            param_object = self.load_partial(db_session, instance_model, params, lazy_params)
+            return self.track_instance(param_object, instance_id, db_session)
+
+        param_models = list()
+        if instance_model is None or instance_model.document is None:
+            param_models = query_param_values(db_session).filter(ParamModel.instance_id == instance_id).all()
+            self.end_phase(start, DB_READ, len(param_models))
+        else:
+            self.end_phase(start, DB_READ)
+
+        # Serialize data from the models
+        param_model_serialized_data = self.get_serialized_data_from_models(instance_model, param_models, cache)
+
+        # Create the param object from the data
+        param_object = self.create_param_object(instance_model.class_path, param_model_serialized_data)
+
+        return self.track_instance(param_object, instance_id, db_session)
+
+    def load_partial(self, db_session, instance_model, params=None, lazy_params=None):
+        """
+        Load some of the params of a parameterized instance now and defer others until they are first accessed.
+
+        Partially loaded instances are not added to the cache of the agent.
+
+        Args:
+            db_session: The session to query the params with.
+            instance_model: The instance model of the parameterized instance.
+            params: The names of the params to load now, the others are deferred. Defaults to all of them.
+            lazy_params: The names of the params to defer.
+
+        Returns:
+            The parameterized instance.
+        """
+        if instance_model.document is not None:
+            return self.create_partial_param_object(instance_model.class_path,
+                                                    decode_document(instance_model.document), params, lazy_params)
+
+        deferred_params = self.get_deferred_param_names(instance_model.class_path, params, lazy_params)
+        query = query_param_values(db_session).filter(ParamModel.instance_id == instance_model.id)
+        if params is not None:
+            query = query.filter(ParamModel.name.in_(sorted(set(params) - deferred_params)))
+        elif deferred_params:
+            query = query.filter(ParamModel.name.notin_(sorted(deferred_params)))
+        serialized_data = self.load_serialized_data_from_param_model(query)
+        instance_id = instance_model.id
+
+        param_object = self.create_param_object(instance_model.class_path, serialized_data)
+        param_class_info = self.get_param_class_info_from_path(instance_model.class_path)
+
+        return make_lazy(param_object, deferred_params,
+                         lambda x: param_class_info.deserialize(self.load_serialized_params(
+                             instance_id, x, db_session=get_transaction_session(db_session)
+                         )))
+
+    def create_partial_param_object(self, class_path, serialized_data, params=None, lazy_params=None):
+        """
+        Create a parameterized instance from all its serialized params, deserializing some of them on first access.
+
+        Args:
+            class_path: The class path of the parameterized instance.
+            serialized_data: A dictionary of the serialized param values keyed by param name. It is modified.
+            params: The names of the params to deserialize now, the others are deferred. Defaults to all of them.
+            lazy_params: The names of the params to defer.
+
+        Returns:
+            The parameterized instance.
+        """
+        deferred_params = self.get_deferred_param_names(class_path, params, lazy_params)
+        lazy_data = {key: serialized_data.pop(key) for key in deferred_params if key in serialized_data}
+
+        param_object = self.create_param_object(class_path, serialized_data)
+        param_class_info = self.get_param_class_info_from_path(class_path)
+
+        return make_lazy(param_object, deferred_params,
+                         lambda x: param_class_info.deserialize({key: lazy_data[key] for key in x if key in lazy_data}))
+
+    def get_deferred_param_names(self, class_path, params=None, lazy_params=None):
+        """
+        Get the names of the params to defer when loading some params of an instance now.
+
+        Args:
+            class_path: The class path of the parameterized instance.
+            params: The names of the params to load now, the others are deferred. Defaults to all of them.
+            lazy_params: The names of the params to defer.
+
+        Returns:
+            A set of param names.
+        """
+        deferred_params = set(lazy_params or ())
+        if params is not None:
+            param_names = self.get_param_class_info_from_path(class_path).param_names
+            deferred_params.update(x for x in param_names if x not in params)
+
+        return deferred_params
+
+    @sqlalchemy_session
+    @instrumented
+    def load_serialized_params(self, instance_id, param_names, **kwargs):
+        """
+        Load the serialized values of some of the params of a parameterized instance from its param rows or document.
 
-        try:
-            return wrapped_function(self, *args, db_session=db_session, **kwargs)
-        except Exception:
-            db_session.rollback()
-            raise
-        finally:
-            db_session.close()
+        Args:
+            instance_id: The id of the parameterized instance in the database.
+            param_names: The names of the params to load.
 
-    return decorator_function
+        Returns:
+            A dictionary of the serialized param values keyed by param name. Params without a value in the database,
+            e.g. left out by "skip_defaults", are not in it.
+
+        Raises:
+            RuntimeError: If the instance does not exist.
+        """
+        db_session = kwargs.get('db_session', None)
+        instance_model = db_session.query(InstanceModel).get(instance_id)
+        if instance_model is None:
+            raise RuntimeError(f'Parameterized instance with id "{instance_id}" does not exist.')
+        if instance_model.document is not None:
+            serialized_data = decode_document(instance_model.document)
+            return {key: serialized_data[key] for key in param_names if key in serialized_data}
 
+        query = query_param_values(db_session). \
+            filter(ParamModel.instance_id == instance_id). \
+            filter(ParamModel.name.in_(param_names))
 
-class SqlAlchemyAgent(AgentBase):
-    """
-    An agent for persisting parameterized objects to SQL databases.
-    """
+        return self.load_serialized_data_from_param_model(query)
 
-    def __init__(self, engine):
+    @sqlalchemy_session
+    def exists(self, instance_id, **kwargs):
         """
-        The __init__ function for the the SqlAlchemyAgent.
+        Check whether a parameterized instance exists in the database by querying its id only.
+
+        Args:
+            instance_id: The id of the parameterized instance.
+
+        Returns:
+            True if the instance exists, else False.
         """
-        super().__init__(engine)
-        self.make_session = sessionmaker(bind=self.engine)
+        db_session = kwargs.get('db_session', None)
+        return db_session.query(InstanceModel.id).filter_by(id=instance_id).first() is not None
 
     @sqlalchemy_session
-    def save(self, instance, **kwargs):
+    @instrumented
+    def load_many(self, instance_ids, batch_size=None, executor=None, **kwargs):
         """
-        Save a parameterized instance to a sqlalchemy database.
+        Load many parameterized instances from the database using one query for the instances and one for the params.
+
+        The params query is skipped when all the instances were saved with "document" storage. Instances in the
+        cache of the agent are not queried.
 
         Args:
-            instance: The parameterized instance to be saved to the database.
+            instance_ids: An iterable of the ids of the parameterized instances to load.
+            batch_size: The maximum number of ids to put in a single query. Defaults to all of them.
+            executor: An optional concurrent.futures executor to create the parameterized instances in, in chunks.
+                Thread workers use this agent. With a ProcessPoolExecutor the registered classes are sent to the
+                workers and the instances are pickled back to the calling process.
 
         Returns:
-            The id of the row in the database corresponding to the parameterized instance.
+            A dictionary of the loaded parameterized instances keyed by id, in the same order as the given ids.
+            Ids that do not exist in the database map to None.
         """
         db_session = kwargs.get('db_session', None)
+        instance_ids = list(dict.fromkeys(instance_ids))
 
-        # Serialize data using param JSONSerialization class
-        serialized_param = self.get_serialized_param(instance)
+        cache = self.get_session_cache(db_session)
+        cached_instances = self.get_cached_instances(instance_ids, cache)
 
-        # Remove name since we don't need it
-        serialized_param.pop('name')
+        missing_ids = [x for x in instance_ids if x not in cached_instances]
+        instance_models, param_models_by_instance = self.query_instance_models(db_session, missing_ids, batch_size)
 
-        # Get class path and uuid to save in InstanceModel
-        class_path = self.get_class_path_from_param_instance(instance)
-        new_instance_uuid = uuid.uuid4()
-        new_instance = InstanceModel(id=str(new_instance_uuid), class_path=class_path)
-        db_session.add(new_instance)
+        serialized_instances = dict()
+        for instance_id in instance_ids:
+            if instance_id in cached_instances:
+                serialized_instances[instance_id] = cached_instances[instance_id]
+                continue
 
-        param_models = list()
-        for key, value in serialized_param.items():
-            param_models.append(ParamModel(id=(str(uuid.uuid4())),
-                                           value=json.dumps({'name': key, 'value': value,
-                                                             'type': self.get_type_from_param_instance(instance, key)}),
-                                           instance_id=str(new_instance_uuid)))
+            instance_model = instance_models.get(instance_id, None)
+            if instance_model is None:
+                log.warning(f'unable to query database with given instance id. id="{instance_id}"')
+                serialized_instances[instance_id] = None
+                continue
 
-        for p in param_models:
-            db_session.add(p)
-        db_session.commit()
+            param_model_serialized_data = self.get_serialized_data_from_models(
+                instance_model, param_models_by_instance[instance_id], cache
+            )
+            serialized_instances[instance_id] = (instance_model.class_path, param_model_serialized_data)
+
+        instances = self.create_param_objects(serialized_instances, executor)
+        for instance_id, instance in instances.items():
+            self.track_instance(instance, instance_id, db_session)
+
+        return instances
+
+    def query_instance_models(self, db_session, instance_ids, batch_size=None):
+        """
+        Query the instance models of many instances and the param models of those saved with "params" storage.
+
+        Args:
+            db_session: The session to query with.
+            instance_ids: A list of the ids of the instances.
+            batch_size: The maximum number of ids to put in a single query. Defaults to all of them.
+
+        Returns:
+            A tuple of a dictionary of the instance models keyed by id and a dictionary of lists of the param models
+            keyed by instance id. Ids that do not exist in the database are left out.
+        """
+        start = self.start_phase()
+        instance_models = dict()
+        param_models_by_instance = defaultdict(list)
+        for ids in chunk_rows(instance_ids, batch_size):
+            param_ids = list()
+            for instance_model in db_session.query(InstanceModel).filter(InstanceModel.id.in_(ids)):
+                instance_models[instance_model.id] = instance_model
+                if instance_model.document is None:
+                    param_ids.append(instance_model.id)
+            if not param_ids:
+                continue
+            query = query_param_values(db_session, ParamModel.instance_id)
+            for param_model in query.filter(ParamModel.instance_id.in_(param_ids)):
+                param_models_by_instance[param_model.instance_id].append(param_model)
+        if start is not None:
+            self.end_phase(start, DB_READ, sum(len(x) for x in param_models_by_instance.values()))
 
-        return str(new_instance_uuid)
+        return instance_models, param_models_by_instance
 
     @sqlalchemy_session
-    def load(self, instance_id, **kwargs):
+    def iter_instances(self, class_path=None, chunk_size=1000, raw=False, **kwargs):
         """
-        Load a parameterized instance from the database.
+        Iterate over the saved instances, streaming the rows of the instances and their params in chunks.
+
+        The rows are fetched with a server-side cursor where the database driver supports one, so the memory used does
+        not grow with the number of instances. The session stays open until the iteration ends or the iterator is
+        closed. Instances are not added to the cache of the agent.
 
         Args:
-            instance_id: The id corresponding to the row in the database for the parameterized instance to load.
+            class_path: The class path of the instances to iterate over. Defaults to all classes.
+            chunk_size: The number of rows to fetch from the database at a time.
+            raw: Whether to yield the serialized params of the instances instead of parameterized instances.
+
+        Yields:
+            Tuples of the instance id and the parameterized instance, ordered by id. With "raw" the parameterized
+            instance is replaced by a dictionary of its "class_path" and its serialized "params".
+        """
+        db_session = kwargs.get('db_session', None)
+        rows = db_session.execute(get_instance_rows_statement(class_path, chunk_size))
+
+        for instance_id, instance_rows in itertools.groupby(rows, key=lambda x: x.id):
+            yield instance_id, self.create_from_instance_rows(list(instance_rows), raw)
+
+    def create_from_instance_rows(self, instance_rows, raw=False):
+        """
+        Create a parameterized instance from its rows of the statement of get_instance_rows_statement.
+
+        Args:
+            instance_rows: The rows of the instance.
+            raw: Whether to return the serialized params of the instance instead of a parameterized instance.
 
         Returns:
-            The parameterized instance populated from the database.
+            The parameterized instance, or with "raw" a dictionary of its "class_path" and its serialized "params".
+        """
+        instance_row = instance_rows[0]
+        if instance_row.document is not None:
+            serialized_data = decode_document(instance_row.document)
+        else:
+            param_rows = [x for x in instance_rows if x.name is not None]
+            serialized_data = self.load_serialized_data_from_param_model(param_rows)
+
+        if raw:
+            serialized_data = {key: value.value if isinstance(value, DecodedValue) else value
+                               for key, value in serialized_data.items()}
+            return {'class_path': instance_row.class_path, 'params': serialized_data}
+
+        param_object = self.create_param_object(instance_row.class_path, serialized_data)
+        return self.track_instance(param_object, instance_row.id)
+
+    @sqlalchemy_session
+    @instrumented
+    def find(self, class_path=None, where=None, limit=None, offset=None, **kwargs):
+        """
+        Find the ids of saved instances by class path and param values, without loading the instances.
+
+        The filters run in SQL for instances saved with "params" storage. Documents cannot be filtered in SQL, so when
+        instances saved with "document" storage could match, they are decoded and filtered in python together with the
+        limit and offset.
+
+        Args:
+            class_path: The class path of the instances to find, as returned by get_class_path_from_param_class.
+                Defaults to all classes.
+            where: A dictionary of param values keyed by param name that the instances must have. Values are compared
+                by their JSON serialization, so params stored by a codec never match.
+            limit: The maximum number of ids to return. Defaults to all of them.
+            offset: The number of matching ids to skip.
+
+        Returns:
+            A list of the ids of the matching instances, ordered by id.
         """
         db_session = kwargs.get('db_session', None)
-        instance_model = db_session.query(InstanceModel).filter_by(id=instance_id).first()
-        param_models = db_session.query(ParamModel).filter_by(instance_id=instance_id)
+        serialized_where = self.get_serialized_where(class_path, where or dict())
+
+        query = db_session.query(InstanceModel.id).order_by(InstanceModel.id)
+        if class_path is not None:
+            query = query.filter(InstanceModel.class_path == class_path)
+        if not serialized_where:
+            return [x for x, in query.limit(limit).offset(offset)]
+
+        conditions = [get_param_condition(name, *value) for name, value in serialized_where.items()]
+        params_query = query.filter(InstanceModel.document.is_(None), *conditions)
+        document_query = query.filter(InstanceModel.document.isnot(None))
+        if not db_session.query(document_query.exists()).scalar():
+            return [x for x, in params_query.limit(limit).offset(offset)]
 
-        # Serialize data from param model
-        param_model_serialized_data = self.load_serialized_data_from_param_model(param_models)
+        instance_ids = {x for x, in params_query}
+        for instance_id, document in document_query.add_columns(InstanceModel.document):
+            if match_document(decode_document(document), serialized_where):
+                instance_ids.add(instance_id)
 
-        # Getting param_object
-        param_object = self.get_param_object_from_instance(instance_model)
+        instance_ids = sorted(instance_ids)[offset or 0:]
+        return instance_ids if limit is None else instance_ids[:limit]
 
-        # Update param object with new data
-        new_instance = self.update_param_object(param_object, param_model_serialized_data)
+    def get_serialized_where(self, class_path, where):
+        """
+        Serialize the param values to find instances by, with the serializers of their class if it is importable.
+
+        Args:
+            class_path: The class path of the instances, or None for all classes.
+            where: A dictionary of param values keyed by param name.
+
+        Returns:
+            A dictionary of tuples of the JSON serialized param value and whether it is the class default keyed by
+            param name.
+        """
+        param_class_info = None
+        if class_path is not None and where:
+            try:
+                param_class_info = self.get_param_class_info_from_path(class_path)
+            except RuntimeError:
+                log.warning(f'unable to import the class to serialize the param values with. class_path="{class_path}"')
 
-        return new_instance
+        serialized_where = dict()
+        for name, value in where.items():
+            if param_class_info is not None and name in param_class_info.serializers:
+                serialized_where[name] = (json.dumps(param_class_info.serializers[name](value)),
+                                          is_default(value, param_class_info.defaults[name]))
+            else:
+                serialized_where[name] = (json.dumps(value), False)
+
+        return serialized_where
 
     @sqlalchemy_session
+    @instrumented
     def delete(self, instance_id, **kwargs):
         """
         Delete a parameterized instance and its params from the database.
@@ -119,18 +1315,106 @@ class SqlAlchemyAgent(AgentBase):
         """
         db_session = kwargs.get('db_session', None)
 
-        instance_model = db_session.query(InstanceModel).get(instance_id)
-        if instance_model is None:
+        start = self.start_phase()
+        counts = delete_instance_rows(db_session, InstanceModel.id == instance_id,
+                                      ParamModel.instance_id == instance_id)
+        if not counts['instances']:
+            self.invalidate_cache(db_session, [instance_id])
             log.warning(f'unable to query database with given instance id. id="{instance_id}"')
             return
-        db_session.delete(instance_model)
-        db_session.commit()
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE, counts['params'])
+        self.invalidate_cache(db_session, [instance_id])
+
+    @sqlalchemy_session
+    @instrumented
+    def delete_many(self, instance_ids, batch_size=None, cascade=False, **kwargs):
+        """
+        Delete many parameterized instances and their params with set based DELETE statements, in one transaction.
+
+        Nothing is loaded into the session, so the cost does not grow with the number of params held in memory.
+
+        Args:
+            instance_ids: An iterable of the ids of the parameterized instances to delete. Ids that do not exist are
+                ignored.
+            batch_size: The maximum number of ids to put in a single statement. Defaults to MAX_IN_VALUES.
+            cascade: Whether to only delete the instance rows and leave deleting the param rows to the
+                "ON DELETE CASCADE" of params.instance_id. Databases at schema version 8 or older must be upgraded
+                first, and SQLite only enforces it with "PRAGMA foreign_keys=ON".
+
+        Returns:
+            A dictionary of the number of deleted "instances" and "params" rows. The params count is None with
+            cascade.
+        """
+        db_session = kwargs.get('db_session', None)
+        instance_ids = list(dict.fromkeys(instance_ids))
+
+        start = self.start_phase()
+        counts = {'instances': 0, 'params': None if cascade else 0}
+        for ids in chunk_rows(instance_ids, batch_size or MAX_IN_VALUES):
+            chunk_counts = delete_instance_rows(db_session, InstanceModel.id.in_(ids), ParamModel.instance_id.in_(ids),
+                                                cascade)
+            counts['instances'] += chunk_counts['instances']
+            if not cascade:
+                counts['params'] += chunk_counts['params']
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE, counts['params'])
+        self.invalidate_cache(db_session, instance_ids)
+
+        return counts
+
+    @sqlalchemy_session
+    @instrumented
+    def purge(self, class_path=None, older_than=None, cascade=False, **kwargs):
+        """
+        Delete all the instances of a class, or saved before a time, with set based DELETE statements.
+
+        Args:
+            class_path: The class path of the instances to delete, as returned by get_class_path_from_param_class.
+            older_than: A timedelta or datetime. The instances last saved or updated with changes longer ago or
+                before it are deleted.
+            cascade: Whether to leave deleting the param rows to the "ON DELETE CASCADE" of the database. See
+                delete_many.
+
+        Returns:
+            A dictionary of the number of deleted "instances" and "params" rows. The params count is None with
+            cascade.
+        """
+        if class_path is None and older_than is None:
+            raise ValueError('At least one of "class_path" and "older_than" must be given to purge instances.')
+
+        conditions = list()
+        if class_path is not None:
+            conditions.append(InstanceModel.class_path == class_path)
+        if older_than is not None:
+            conditions.append(InstanceModel.saved_at < get_saved_before(older_than))
+
+        db_session = kwargs.get('db_session', None)
+
+        start = self.start_phase()
+        instance_condition = conditions[0] if len(conditions) == 1 else conditions[0] & conditions[1]
+        counts = delete_instance_rows(db_session, instance_condition, cascade=cascade)
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE, counts['params'])
+        self.invalidate_cache(db_session)
+
+        return counts
 
     @sqlalchemy_session
+    @instrumented
     def update(self, instance, instance_id, **kwargs):
         """
         Update the rows in the database for a parameterized instance.
 
+        Only the differences are written: one bulk update for the params whose value changed, one bulk insert for the
+        params that are not in the database yet and one bulk delete for the params that no longer exist on the
+        instance. With "document" storage the document is rewritten as a whole. Nothing is written when no param
+        changed. Instances saved with the other storage are converted to the storage of the agent. Writing any change
+        also sets the saved time of the instance used by purge.
+
+        When the agent tracks changes and the instance was saved or loaded with the same id, only the params assigned
+        since are serialized and written, and only the existence of the instance is queried when none were.
+
         Args:
             instance: The parameterized instance to update from.
             instance_id: The id of the parameterized instance in the database to update.
@@ -138,35 +1422,426 @@ class SqlAlchemyAgent(AgentBase):
         Returns:
             The parameterized instance id.
         """
+        param_names = None
+        if self.change_tracker is not None:
+            param_names = self.change_tracker.get_dirty_param_names(instance, instance_id)
+
         db_session = kwargs.get('db_session', None)
-        instance_model = db_session.query(InstanceModel).get(instance_id)
+        start = self.start_phase()
+        if param_names is not None and not param_names:
+            instance_model = db_session.query(InstanceModel.id).filter_by(id=instance_id).first()
+        else:
+            instance_model = db_session.query(InstanceModel).get(instance_id)
+        self.end_phase(start, DB_READ)
         if instance_model is None:
             raise RuntimeError(f'Parameterized instance with id "{instance_id}" does not exist.')
-        serialized_param = self.get_serialized_param(instance)
-        serialized_param.pop('name')
+        if param_names is not None and not param_names:
+            return instance_id
+
+        if self.storage == DOCUMENT_STORAGE:
+            self.update_document(db_session, instance, instance_model, param_names)
+        else:
+            self.update_param_rows(db_session, instance, instance_model, param_names)
+
+        start = self.start_phase()
+        commit_session(db_session)
+        self.end_phase(start, DB_WRITE)
+        self.invalidate_cache(db_session, [instance_id])
+        if param_names is None:
+            self.track_instance(instance, instance_id, db_session)
+        else:
+            self.change_tracker.mark_clean(instance, param_names)
+            self.untrack_on_rollback(db_session, instance)
+
+        return instance_id
+
+    @sqlalchemy_session
+    @instrumented
+    def delete_unused_blobs(self, **kwargs):
+        """
+        Delete the blobs that no param row references, e.g. after updating or deleting deduplicated instances.
+
+        Returns:
+            The number of deleted blobs.
+        """
+        db_session = kwargs.get('db_session', None)
+        used_hashes = select(ParamModel.blob_hash).where(ParamModel.blob_hash.isnot(None))
+        result = db_session.execute(BlobModel.__table__.delete().where(BlobModel.hash.notin_(used_hashes)))
+        commit_session(db_session)
+
+        return result.rowcount
+
+    def end_serialize_phase(self, start, instance_rows, param_rows):
+        """
+        Report the serialization of instances into rows to the listeners, if it was timed.
+
+        Args:
+            start: The start time returned by start_phase.
+            instance_rows: A list of the instance rows.
+            param_rows: A list of the param rows.
+
+        Returns:
+            A tuple of the number of params and the size of the serialized params, or of None and None if the phase
+            was not timed. The number of params is None with "document" storage.
+        """
+        if start is None:
+            return None, None
+
+        param_count = None if self.storage == DOCUMENT_STORAGE and not param_rows else len(param_rows)
+        size = get_serialized_size(instance_rows + param_rows)
+        self.end_phase(start, SERIALIZE, param_count, size)
+
+        return param_count, size
+
+    def get_serialization_options(self):
+        """
+        Get the keyword arguments of the agent that affect how instances are serialized into rows.
+
+        Returns:
+            A dictionary of keyword arguments for a SqlAlchemyAgent.
+        """
+        return {'storage': self.storage, 'compress': self.compress, 'codecs': self.codecs,
+                'skip_defaults': self.skip_defaults}
+
+    def create_param_objects(self, serialized_instances, executor=None):
+        """
+        Create many parameterized instances from their serialized params, optionally in the workers of an executor.
+
+        Args:
+            serialized_instances: A dictionary of tuples of the class path and serialized params of each instance
+                keyed by id. Ids that map to None map to None in the result.
+            executor: An optional concurrent.futures executor to create the instances in, in chunks. Thread workers
+                use this agent. Process pool workers use a new agent with the registered classes of the instances.
+
+        Returns:
+            A dictionary of the parameterized instances keyed by id, in the same order as the given ids.
+        """
+        instance_ids = [key for key, value in serialized_instances.items() if value is not None]
+        serialized_data = [serialized_instances[x] for x in instance_ids]
+        if executor is None:
+            param_objects = self.create_param_objects_from_rows(serialized_data)
+        elif isinstance(executor, ProcessPoolExecutor):
+            class_paths = set(x[0] for x in serialized_data)
+            registered_classes = [value.parameterized_class for key, value in self.param_classes.items()
+                                  if key in class_paths]
+            param_objects = map_chunks(executor, partial(create_param_objects_in_worker, registered_classes),
+                                       serialized_data)
+        else:
+            param_objects = map_chunks(executor, self.create_param_objects_from_rows, serialized_data)
+
+        instances = dict.fromkeys(serialized_instances)
+        instances.update(zip(instance_ids, param_objects))
+
+        return instances
+
+    def create_param_objects_from_rows(self, serialized_instances):
+        """
+        Create parameterized instances from a list of their serialized params, e.g. a chunk of a thread worker.
+
+        Args:
+            serialized_instances: A list of tuples of the class path and serialized params of each instance.
+
+        Returns:
+            A list of the parameterized instances.
+        """
+        return [self.create_param_object(*x) for x in serialized_instances]
+
+    def get_rows_from_param_instances(self, instances):
+        """
+        Get the rows to insert into the database for a list of parameterized instances, e.g. a chunk of a thread worker.
+
+        Args:
+            instances: A list of parameterized instances.
+
+        Returns:
+            A list of tuples of the instance row and the list of param rows of each instance.
+        """
+        return [self.get_rows_from_param_instance(x) for x in instances]
+
+    def get_session_cache(self, db_session):
+        """
+        Get the cache that loads with a session read from and add to.
+
+        Loads in a transaction do not use the cache, since they may read data that is not committed yet and must see
+        the writes of the transaction.
+
+        Args:
+            db_session: The session of the load.
+
+        Returns:
+            The InstanceCache of the agent, or None if it has none or the session belongs to a running transaction.
+        """
+        if get_transaction_session(db_session) is not None:
+            return None
+
+        return self.cache
+
+    @staticmethod
+    def get_cached_instances(instance_ids, cache):
+        """
+        Get the class paths and serialized params of the instances that are in a cache.
+
+        Args:
+            instance_ids: A list of the ids of the instances.
+            cache: The InstanceCache, or None.
+
+        Returns:
+            A dictionary of tuples of the class path and serialized params keyed by id, for the cached instances only.
+        """
+        cached_instances = dict()
+        if cache is None:
+            return cached_instances
+
+        for instance_id in instance_ids:
+            cached = cache.get(instance_id)
+            if cached is not None:
+                cached_instances[instance_id] = cached
+
+        return cached_instances
+
+    def get_serialized_data_from_models(self, instance_model, param_models, cache=None):
+        """
+        Get the serialized params of an instance from its document or its param models, adding them to a cache.
+
+        Args:
+            instance_model: The instance model of the instance.
+            param_models: The param models of the instance, with at least their name, value and data columns.
+            cache: The InstanceCache to add the serialized params to, or None. See get_session_cache.
+
+        Returns:
+            A dictionary of the serialized param values keyed by param name.
+        """
+        start = self.start_phase()
+        if instance_model is not None and instance_model.document is not None:
+            serialized_data = decode_document(instance_model.document)
+            size = len(instance_model.document)
+        else:
+            serialized_data = self.load_serialized_data_from_param_model(param_models)
+            size = sum(len(x.name) + len(x.value if x.data is None else x.data) for x in param_models)
+        self.end_phase(start, DESERIALIZE, len(serialized_data), size)
+
+        if cache is not None and instance_model is not None:
+            cache.put(instance_model.id, instance_model.class_path, serialized_data, size)
+
+        return serialized_data
+
+    def update_document(self, db_session, instance, instance_model, param_names=None):
+        """
+        Update the document of a parameterized instance in the database, removing its param rows if it had any.
+
+        Args:
+            db_session: The session to write the changes with.
+            instance: The parameterized instance to update from.
+            instance_model: The instance model of the parameterized instance in the database.
+            param_names: The names of the params to update in the document. Defaults to all of them.
+        """
+        start = self.start_phase()
+        if param_names is not None and instance_model.document is not None:
+            load_lazy_params(instance, param_names)
+            serialized_data = decode_document(instance_model.document)
+            if self.skip_defaults:
+                changed_param_names = self.get_param_class_info(type(instance)).get_non_default_param_names(
+                    instance, param_names
+                )
+                for key in set(param_names).difference(changed_param_names):
+                    serialized_data.pop(key, None)
+                param_names = changed_param_names
+            serialized_data.update(self.get_serialized_param(instance, param_names))
+            document = encode_document(serialized_data, self.compress)
+        else:
+            document = self.get_document_from_param_instance(instance)
+        self.end_phase(start, SERIALIZE, size=len(document))
+
+        if document == instance_model.document:
+            return
+
+        start = self.start_phase()
+        instance_model.document = document
+        instance_model.saved_at = get_utc_now()
+        db_session.execute(ParamModel.__table__.delete().where(ParamModel.instance_id == instance_model.id))
+        self.end_phase(start, DB_WRITE, size=len(document))
+
+    def update_param_rows(self, db_session, instance, instance_model, param_names=None):
+        """
+        Update the param rows of a parameterized instance in the database, removing its document if it had one.
+
+        Args:
+            db_session: The session to write the changes with.
+            instance: The parameterized instance to update from.
+            instance_model: The instance model of the parameterized instance in the database.
+            param_names: The names of the params to update. Defaults to all of them.
+        """
+        if instance_model.document is not None:
+            param_names = None
+        start = self.start_phase()
+        param_values = self.get_param_values_from_param_instance(instance, param_names)
+        param_rows = [{'name': name, 'type': type_name, 'value': value, 'data': data, 'blob_hash': None}
+                      for name, (type_name, value, data) in param_values.items()]
+        param_count, size = self.end_serialize_phase(start, list(), param_rows)
+
+        # Match the rows in the database to the params in the instance by name
+        start = self.start_phase()
+        param_models_in_db, stale_param_names = self.match_param_models_in_db(
+            db_session, instance_model.id, param_values, param_names
+        )
+        self.end_phase(start, DB_READ, len(param_models_in_db) + len(stale_param_names))
+
+        start = self.start_phase()
+        set_param_type_ids(db_session, param_rows)
+        if self.dedup:
+            set_blob_hashes(db_session, param_rows)
+
+        changed_rows = list()
+        new_rows = list()
+        for param_row in param_rows:
+            if param_row['name'] not in param_models_in_db:
+                new_rows.append({'instance_id': instance_model.id, **param_row})
+                continue
+            if (param_row['type_id'], param_row['value'], param_row['data'], param_row['blob_hash']) != \
+                    param_models_in_db[param_row['name']]:
+                changed_rows.append({'param_name': param_row['name'],
+                                     'param_type_id': param_row['type_id'], 'param_value': param_row['value'],
+                                     'param_data': param_row['data'], 'param_blob_hash': param_row['blob_hash']})
+
+        if changed_rows:
+            statement = ParamModel.__table__.update(). \
+                where(ParamModel.instance_id == instance_model.id, ParamModel.name == bindparam('param_name')). \
+                values(type_id=bindparam('param_type_id'), value=bindparam('param_value'), data=bindparam('param_data'),
+                       blob_hash=bindparam('param_blob_hash'))
+            db_session.execute(statement, changed_rows)
+        bulk_insert(db_session, ParamModel.__table__, new_rows)
+        if stale_param_names:
+            db_session.execute(ParamModel.__table__.delete().where(ParamModel.instance_id == instance_model.id,
+                                                                   ParamModel.name.in_(stale_param_names)))
+        if changed_rows or new_rows or stale_param_names or instance_model.document is not None:
+            instance_model.document = None
+            instance_model.saved_at = get_utc_now()
+        if start is not None:
+            self.end_phase(start, DB_WRITE, len(changed_rows) + len(new_rows) + len(stale_param_names), size)
+
+    @staticmethod
+    def match_param_models_in_db(db_session, instance_id, param_values, param_names=None):
+        """
+        Match the param rows of an instance in the database to the params of the instance by name.
+
+        Args:
+            db_session: The session to query the param rows with.
+            instance_id: The id of the parameterized instance in the database.
+            param_values: A dictionary of the param values of the instance keyed by param name.
+            param_names: The names of the params to query the rows for. Defaults to all of them.
 
+        Returns:
+            A tuple of a dictionary of tuples of the type id, value, data and blob hash of the matched rows keyed by
+            param name, and a list of the names of the rows that do not match a param of the instance.
+        """
         param_models_in_db = dict()
-        for x in db_session.query(ParamModel).filter_by(instance_id=instance_id):
-            param_models_in_db[x.id] = json.loads(x.value)
+        stale_param_names = list()
+        query = db_session.query(ParamModel.name, ParamModel.type_id, ParamModel.value, ParamModel.data,
+                                 ParamModel.blob_hash).filter_by(instance_id=instance_id)
+        if param_names is not None:
+            query = query.filter(ParamModel.name.in_(param_names))
+        for name, type_id, value, data, blob_hash in query:
+            if name not in param_values:
+                stale_param_names.append(name)
+                continue
+            param_models_in_db[name] = (type_id, value, data, blob_hash)
+
+        return param_models_in_db, stale_param_names
+
+    def get_document_from_param_instance(self, instance):
+        """
+        Get the document to store in the instances table for a parameterized instance.
+
+        Args:
+            instance: The parameterized instance to get the document for.
+
+        Returns:
+            The document as bytes, compressed if the agent compresses documents.
+        """
+        load_lazy_params(instance)
+        param_names = None
+        if self.skip_defaults:
+            param_names = self.get_param_class_info(type(instance)).get_non_default_param_names(instance)
+
+        serialized_param = self.get_serialized_param(instance, param_names)
+        serialized_param.pop('name', None)
+
+        return encode_document(serialized_param, self.compress)
+
+    def get_param_values_from_param_instance(self, instance, param_names=None):
+        """
+        Get the values to store in the param rows of the database for a parameterized instance.
+
+        Params with a codec for their type are encoded by it and stored in the data column, unless the codec cannot
+        encode their value. The other params are JSON serialized and stored in the value column. Params at their
+        default are left out if the agent skips defaults.
+
+        Args:
+            instance: The parameterized instance to get the values for.
+            param_names: The names of the params to get the values for. Defaults to all of them.
+
+        Returns:
+            A dictionary of tuples of the param type string, JSON serialized param value or None and encoded param
+            value or None keyed by param name.
+        """
+        load_lazy_params(instance, param_names)
+        param_class_info = self.get_param_class_info(type(instance))
+        param_types = param_class_info.param_types
+        if self.skip_defaults:
+            param_names = param_class_info.get_non_default_param_names(instance, param_names)
 
-        params_in_instance = dict()
+        encoded_values = dict()
+        if self.codecs:
+            for key in param_class_info.param_names if param_names is None else param_names:
+                codec = self.codecs.get(param_types.get(key, None), None)
+                if codec is not None:
+                    data = codec.encode(instance.param.get_value_generator(key))
+                    if data is not None:
+                        encoded_values[key] = data
+            if encoded_values:
+                param_names = [x for x in param_class_info.param_names if x not in encoded_values] \
+                    if param_names is None else [x for x in param_names if x not in encoded_values]
+
+        # Serialize data using param JSONSerialization class
+        serialized_param = self.get_serialized_param(instance, param_names)
+
+        # Remove name since we don't need it
+        serialized_param.pop('name', None)
+
+        param_values = dict()
         for key, value in serialized_param.items():
-            params_in_instance[key] = {'name': key, 'value': value,
-                                       'type': self.get_type_from_param_instance(instance, key)}
+            param_values[key] = (param_types[key], json.dumps(value), None)
+        for key, data in encoded_values.items():
+            param_values[key] = (param_types[key], None, data)
 
-        pids = [x for x in param_models_in_db.keys()]
-        for pid in pids:
-            param = param_models_in_db[pid]
-            if param['name'] not in params_in_instance:
-                continue
-            param_model = db_session.query(ParamModel).get(pid)
-            param_model.value = json.dumps(params_in_instance[param['name']])
-            param_models_in_db.pop(pid)
+        return param_values
 
-        for param_model in param_models_in_db:
-            param_model = db_session.query(ParamModel).get(param_model)
-            db_session.delete(param_model)
+    def get_rows_from_param_instance(self, instance, instance_id=None):
+        """
+        Get the rows to insert into the database for a parameterized instance.
 
-        db_session.commit()
+        Args:
+            instance: The parameterized instance to get the rows for.
+            instance_id: The id of the instance. Defaults to a new uuid.
 
-        return instance_id
+        Returns:
+            A tuple of the instance row and a list of the param rows, as dictionaries of column values. The param rows
+            hold their type string as "type" instead of the "type_id" column. With "document" storage there are no
+            param rows and the instance row holds the document.
+        """
+        # Get class path and uuid to save in InstanceModel
+        if instance_id is None:
+            instance_id = str(uuid.uuid4())
+        instance_row = {'id': instance_id, 'class_path': self.get_class_path_from_param_instance(instance),
+                        'saved_at': get_utc_now()}
+
+        if self.storage == DOCUMENT_STORAGE:
+            instance_row['document'] = self.get_document_from_param_instance(instance)
+            return instance_row, list()
+
+        param_rows = list()
+        for name, (type_name, value, data) in self.get_param_values_from_param_instance(instance).items():
+            param_rows.append({'instance_id': instance_id, 'name': name, 'type': type_name, 'value': value,
+                               'data': data, 'blob_hash': None})
+
+        return instance_row, param_rows
@@ -0,0 +1,385 @@
+"""
+The Tiered Agent, which answers loads from memory and writes updates behind to another agent.
+
+This file was created on October 17, 2026
+"""
+import atexit
+import copy
+from functools import partial
+import logging
+import threading
+import weakref
+
+from param_persist.agents.base import AgentBase
+from param_persist.agents.cache import InstanceCache
+
+log = logging.getLogger('param_persist')
+
+
+def close_at_exit(agent_reference):
+    """
+    Close a tiered agent when the interpreter exits, if it still exists, so its pending writes are flushed.
+
+    Args:
+        agent_reference: A weak reference to the TieredAgent.
+    """
+    agent = agent_reference()
+    if agent is None:
+        return
+
+    try:
+        agent.close()
+    except Exception:
+        log.exception(f'unable to flush pending writes at exit, {len(agent.pending)} writes are lost')
+
+
+class TieredAgent(AgentBase):
+    """
+    An agent that keeps a memory tier in front of a backing agent, e.g. a SqlAlchemyAgent or a FileAgent.
+
+    Loads are answered from the writes that are not flushed yet, then from an InstanceCache, and only then from the
+    backing agent. Updates and deletes are buffered in memory, with repeated writes to the same id coalesced into the
+    latest one, and written to the backing agent in batches by a background thread. A batch is written when
+    "max_pending" ids are pending, every "flush_interval" seconds, on "flush" and on "close". Batches are written in a
+    transaction if the backing agent has one.
+
+    Saves go to the backing agent right away, since it assigns the ids. Buffered writes are lost if the process is
+    killed before they are flushed. They are flushed when the interpreter exits normally, but call "flush" or "close"
+    where durability matters.
+    """
+
+    def __init__(self, agent, cache=None, max_pending=1000, flush_interval=1.0):
+        """
+        The __init__ function for the TieredAgent.
+
+        Args:
+            agent: The backing agent to write to and to load from on a miss.
+            cache: The InstanceCache of the memory tier. Defaults to an InstanceCache with default limits.
+            max_pending: The number of pending ids that wakes the background thread to flush them.
+            flush_interval: The number of seconds between flushes of the background thread. None for no background
+                thread, so writes are only flushed by "flush" and "close".
+        """
+        super().__init__(agent.engine)
+        self.agent = agent
+        self.cache = cache if cache is not None else InstanceCache()
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        # Pending writes keyed by id, as a tuple of the class path and serialized params or None for a delete
+        self.pending = dict()
+        self.flushing = dict()
+        self.closed = False
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._exit_hook = partial(close_at_exit, weakref.ref(self))
+        atexit.register(self._exit_hook)
+
+        self._thread = None
+        if flush_interval is not None:
+            self._thread = threading.Thread(target=self.run_flusher, name='param_persist_flusher', daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        """
+        Use the agent as a context manager that closes it on exit.
+        """
+        return self
+
+    def __exit__(self, *args):
+        """
+        Close the agent, flushing the pending writes.
+        """
+        self.close()
+
+    def run_flusher(self):
+        """
+        Flush the pending writes every flush interval, or sooner when too many are pending, until the agent is closed.
+        """
+        while not self.closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception('unable to flush pending writes to the backing agent')
+
+    def flush(self):
+        """
+        Write the pending updates and deletes to the backing agent.
+
+        The writes are tried as one batch first. If the batch fails, each id is written on its own so that one bad
+        write does not hold back the others. Writes that can never succeed, because the instance no longer exists in
+        the backing agent or the entry cannot be deserialized, are logged and dropped. Writes that fail otherwise are
+        pending again unless newer writes to the same ids were made since, and the first of their errors is raised.
+
+        Returns:
+            The number of ids written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.pending:
+                    return 0
+                self.flushing, self.pending = self.pending, dict()
+
+            failed = dict()
+            dropped = set()
+            error = None
+            try:
+                self.write_batch(self.flushing)
+            except Exception:
+                log.exception('unable to write pending writes as a batch, writing them one by one')
+                failed, dropped, error = self.write_each(self.flushing)
+
+            with self._lock:
+                for instance_id, entry in self.flushing.items():
+                    if instance_id in failed or instance_id in dropped:
+                        continue
+                    if entry is not None and instance_id not in self.pending:
+                        self.cache.put(instance_id, *entry)
+                for instance_id, entry in failed.items():
+                    self.pending.setdefault(instance_id, entry)
+                count = len(self.flushing) - len(failed) - len(dropped)
+                self.flushing = dict()
+
+        if error is not None:
+            raise error
+
+        return count
+
+    def write_batch(self, pending):
+        """
+        Write pending updates and deletes to the backing agent, in a transaction if it has one.
+
+        Args:
+            pending: A dictionary of the pending writes keyed by id.
+        """
+        transaction = getattr(self.agent, 'transaction', None)
+        if transaction is None:
+            self.write_pending(self.agent, pending)
+        else:
+            with transaction() as tx:
+                self.write_pending(tx, pending)
+
+    def write_each(self, pending):
+        """
+        Write pending updates and deletes to the backing agent one id at a time.
+
+        Args:
+            pending: A dictionary of the pending writes keyed by id.
+
+        Returns:
+            A tuple of a dictionary of the writes that failed and can be retried keyed by id, a set of the ids of the
+            writes that were dropped, and the first error of the failed writes or None.
+        """
+        failed = dict()
+        dropped = set()
+        error = None
+        for instance_id, entry in pending.items():
+            try:
+                self.write_batch({instance_id: entry})
+            except Exception as write_error:
+                if self.is_permanent_failure(instance_id, entry):
+                    log.exception(f'dropping pending write that can not be written. id="{instance_id}"')
+                    dropped.add(instance_id)
+                else:
+                    failed[instance_id] = entry
+                    error = error or write_error
+
+        return failed, dropped, error
+
+    def is_permanent_failure(self, instance_id, entry):
+        """
+        Check whether a failed write can never succeed, so retrying it is pointless.
+
+        Args:
+            instance_id: The id of the instance.
+            entry: A tuple of the class path and serialized params of the instance, or None to delete it.
+
+        Returns:
+            True if the entry cannot be deserialized or the instance to update no longer exists, else False. False
+            if that cannot be told, e.g. because the backing agent is unavailable.
+        """
+        if entry is None:
+            return False
+
+        try:
+            self.create_param_object(*entry)
+        except Exception:
+            return True
+
+        try:
+            return not self.agent.exists(instance_id)
+        except Exception:
+            return False
+
+    def write_pending(self, target, pending):
+        """
+        Write pending updates and deletes to the backing agent or its transaction.
+
+        Args:
+            target: The backing agent or its transaction.
+            pending: A dictionary of the pending writes keyed by id.
+        """
+        for instance_id, entry in pending.items():
+            if entry is None:
+                target.delete(instance_id)
+            else:
+                target.update(self.create_param_object(*entry), instance_id)
+
+    def close(self):
+        """
+        Stop the background thread and flush the pending writes. The agent must not be used afterwards.
+
+        If some writes fail and can be retried, they stay pending and the error is raised, so "flush" can be called
+        again.
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        atexit.unregister(self._exit_hook)
+        self.flush()
+
+    def get_entry(self, instance_id):
+        """
+        Get an instance from the memory tier.
+
+        Args:
+            instance_id: The id of the instance.
+
+        Returns:
+            A tuple of whether the instance is in the memory tier and its class path and serialized params, or None if
+            it is deleted.
+        """
+        with self._lock:
+            for writes in (self.pending, self.flushing):
+                if instance_id in writes:
+                    return True, writes[instance_id]
+
+        cached = self.cache.get(instance_id)
+        return cached is not None, cached
+
+    def get_snapshot(self, instance):
+        """
+        Serialize a parameterized instance into a class path and serialized params that do not share its state.
+        """
+        serialized_param = self.get_serialized_param(instance)
+        serialized_param.pop('name', None)
+        return self.get_class_path_from_param_instance(instance), copy.deepcopy(serialized_param)
+
+    def save(self, instance, **kwargs):
+        """
+        Save a parameterized instance with the backing agent and keep it in the memory tier.
+
+        Args:
+            instance: The parameterized instance to save.
+
+        Returns:
+            The id of the saved instance.
+        """
+        instance_id = self.agent.save(instance, **kwargs)
+        self.cache.put(instance_id, *self.get_snapshot(instance))
+        return instance_id
+
+    def save_many(self, instances, **kwargs):
+        """
+        Save many parameterized instances with the backing agent and keep them in the memory tier.
+
+        Args:
+            instances: An iterable of parameterized instances to save.
+
+        Returns:
+            A list of the ids of the saved instances, in the same order as the given instances.
+        """
+        instances = list(instances)
+        instance_ids = self.agent.save_many(instances, **kwargs)
+        for instance_id, instance in zip(instance_ids, instances):
+            self.cache.put(instance_id, *self.get_snapshot(instance))
+        return instance_ids
+
+    def load(self, instance_id, **kwargs):
+        """
+        Load a parameterized instance from the memory tier, or from the backing agent on a miss.
+
+        Args:
+            instance_id: The id of the parameterized instance to load.
+
+        Returns:
+            The parameterized instance, or None if it does not exist or is deleted.
+        """
+        found, entry = self.get_entry(instance_id)
+        if found:
+            if entry is None:
+                log.warning(f'unable to load deleted instance with given instance id. id="{instance_id}"')
+                return None
+            class_path, serialized_data = entry
+            return self.create_param_object(class_path, copy.deepcopy(serialized_data))
+
+        instance = self.agent.load_many([instance_id], **kwargs)[instance_id]
+        if instance is not None:
+            self.cache.put(instance_id, *self.get_snapshot(instance))
+        return instance
+
+    def update(self, instance, instance_id, **kwargs):
+        """
+        Buffer an update of a saved parameterized instance, replacing a pending write to the same id.
+
+        Args:
+            instance: The parameterized instance to update from.
+            instance_id: The id of the parameterized instance to update.
+
+        Returns:
+            The parameterized instance id.
+        """
+        if not self.exists(instance_id):
+            raise RuntimeError(f'Parameterized instance with id "{instance_id}" does not exist.')
+
+        self.write(instance_id, self.get_snapshot(instance))
+        return instance_id
+
+    def exists(self, instance_id, **kwargs):
+        """
+        Check whether a parameterized instance exists in the memory tier, or else in the backing agent.
+
+        Args:
+            instance_id: The id of the parameterized instance.
+
+        Returns:
+            True if the instance exists and is not deleted, else False.
+        """
+        found, entry = self.get_entry(instance_id)
+        if found:
+            return entry is not None
+        return self.agent.exists(instance_id, **kwargs)
+
+    def delete(self, instance_id, **kwargs):
+        """
+        Buffer the delete of a parameterized instance, replacing a pending write to the same id.
+
+        Args:
+            instance_id: The id of the parameterized instance to delete.
+        """
+        self.write(instance_id, None)
+
+    def write(self, instance_id, entry):
+        """
+        Add a pending write, waking the background thread if too many are pending.
+
+        Args:
+            instance_id: The id of the instance.
+            entry: A tuple of the class path and serialized params of the instance, or None to delete it.
+        """
+        if self.closed:
+            raise RuntimeError('The TieredAgent is closed.')
+
+        with self._lock:
+            self.pending[instance_id] = entry
+            self.cache.invalidate(instance_id)
+            pending_count = len(self.pending)
+
+        if pending_count >= self.max_pending:
+            self._wake.set()
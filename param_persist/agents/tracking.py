@@ -0,0 +1,117 @@
+"""
+Tracking of the params that changed on saved or loaded instances, for agents.
+
+This file was created on October 17, 2026
+"""
+import weakref
+
+
+class TrackedInstance:
+    """
+    The id an instance was saved or loaded with and the names of its params that changed since.
+    """
+
+    def __init__(self, instance_id):
+        """
+        The __init__ for the tracked instance.
+
+        Args:
+            instance_id: The id the instance was saved or loaded with.
+        """
+        self.instance_id = instance_id
+        self.dirty_param_names = set()
+
+    def on_change(self, *events):
+        """
+        The param watcher callback that marks the changed params as dirty.
+        """
+        self.dirty_param_names.update(event.name for event in events)
+
+
+class ChangeTracker:
+    """
+    Tracks which params of saved or loaded instances changed, using param watchers.
+
+    Only assignments are seen by the watchers. Params that are changed in place, e.g. by appending to a list, must be
+    marked with "mark_dirty".
+    """
+
+    def __init__(self):
+        """
+        The __init__ for the change tracker.
+        """
+        self._tracked = weakref.WeakKeyDictionary()
+
+    def track(self, instance, instance_id):
+        """
+        Start tracking the changes of an instance, or reset its tracking if it was already tracked.
+
+        Args:
+            instance: The parameterized instance to track.
+            instance_id: The id the instance was saved or loaded with.
+        """
+        tracked_instance = self._tracked.get(instance, None)
+        if tracked_instance is not None:
+            tracked_instance.instance_id = instance_id
+            tracked_instance.dirty_param_names.clear()
+            return
+
+        tracked_instance = TrackedInstance(instance_id)
+        param_names = [x for x in instance.param.objects('existing') if x != 'name']
+        instance.param.watch(tracked_instance.on_change, param_names)
+        self._tracked[instance] = tracked_instance
+
+    def get_dirty_param_names(self, instance, instance_id):
+        """
+        Get the names of the params of an instance that changed since it was saved or loaded with an id.
+
+        Args:
+            instance: The parameterized instance.
+            instance_id: The id the instance is being written to.
+
+        Returns:
+            A set of param names, or None if the instance is not tracked for that id and all its params must be written.
+        """
+        tracked_instance = self._tracked.get(instance, None)
+        if tracked_instance is None or tracked_instance.instance_id != instance_id:
+            return None
+
+        return set(tracked_instance.dirty_param_names)
+
+    def untrack(self, instance):
+        """
+        Stop using the tracked changes of an instance, e.g. after the writes it was tracked from were rolled back.
+
+        The instance is tracked again the next time it is saved or loaded, and all its params are written until then.
+
+        Args:
+            instance: The parameterized instance.
+        """
+        tracked_instance = self._tracked.get(instance, None)
+        if tracked_instance is not None:
+            tracked_instance.instance_id = None
+            tracked_instance.dirty_param_names.clear()
+
+    def mark_dirty(self, instance, *param_names):
+        """
+        Mark params of a tracked instance as changed, e.g. after changing them in place.
+
+        Args:
+            instance: The parameterized instance.
+            param_names: The names of the params that changed.
+        """
+        tracked_instance = self._tracked.get(instance, None)
+        if tracked_instance is not None:
+            tracked_instance.dirty_param_names.update(param_names)
+
+    def mark_clean(self, instance, param_names):
+        """
+        Mark params of a tracked instance as written.
+
+        Args:
+            instance: The parameterized instance.
+            param_names: The names of the params that were written.
+        """
+        tracked_instance = self._tracked.get(instance, None)
+        if tracked_instance is not None:
+            tracked_instance.dirty_param_names.difference_update(param_names)
@@ -0,0 +1,292 @@
+"""
+Schema versioning and in place upgrades for the param sqlalchemy features.
+
+This file was created on October 17, 2026
+"""
+import datetime
+import json
+import logging
+
+from sqlalchemy import bindparam, column, DateTime, func, inspect, LargeBinary, select, table, text
+
+from param_persist.sqlalchemy.models import Base, BlobModel, ParamTypeModel, SCHEMA_VERSION, SchemaVersionModel
+
+log = logging.getLogger('param_persist')
+
+
+def get_stamped_schema_version(engine):
+    """
+    Get the schema version stamped in the schema_version table of a database.
+
+    Args:
+        engine: The engine connected to the database.
+
+    Returns:
+        The stamped schema version, or None if the database is not stamped.
+    """
+    if SchemaVersionModel.__tablename__ not in inspect(engine).get_table_names():
+        return None
+
+    with engine.connect() as connection:
+        return connection.execute(select(func.max(SchemaVersionModel.version))).scalar()
+
+
+def get_schema_version(engine):
+    """
+    Get the schema version of a database.
+
+    Databases that are not stamped are reported from the layout of their params table: version 1 if it still has the
+    id column of databases created before the schema was versioned, e.g. when Base.metadata.create_all was run on
+    them, and the current schema version if it was created by Base.metadata.create_all.
+
+    Args:
+        engine: The engine connected to the database.
+
+    Returns:
+        The schema version of the database, or None if the database has no param_persist tables.
+    """
+    version = get_stamped_schema_version(engine)
+    if version is not None:
+        return version
+
+    inspector = inspect(engine)
+    if 'instances' not in inspector.get_table_names():
+        return None
+
+    if 'id' in [x['name'] for x in inspector.get_columns('params')]:
+        return 1
+
+    return SCHEMA_VERSION
+
+
+def stamp_schema_version(connection, version=SCHEMA_VERSION):
+    """
+    Stamp a database with a schema version, creating the schema_version table if it does not exist.
+
+    Args:
+        connection: The connection to stamp the database with.
+        version: The schema version to stamp.
+    """
+    SchemaVersionModel.__table__.create(connection, checkfirst=True)
+    connection.execute(SchemaVersionModel.__table__.delete())
+    connection.execute(SchemaVersionModel.__table__.insert().values(version=version))
+
+
+def upgrade(engine):
+    """
+    Upgrade a database in place to the current schema version, creating the tables if they do not exist.
+
+    Every migration runs in a single transaction, so a failed upgrade leaves the database at its previous version.
+
+    Args:
+        engine: The engine connected to the database.
+
+    Returns:
+        The schema version of the database after the upgrade.
+    """
+    version = get_schema_version(engine)
+    if version is None:
+        with engine.begin() as connection:
+            Base.metadata.create_all(connection)
+            stamp_schema_version(connection)
+        return SCHEMA_VERSION
+
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f'Database schema version "{version}" is newer than the supported schema version '
+                           f'"{SCHEMA_VERSION}".')
+
+    if version == SCHEMA_VERSION:
+        if get_stamped_schema_version(engine) is None:
+            with engine.begin() as connection:
+                stamp_schema_version(connection)
+        return version
+
+    with engine.begin() as connection:
+        for target_version in range(version + 1, SCHEMA_VERSION + 1):
+            log.info(f'upgrading database schema to version "{target_version}"')
+            MIGRATIONS[target_version](connection)
+
+        stamp_schema_version(connection)
+
+    return SCHEMA_VERSION
+
+
+def get_alter_column_type_statement(dialect_name, table_name, column_name, column_type):
+    """
+    Get the statement that changes the type of a column for the given dialect.
+
+    Args:
+        dialect_name: The name of the sqlalchemy dialect, e.g. "postgresql".
+        table_name: The name of the table with the column.
+        column_name: The name of the column to change.
+        column_type: The new type of the column as a SQL string, e.g. "CHAR(36)".
+
+    Returns:
+        The statement as a string, or None if the dialect does not need the type changed.
+    """
+    if dialect_name == 'sqlite':
+        # SQLite stores both VARCHAR and CHAR columns with TEXT affinity, so there is nothing to change.
+        return None
+
+    if dialect_name in ('mysql', 'mariadb'):
+        return f'ALTER TABLE {table_name} MODIFY {column_name} {column_type}'
+
+    return f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE {column_type}'
+
+
+def upgrade_to_version_2(connection):
+    """
+    Make params.instance_id a CHAR(36) like instances.id and index it.
+    """
+    statement = get_alter_column_type_statement(connection.dialect.name, 'params', 'instance_id', 'CHAR(36)')
+    if statement is not None:
+        connection.execute(text(statement))
+
+    connection.execute(text('CREATE INDEX ix_params_instance_id ON params (instance_id)'))
+
+
+def upgrade_to_version_3(connection, batch_size=10000):
+    """
+    Split the JSON documents in params.value into name, type_id and value columns and add the param_types table.
+
+    Args:
+        connection: The connection to run the migration with.
+        batch_size: The number of param rows to convert per statement.
+    """
+    # The table exists if Base.metadata.create_all was run on the database before upgrading it
+    ParamTypeModel.__table__.create(connection, checkfirst=True)
+    connection.execute(text('ALTER TABLE params ADD COLUMN name VARCHAR'))
+    connection.execute(text('ALTER TABLE params ADD COLUMN type_id INTEGER REFERENCES param_types (id)'))
+    connection.execute(text('CREATE INDEX ix_params_name ON params (name)'))
+
+    params_table = table('params', column('id'), column('name'), column('type_id'), column('value'))
+    types_table = ParamTypeModel.__table__
+    statement = params_table.update(). \
+        where(params_table.c.id == bindparam('param_id')). \
+        values(name=bindparam('param_name'), type_id=bindparam('param_type_id'), value=bindparam('param_value'))
+
+    type_ids = dict()
+    query = select(params_table.c.id, params_table.c.value).where(params_table.c.name.is_(None)).limit(batch_size)
+    while True:
+        rows = connection.execute(query).fetchall()
+        if not rows:
+            break
+
+        converted_rows = list()
+        for param_id, value in rows:
+            document = json.loads(value)
+            type_name = document['type']
+            if type_name not in type_ids:
+                result = connection.execute(types_table.insert().values(name=type_name))
+                type_ids[type_name] = result.inserted_primary_key[0]
+            converted_rows.append({'param_id': param_id, 'param_name': document['name'],
+                                   'param_type_id': type_ids[type_name], 'param_value': json.dumps(document['value'])})
+
+        connection.execute(statement, converted_rows)
+
+
+def upgrade_to_version_4(connection):
+    """
+    Add the instances.document column used by the document storage of the SqlAlchemyAgent.
+    """
+    column_type = LargeBinary().compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE instances ADD COLUMN document {column_type}'))
+
+
+def upgrade_to_version_5(connection):
+    """
+    Add the params.data column that holds the param values encoded by codecs.
+    """
+    column_type = LargeBinary().compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE params ADD COLUMN data {column_type}'))
+
+
+def upgrade_to_version_6(connection):
+    """
+    Add the blobs table and the params.blob_hash column used by the deduplication of the SqlAlchemyAgent.
+    """
+    BlobModel.__table__.create(connection, checkfirst=True)
+    connection.execute(text('ALTER TABLE params ADD COLUMN blob_hash CHAR(64) REFERENCES blobs (hash)'))
+    connection.execute(text('CREATE INDEX ix_params_blob_hash ON params (blob_hash)'))
+
+
+def upgrade_to_version_7(connection):
+    """
+    Index instances.class_path to find instances by class.
+    """
+    connection.execute(text('CREATE INDEX ix_instances_class_path ON instances (class_path)'))
+
+
+def upgrade_to_version_8(connection):
+    """
+    Key params by instance_id and name instead of a uuid per row, keeping one row of params duplicated by name.
+
+    The kept row of duplicated params is the one with the lowest uuid, so which value survives is arbitrary. Rows
+    without an instance_id or name are dropped too. The number of dropped rows is logged as a warning.
+
+    The primary key indexes params by instance_id, so the separate ix_params_instance_id index is dropped.
+    """
+    column_type = LargeBinary().compile(dialect=connection.dialect)
+    connection.execute(text(
+        f'CREATE TABLE params_v8 (instance_id CHAR(36) NOT NULL REFERENCES instances (id), name VARCHAR NOT NULL, '
+        f'type_id INTEGER REFERENCES param_types (id), value VARCHAR, data {column_type}, '
+        f'blob_hash CHAR(64) REFERENCES blobs (hash), PRIMARY KEY (instance_id, name))'
+    ))
+    connection.execute(text(
+        'INSERT INTO params_v8 (instance_id, name, type_id, value, data, blob_hash) '
+        'SELECT p.instance_id, p.name, p.type_id, p.value, p.data, p.blob_hash FROM params p '
+        'WHERE p.instance_id IS NOT NULL AND p.name IS NOT NULL AND p.id = ('
+        'SELECT MIN(q.id) FROM params q WHERE q.instance_id = p.instance_id AND q.name = p.name)'
+    ))
+    dropped_count = connection.execute(text('SELECT COUNT(*) FROM params')).scalar() - \
+        connection.execute(text('SELECT COUNT(*) FROM params_v8')).scalar()
+    if dropped_count:
+        log.warning(f'dropped duplicated or incomplete param rows keyed by instance id and name. '
+                    f'count="{dropped_count}"')
+    connection.execute(text('DROP TABLE params'))
+    connection.execute(text('ALTER TABLE params_v8 RENAME TO params'))
+    connection.execute(text('CREATE INDEX ix_params_name ON params (name)'))
+    connection.execute(text('CREATE INDEX ix_params_blob_hash ON params (blob_hash)'))
+
+
+def upgrade_to_version_9(connection):
+    """
+    Add the indexed instances.saved_at column used to purge old instances, and delete params with their instance.
+
+    The existing instances are stamped with the time of the upgrade, so purge counts their age from it.
+
+    The params table is rebuilt like in version 8, since SQLite cannot change the foreign key of params.instance_id
+    to "ON DELETE CASCADE" in place.
+    """
+    column_type = DateTime().compile(dialect=connection.dialect)
+    connection.execute(text(f'ALTER TABLE instances ADD COLUMN saved_at {column_type}'))
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    connection.execute(text('UPDATE instances SET saved_at = :now'), {'now': now})
+    connection.execute(text('CREATE INDEX ix_instances_saved_at ON instances (saved_at)'))
+
+    column_type = LargeBinary().compile(dialect=connection.dialect)
+    connection.execute(text(
+        f'CREATE TABLE params_v9 (instance_id CHAR(36) NOT NULL REFERENCES instances (id) ON DELETE CASCADE, '
+        f'name VARCHAR NOT NULL, type_id INTEGER REFERENCES param_types (id), value VARCHAR, data {column_type}, '
+        f'blob_hash CHAR(64) REFERENCES blobs (hash), PRIMARY KEY (instance_id, name))'
+    ))
+    connection.execute(text(
+        'INSERT INTO params_v9 (instance_id, name, type_id, value, data, blob_hash) '
+        'SELECT instance_id, name, type_id, value, data, blob_hash FROM params'
+    ))
+    connection.execute(text('DROP TABLE params'))
+    connection.execute(text('ALTER TABLE params_v9 RENAME TO params'))
+    connection.execute(text('CREATE INDEX ix_params_name ON params (name)'))
+    connection.execute(text('CREATE INDEX ix_params_blob_hash ON params (blob_hash)'))
+
+
+MIGRATIONS = {
+    2: upgrade_to_version_2,
+    3: upgrade_to_version_3,
+    4: upgrade_to_version_4,
+    5: upgrade_to_version_5,
+    6: upgrade_to_version_6,
+    7: upgrade_to_version_7,
+    8: upgrade_to_version_8,
+    9: upgrade_to_version_9,
+}
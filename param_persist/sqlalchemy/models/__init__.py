@@ -2,5 +2,8 @@ from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 
+from param_persist.sqlalchemy.models.blob_model import BlobModel  # NOQA: F401, E402
 from param_persist.sqlalchemy.models.instance_model import InstanceModel  # NOQA: F401, E402
 from param_persist.sqlalchemy.models.param_model import ParamModel  # NOQA: F401, E402
+from param_persist.sqlalchemy.models.param_type_model import ParamTypeModel  # NOQA: F401, E402
+from param_persist.sqlalchemy.models.schema_version_model import SCHEMA_VERSION, SchemaVersionModel  # NOQA: F401, E402
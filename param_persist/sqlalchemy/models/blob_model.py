@@ -0,0 +1,25 @@
+"""
+The blob model for the param sqlalchemy features.
+
+This file was generated on October 17, 2026
+"""
+from sqlalchemy import CHAR, Column, LargeBinary, String
+
+from param_persist.sqlalchemy.models import Base
+
+
+class BlobModel(Base):
+    """
+    The BlobModel. Holds each deduplicated param value once, keyed by the SHA-256 hash of its content.
+    """
+    __tablename__ = 'blobs'
+
+    hash = Column(CHAR(64), primary_key=True)
+    value = Column(String)
+    data = Column(LargeBinary)
+
+    def __repr__(self):
+        """
+        The __repr__ overloaded function.
+        """
+        return f'<Blob(hash="{self.hash}")>'
@@ -5,7 +5,7 @@ This file was generated on July 30, 2020
 """
 import uuid
 
-from sqlalchemy import CHAR, Column, String
+from sqlalchemy import CHAR, Column, DateTime, LargeBinary, String
 from sqlalchemy.orm import relationship
 
 from param_persist.sqlalchemy.models import Base
@@ -13,12 +13,17 @@ from param_persist.sqlalchemy.models import Base
 
 class InstanceModel(Base):
     """
-    The InstanceModel.
+    The InstanceModel. The document column holds all the params of the instance when it is saved in document storage.
+
+    The saved_at column holds the UTC time the instance was last saved or updated with changes. Instances saved before
+    it was added get the time of the migration that added it.
     """
     __tablename__ = 'instances'
 
-    id = Column(CHAR(36), primary_key=True, default=str(uuid.uuid4()), unique=True, nullable=False)
-    class_path = Column(String)
+    id = Column(CHAR(36), primary_key=True, default=lambda: str(uuid.uuid4()), unique=True, nullable=False)
+    class_path = Column(String, index=True)
+    document = Column(LargeBinary)
+    saved_at = Column(DateTime, index=True)
 
     params = relationship('ParamModel', back_populates='instance', cascade='all, delete, delete-orphan')
 
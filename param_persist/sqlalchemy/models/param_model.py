@@ -3,9 +3,7 @@ The param model for the param sqlalchemy features.
 
 This file was generated on July 30, 2020
 """
-import uuid
-
-from sqlalchemy import CHAR, Column, ForeignKey, String
+from sqlalchemy import CHAR, Column, ForeignKey, Integer, LargeBinary, String
 from sqlalchemy.orm import relationship
 
 from . import Base
@@ -14,17 +12,26 @@ from . import Base
 class ParamModel(Base):
     """
     The ParamModel.
+
+    The rows are keyed by the instance id and the param name. The value column holds the JSON serialized value of the
+    param, or the data column its codec bytes. Deduplicated params hold neither and reference the blob with their value
+    by hash instead.
     """
     __tablename__ = 'params'
 
-    id = Column(CHAR(36), primary_key=True, default=str(uuid.uuid4()), unique=True, nullable=False)
-    instance_id = Column(String, ForeignKey('instances.id'))
+    instance_id = Column(CHAR(36), ForeignKey('instances.id', ondelete='CASCADE'), primary_key=True)
+    name = Column(String, primary_key=True, index=True)
+    type_id = Column(Integer, ForeignKey('param_types.id'))
     value = Column(String)
+    data = Column(LargeBinary)
+    blob_hash = Column(CHAR(64), ForeignKey('blobs.hash'), index=True)
 
     instance = relationship('InstanceModel', back_populates='params')
+    param_type = relationship('ParamTypeModel')
+    blob = relationship('BlobModel')
 
     def __repr__(self):
         """
         The __repr__ overloaded function.
         """
-        return f'<Param(id="{self.id}", instance_id="{self.instance_id}")>'
+        return f'<Param(instance_id="{self.instance_id}", name="{self.name}")>'
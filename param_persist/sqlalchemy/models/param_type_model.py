@@ -0,0 +1,24 @@
+"""
+The param type model for the param sqlalchemy features.
+
+This file was generated on October 17, 2026
+"""
+from sqlalchemy import Column, Integer, String
+
+from param_persist.sqlalchemy.models import Base
+
+
+class ParamTypeModel(Base):
+    """
+    The ParamTypeModel. Holds each param type string once so the param rows only reference it by id.
+    """
+    __tablename__ = 'param_types'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+    def __repr__(self):
+        """
+        The __repr__ overloaded function.
+        """
+        return f'<ParamType(id="{self.id}", name="{self.name}")>'
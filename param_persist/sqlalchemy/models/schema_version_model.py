@@ -0,0 +1,28 @@
+"""
+The schema version model for the param sqlalchemy features.
+
+This file was generated on October 17, 2026
+"""
+from sqlalchemy import Column, Integer
+
+from param_persist.sqlalchemy.models import Base
+
+SCHEMA_VERSION = 9
+
+
+class SchemaVersionModel(Base):
+    """
+    The SchemaVersionModel. Holds a single row with the version of the schema the database is at.
+
+    The row is written by param_persist.sqlalchemy.migrations.upgrade, not when the table is created, since
+    Base.metadata.create_all also creates the table in databases with an older schema.
+    """
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+
+    def __repr__(self):
+        """
+        The __repr__ overloaded function.
+        """
+        return f'<SchemaVersion(version="{self.version}")>'
@@ -15,8 +15,9 @@ requirements = [
 
 test_requirements = [
     'pytest==5.4.1',
-    'pytest-mock==3.2.0'
+    'pytest-mock==3.2.0',
     'testfixtures==6.14.1',
+    'aiosqlite',
 ]
 
 setup_directory = path.abspath(path.dirname(__file__))
@@ -0,0 +1,32 @@
+"""
+The conftest.py for the async agent test fixtures.
+
+This file was created on October 17, 2026
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from param_persist.agents.async_sqlalchemy_agent import AsyncSqlAlchemyAgent
+from param_persist.sqlalchemy.models import Base
+
+
+@pytest.fixture()
+def run_with_async_agent(tmp_path):
+    """
+    Run a coroutine function with an AsyncSqlAlchemyAgent connected to a new SQLite database.
+    """
+    def _run_with_async_agent(test_function, **agent_kwargs):
+        async def run():
+            engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "async.db"}', echo=False)
+            try:
+                async with engine.begin() as connection:
+                    await connection.run_sync(Base.metadata.create_all)
+                return await test_function(AsyncSqlAlchemyAgent(engine, **agent_kwargs))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(run())
+
+    return _run_with_async_agent
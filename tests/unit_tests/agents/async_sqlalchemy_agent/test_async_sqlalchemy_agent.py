@@ -0,0 +1,197 @@
+"""
+Tests for the async SqlAlchemy agent.
+
+This file was created on October 17, 2026
+"""
+import logging
+
+import pytest
+from tests.unit_tests.agents.sqlalchemy_agent.test_sqlalchemy_agent import AgentTestParam
+
+from param_persist.agents.cache import InstanceCache
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_save_load(run_with_async_agent, storage):
+    """
+    Test saving and loading an instance with the async agent.
+    """
+    async def test_function(agent):
+        parameterized_class = AgentTestParam()
+        parameterized_class.number_field = 1.7
+        parameterized_class.string_field = "Testing Strings"
+
+        instance_id = await agent.save(parameterized_class)
+        return await agent.load(instance_id)
+
+    loaded_instance = run_with_async_agent(test_function, storage=storage)
+
+    assert type(loaded_instance) is AgentTestParam
+    assert loaded_instance.number_field == 1.7
+    assert loaded_instance.string_field == "Testing Strings"
+
+
+def test_save_many_load_many(run_with_async_agent, caplog):
+    """
+    Test saving and loading many instances with the async agent.
+    """
+    async def test_function(agent):
+        instance_ids = await agent.save_many([AgentTestParam(integer_field=x) for x in range(3)])
+        return instance_ids, await agent.load_many(instance_ids + ['not-a-valid-uuid'], batch_size=2)
+
+    with caplog.at_level(logging.WARNING):
+        instance_ids, loaded_instances = run_with_async_agent(test_function)
+
+    assert [loaded_instances[x].integer_field for x in instance_ids] == [0, 1, 2]
+    assert loaded_instances['not-a-valid-uuid'] is None
+
+
+def test_update_delete(run_with_async_agent):
+    """
+    Test updating and deleting an instance with the async agent, invalidating its cache.
+    """
+    cache = InstanceCache()
+
+    async def test_function(agent):
+        parameterized_class = AgentTestParam()
+        instance_id = await agent.save(parameterized_class)
+        await agent.load(instance_id)
+
+        parameterized_class.integer_field = 42
+        await agent.update(parameterized_class, instance_id)
+        updated = await agent.load(instance_id)
+
+        assert await agent.exists(instance_id)
+        await agent.delete(instance_id)
+        assert not await agent.exists(instance_id)
+        deleted = await agent.load_many([instance_id])
+
+        return updated, deleted[instance_id]
+
+    updated, deleted = run_with_async_agent(test_function, cache=cache)
+
+    assert updated.integer_field == 42
+    assert deleted is None
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_update_bad_instance_id(run_with_async_agent):
+    """
+    Test updating an instance that does not exist raises with the async agent.
+    """
+    async def test_function(agent):
+        await agent.update(AgentTestParam(), 'not-a-valid-uuid')
+
+    with pytest.raises(RuntimeError) as excinfo:
+        run_with_async_agent(test_function)
+
+    assert 'Parameterized instance with id "not-a-valid-uuid" does not exist.' in str(excinfo.value)
+
+
+def test_transaction(run_with_async_agent):
+    """
+    Test that the async agent functions called in a transaction commit together or roll back together.
+    """
+    async def test_function(agent):
+        async with agent.transaction() as tx:
+            instance_id = await tx.save(AgentTestParam())
+            await tx.update(AgentTestParam(integer_field=42), instance_id)
+
+        with pytest.raises(RuntimeError):
+            async with agent.transaction() as tx:
+                await tx.delete(instance_id)
+                raise RuntimeError('Something went wrong.')
+
+        return await agent.load(instance_id)
+
+    loaded_instance = run_with_async_agent(test_function)
+
+    assert loaded_instance.integer_field == 42
+
+
+def test_load_selected_params(run_with_async_agent):
+    """
+    Test loading selected params with the async agent, which does not support lazy params.
+    """
+    async def test_function(agent):
+        instance_id = await agent.save(AgentTestParam(integer_field=42, number_field=1.7))
+        with pytest.raises(ValueError):
+            await agent.load(instance_id, lazy_params=['number_field'])
+        loaded_instance = await agent.load(instance_id, params=['integer_field'])
+        with pytest.raises(RuntimeError):
+            await agent.update(loaded_instance, instance_id)
+        return loaded_instance, await agent.load(instance_id)
+
+    loaded_instance, stored_instance = run_with_async_agent(test_function)
+
+    assert loaded_instance.integer_field == 42
+    with pytest.raises(RuntimeError):
+        loaded_instance.number_field
+    assert stored_instance.number_field == 1.7
+
+
+def test_iter_instances(run_with_async_agent):
+    """
+    Test iterating over the saved instances with the async agent.
+    """
+    async def test_function(agent):
+        instance_ids = await agent.save_many([AgentTestParam(integer_field=x) for x in range(3)])
+        return instance_ids, [x async for x in agent.iter_instances(chunk_size=2)]
+
+    instance_ids, instances = run_with_async_agent(test_function)
+
+    assert [x for x, _ in instances] == sorted(instance_ids)
+    assert sorted(x.integer_field for _, x in instances) == [0, 1, 2]
+
+
+def test_save_or_update(run_with_async_agent):
+    """
+    Test saving or updating an instance with a given id with the async agent.
+    """
+    async def test_function(agent):
+        await agent.save_or_update(AgentTestParam(integer_field=2), 'my-instance')
+        await agent.save_or_update(AgentTestParam(integer_field=3), 'my-instance')
+        return await agent.load('my-instance')
+
+    assert run_with_async_agent(test_function).integer_field == 3
+
+
+def test_find(run_with_async_agent):
+    """
+    Test finding the ids of instances by param values with the async agent.
+    """
+    async def test_function(agent):
+        instance_ids = await agent.save_many([AgentTestParam(integer_field=1), AgentTestParam(integer_field=2)])
+        return instance_ids, await agent.find(where={'integer_field': 2})
+
+    instance_ids, found_ids = run_with_async_agent(test_function)
+
+    assert found_ids == [instance_ids[1]]
+
+
+def test_delete_many_purge(run_with_async_agent):
+    """
+    Test deleting many instances and purging instances by class path with the async agent.
+    """
+    async def test_function(agent):
+        instance_ids = await agent.save_many([AgentTestParam(), AgentTestParam(), AgentTestParam()])
+        deleted = await agent.delete_many(instance_ids[:2])
+        purged = await agent.purge(class_path=agent.get_class_path_from_param_instance(AgentTestParam()))
+        return deleted, purged
+
+    deleted, purged = run_with_async_agent(test_function)
+
+    assert deleted == {'instances': 2, 'params': 8}
+    assert purged == {'instances': 1, 'params': 4}
+
+
+def test_delete_unused_blobs(run_with_async_agent):
+    """
+    Test deleting the blobs that no param row references any more with the async agent.
+    """
+    async def test_function(agent):
+        instance_id = await agent.save(AgentTestParam(string_field='Unused'))
+        await agent.delete(instance_id)
+        return await agent.delete_unused_blobs()
+
+    assert run_with_async_agent(test_function, dedup=True) == 4
@@ -9,7 +9,7 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
-from param_persist.sqlalchemy.models import Base, InstanceModel, ParamModel
+from param_persist.sqlalchemy.models import Base, InstanceModel, ParamModel, ParamTypeModel
 
 
 @pytest.yield_fixture(scope='function')
@@ -53,7 +53,22 @@ def sqlalchemy_session_factory(sqlalchemy_engine):
 
 
 @pytest.fixture()
-def sqlalchemy_instance_model_complete(sqlalchemy_session_factory):
+def sqlalchemy_param_types(sqlalchemy_session_factory):
+    """
+    Create the param types used by the instance fixtures.
+    """
+    sqlalchemy_session = sqlalchemy_session_factory()
+
+    param_types = [ParamTypeModel(name=x) for x in ('param.Number', 'param.Integer', 'param.parameterized.String',
+                                                    'param.Boolean')]
+    sqlalchemy_session.add_all(param_types)
+    sqlalchemy_session.commit()
+
+    return {x.name: x.id for x in param_types}
+
+
+@pytest.fixture()
+def sqlalchemy_instance_model_complete(sqlalchemy_session_factory, sqlalchemy_param_types):
     """
     Create session-wide database.
     """
@@ -67,19 +82,14 @@ def sqlalchemy_instance_model_complete(sqlalchemy_session_factory):
     sqlalchemy_session.add(instance_1)
 
     # Params for Instance 1
-    param_1_number = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "number_field", "type": "param.Number", "value": 1.7}',
-                                instance_id=instance_1.id)
-    param_1_integer = ParamModel(id=str(uuid.uuid4()),
-                                 value='{"name": "integer_field", "type": "param.Integer", "value": 9}',
-                                 instance_id=instance_1.id)
-    param_1_string = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "string_field", "type": "param.parameterized.String", '
-                                      '"value": "Test String"}',
-                                instance_id=instance_1.id)
-    param_1_bool = ParamModel(id=str(uuid.uuid4()),
-                              value='{"name": "bool_field", "type": "param.Boolean", "value": true}',
-                              instance_id=instance_1.id)
+    param_1_number = ParamModel(name='number_field', type_id=sqlalchemy_param_types['param.Number'],
+                                value='1.7', instance_id=instance_1.id)
+    param_1_integer = ParamModel(name='integer_field', type_id=sqlalchemy_param_types['param.Integer'],
+                                 value='9', instance_id=instance_1.id)
+    param_1_string = ParamModel(name='string_field', type_id=sqlalchemy_param_types['param.parameterized.String'],
+                                value='"Test String"', instance_id=instance_1.id)
+    param_1_bool = ParamModel(name='bool_field', type_id=sqlalchemy_param_types['param.Boolean'],
+                              value='true', instance_id=instance_1.id)
 
     sqlalchemy_session.add(param_1_number)
     sqlalchemy_session.add(param_1_integer)
@@ -92,7 +102,7 @@ def sqlalchemy_instance_model_complete(sqlalchemy_session_factory):
 
 
 @pytest.fixture()
-def sqlalchemy_instance_model_missing(sqlalchemy_session_factory):
+def sqlalchemy_instance_model_missing(sqlalchemy_session_factory, sqlalchemy_param_types):
     """
     Create session-wide database.
     """
@@ -106,12 +116,10 @@ def sqlalchemy_instance_model_missing(sqlalchemy_session_factory):
     sqlalchemy_session.add(instance_1)
 
     # Params for Instance 1
-    param_1_number = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "number_field", "type": "param.Number", "value": 1.7}',
-                                instance_id=instance_1.id)
-    param_1_bool = ParamModel(id=str(uuid.uuid4()),
-                              value='{"name": "bool_field", "type": "param.Boolean", "value": true}',
-                              instance_id=instance_1.id)
+    param_1_number = ParamModel(name='number_field', type_id=sqlalchemy_param_types['param.Number'],
+                                value='1.7', instance_id=instance_1.id)
+    param_1_bool = ParamModel(name='bool_field', type_id=sqlalchemy_param_types['param.Boolean'],
+                              value='true', instance_id=instance_1.id)
 
     sqlalchemy_session.add(param_1_number)
     sqlalchemy_session.add(param_1_bool)
@@ -122,7 +130,7 @@ def sqlalchemy_instance_model_missing(sqlalchemy_session_factory):
 
 
 @pytest.fixture()
-def sqlalchemy_instance_model_extra(sqlalchemy_session_factory):
+def sqlalchemy_instance_model_extra(sqlalchemy_session_factory, sqlalchemy_param_types):
     """
     Create session-wide database.
     """
@@ -136,26 +144,18 @@ def sqlalchemy_instance_model_extra(sqlalchemy_session_factory):
     sqlalchemy_session.add(instance_1)
 
     # Params for Instance 1
-    param_1_number = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "number_field", "type": "param.Number", "value": 1.7}',
-                                instance_id=instance_1.id)
-    param_1_integer = ParamModel(id=str(uuid.uuid4()),
-                                 value='{"name": "integer_field", "type": "param.Integer", "value": 9}',
-                                 instance_id=instance_1.id)
-    param_1_string = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "string_field", "type": "param.parameterized.String", '
-                                      '"value": "Test String"}',
-                                instance_id=instance_1.id)
-    param_1_bool = ParamModel(id=str(uuid.uuid4()),
-                              value='{"name": "bool_field", "type": "param.Boolean", "value": true}',
-                              instance_id=instance_1.id)
-    param_1_garbage1 = ParamModel(id=str(uuid.uuid4()),
-                                  value='{"name": "garbage_field_2", "type": "param.parameterized.String", '
-                                        '"value": "Garbage TestString"}',
-                                  instance_id=instance_1.id)
-    param_1_garbage2 = ParamModel(id=str(uuid.uuid4()),
-                                  value='{"name": "garbage_field_2", "type": "param.Boolean", "value": true}',
-                                  instance_id=instance_1.id)
+    param_1_number = ParamModel(name='number_field', type_id=sqlalchemy_param_types['param.Number'],
+                                value='1.7', instance_id=instance_1.id)
+    param_1_integer = ParamModel(name='integer_field', type_id=sqlalchemy_param_types['param.Integer'],
+                                 value='9', instance_id=instance_1.id)
+    param_1_string = ParamModel(name='string_field', type_id=sqlalchemy_param_types['param.parameterized.String'],
+                                value='"Test String"', instance_id=instance_1.id)
+    param_1_bool = ParamModel(name='bool_field', type_id=sqlalchemy_param_types['param.Boolean'],
+                              value='true', instance_id=instance_1.id)
+    param_1_garbage1 = ParamModel(name='garbage_field_1', type_id=sqlalchemy_param_types['param.parameterized.String'],
+                                  value='"Garbage TestString"', instance_id=instance_1.id)
+    param_1_garbage2 = ParamModel(name='garbage_field_2', type_id=sqlalchemy_param_types['param.Boolean'],
+                                  value='true', instance_id=instance_1.id)
 
     sqlalchemy_session.add(param_1_number)
     sqlalchemy_session.add(param_1_integer)
@@ -170,7 +170,7 @@ def sqlalchemy_instance_model_extra(sqlalchemy_session_factory):
 
 
 @pytest.fixture()
-def sqlalchemy_instance_invalid_class(sqlalchemy_session_factory):
+def sqlalchemy_instance_invalid_class(sqlalchemy_session_factory, sqlalchemy_param_types):
     """
     Create session-wide database.
     """
@@ -183,19 +183,14 @@ def sqlalchemy_instance_invalid_class(sqlalchemy_session_factory):
     sqlalchemy_session.add(instance_1)
 
     # Params for Instance 1
-    param_1_number = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "number_field", "type": "param.Number", "value": 1.7}',
-                                instance_id=instance_1.id)
-    param_1_integer = ParamModel(id=str(uuid.uuid4()),
-                                 value='{"name": "integer_field", "type": "param.Integer", "value": 9}',
-                                 instance_id=instance_1.id)
-    param_1_string = ParamModel(id=str(uuid.uuid4()),
-                                value='{"name": "string_field", "type": "param.parameterized.String", '
-                                      '"value": "Test String"}',
-                                instance_id=instance_1.id)
-    param_1_bool = ParamModel(id=str(uuid.uuid4()),
-                              value='{"name": "bool_field", "type": "param.Boolean", "value": true}',
-                              instance_id=instance_1.id)
+    param_1_number = ParamModel(name='number_field', type_id=sqlalchemy_param_types['param.Number'],
+                                value='1.7', instance_id=instance_1.id)
+    param_1_integer = ParamModel(name='integer_field', type_id=sqlalchemy_param_types['param.Integer'],
+                                 value='9', instance_id=instance_1.id)
+    param_1_string = ParamModel(name='string_field', type_id=sqlalchemy_param_types['param.parameterized.String'],
+                                value='"Test String"', instance_id=instance_1.id)
+    param_1_bool = ParamModel(name='bool_field', type_id=sqlalchemy_param_types['param.Boolean'],
+                              value='true', instance_id=instance_1.id)
 
     sqlalchemy_session.add(param_1_number)
     sqlalchemy_session.add(param_1_integer)
@@ -3,14 +3,20 @@ Tests for the SqlAlchemy agent.
 
 This file was created on August 06, 2020
 """
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import datetime
 import json
 import logging
 
 import param
 import pytest
+from sqlalchemy import create_engine, event, text
 
-from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
-from param_persist.sqlalchemy.models import InstanceModel, ParamModel
+from param_persist.agents.cache import InstanceCache
+from param_persist.agents.codecs import default_codecs
+from param_persist.agents.sqlalchemy_agent import (create_param_objects_in_worker, get_rows_in_worker, insert_missing,
+                                                   SqlAlchemyAgent, upsert)
+from param_persist.sqlalchemy.models import Base, BlobModel, InstanceModel, ParamModel, ParamTypeModel
 
 
 class AgentTestParam(param.Parameterized):
@@ -58,17 +64,74 @@ def test_save_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_sessio
 
     for p in param_models:
         assert p.instance_id == instance_model_id
-        param_dict = json.loads(p.value)
-        assert getattr(parameterized_class, param_dict['name']) == param_dict['value']
-        parameter_type = type(getattr(parameterized_class.param, param_dict['name']))
+        assert getattr(parameterized_class, p.name) == json.loads(p.value)
+        parameter_type = type(getattr(parameterized_class.param, p.name))
         base_type = '.'.join([parameter_type.__module__, parameter_type.__name__])
-        assert base_type == param_dict['type']
+        assert base_type == p.param_type.name
 
     assert param_model_count == 4
 
 
+def test_save_many_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test the save_many function of the param persist sqlalchemy agent.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    parameterized_classes = list()
+    for i in range(3):
+        parameterized_class = AgentTestParam()
+        parameterized_class.number_field = i + 0.5
+        parameterized_class.integer_field = i
+        parameterized_class.string_field = f"Testing Strings {i}"
+        parameterized_class.bool_field = bool(i % 2)
+        parameterized_classes.append(parameterized_class)
+
+    returned_instance_model_ids = agent.save_many(iter(parameterized_classes), batch_size=2)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 3
+    assert sqlalchemy_session.query(ParamModel).count() == 12
+    assert len(set(returned_instance_model_ids)) == 3
+
+    for parameterized_class, instance_model_id in zip(parameterized_classes, returned_instance_model_ids):
+        param_models = sqlalchemy_session.query(ParamModel).filter_by(instance_id=instance_model_id).all()
+        assert len(param_models) == 4
+        for p in param_models:
+            assert getattr(parameterized_class, p.name) == json.loads(p.value)
+
+
+def test_save_many_param_no_instances(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test the save_many function of the param persist sqlalchemy agent with no instances.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    assert agent.save_many([]) == []
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 0
+    assert sqlalchemy_session.query(ParamModel).count() == 0
+
+
+def test_save_many_param_shares_param_types(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that saving instances stores each param type once and references it from the param rows.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    agent.save_many([AgentTestParam(), AgentTestParam()])
+    agent.save(AgentTestParam())
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    type_names = sorted(x.name for x in sqlalchemy_session.query(ParamTypeModel))
+
+    assert type_names == ['param.Boolean', 'param.Integer', 'param.Number', 'param.parameterized.String']
+    assert sqlalchemy_session.query(ParamModel).filter(ParamModel.type_id.is_(None)).count() == 0
+
+
 def test_load_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_session_factory,
-                                            sqlalchemy_instance_model_complete):
+                                            sqlalchemy_instance_model_complete, sqlalchemy_param_types):
     """
     Test the load function of the param persist sqlalchemy agent with an invalid class.
     """
@@ -86,15 +149,14 @@ def test_load_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_sessio
 
     for p in param_models:
         assert p.instance_id == instance_model.id
-        param_dict = json.loads(p.value)
-        assert getattr(parameterized_instance, param_dict['name']) == param_dict['value']
-        parameter_type = type(getattr(parameterized_instance.param, param_dict['name']))
+        assert getattr(parameterized_instance, p.name) == json.loads(p.value)
+        parameter_type = type(getattr(parameterized_instance.param, p.name))
         base_type = '.'.join([parameter_type.__module__, parameter_type.__name__])
-        assert base_type == param_dict['type']
+        assert p.type_id == sqlalchemy_param_types[base_type]
 
 
 def test_load_param_missing_param_fields(sqlalchemy_engine, sqlalchemy_session_factory,
-                                         sqlalchemy_instance_model_missing):
+                                         sqlalchemy_instance_model_missing, sqlalchemy_param_types):
     """
     Test the load function of the param persist sqlalchemy agent with an missing fields.
     """
@@ -112,18 +174,17 @@ def test_load_param_missing_param_fields(sqlalchemy_engine, sqlalchemy_session_f
 
     for p in param_models:
         assert p.instance_id == instance_model.id
-        param_dict = json.loads(p.value)
-        assert getattr(parameterized_instance, param_dict['name']) == param_dict['value']
-        parameter_type = type(getattr(parameterized_instance.param, param_dict['name']))
+        assert getattr(parameterized_instance, p.name) == json.loads(p.value)
+        parameter_type = type(getattr(parameterized_instance.param, p.name))
         base_type = '.'.join([parameter_type.__module__, parameter_type.__name__])
-        assert base_type == param_dict['type']
+        assert p.type_id == sqlalchemy_param_types[base_type]
 
     assert parameterized_instance.integer_field == 1
     assert parameterized_instance.string_field == "My String"
 
 
 def test_load_param_extra_param_fields(sqlalchemy_engine, sqlalchemy_session_factory,
-                                       sqlalchemy_instance_model_extra):
+                                       sqlalchemy_instance_model_extra, sqlalchemy_param_types):
     """
     Test the load function of the param persist sqlalchemy agent with extra fields.
     """
@@ -142,15 +203,14 @@ def test_load_param_extra_param_fields(sqlalchemy_engine, sqlalchemy_session_fac
     assert len(param_models) == 6
     for p in param_models:
         assert p.instance_id == instance_model.id
-        param_dict = json.loads(p.value)
-        param_value = getattr(parameterized_instance, param_dict['name'], None)
+        param_value = getattr(parameterized_instance, p.name, None)
         if param_value is None:
-            assert param_dict['name'] in ['garbage_field_1', 'garbage_field_2']
+            assert p.name in ['garbage_field_1', 'garbage_field_2']
             continue
-        assert param_value == param_dict['value']
-        parameter_type = type(getattr(parameterized_instance.param, param_dict['name']))
+        assert param_value == json.loads(p.value)
+        parameter_type = type(getattr(parameterized_instance.param, p.name))
         base_type = '.'.join([parameter_type.__module__, parameter_type.__name__])
-        assert base_type == param_dict['type']
+        assert p.type_id == sqlalchemy_param_types[base_type]
 
 
 def test_load_param_with_invalid_class(sqlalchemy_engine, sqlalchemy_instance_invalid_class):
@@ -166,6 +226,45 @@ def test_load_param_with_invalid_class(sqlalchemy_engine, sqlalchemy_instance_in
            'Given path is "this.is.not.a.valid.module.InvalidParamClass"' in str(excinfo.value)
 
 
+def test_load_many_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_instance_model_complete,
+                                                 sqlalchemy_instance_model_missing, caplog):
+    """
+    Test the load_many function of the param persist sqlalchemy agent.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    instance_ids = [sqlalchemy_instance_model_missing.id, 'not-a-valid-uuid', sqlalchemy_instance_model_complete.id]
+    with caplog.at_level(logging.WARNING):
+        parameterized_instances = agent.load_many(instance_ids, batch_size=2)
+
+    assert 'unable to query database with given instance id. id="not-a-valid-uuid"' in str(caplog.text)
+    assert list(parameterized_instances.keys()) == instance_ids
+    assert parameterized_instances['not-a-valid-uuid'] is None
+
+    complete_instance = parameterized_instances[sqlalchemy_instance_model_complete.id]
+    assert type(complete_instance) is AgentTestParam
+    assert complete_instance.number_field == 1.7
+    assert complete_instance.integer_field == 9
+    assert complete_instance.string_field == "Test String"
+    assert complete_instance.bool_field is True
+
+    missing_instance = parameterized_instances[sqlalchemy_instance_model_missing.id]
+    assert type(missing_instance) is AgentTestParam
+    assert missing_instance.number_field == 1.7
+    assert missing_instance.integer_field == 1
+    assert missing_instance.string_field == "My String"
+    assert missing_instance.bool_field is True
+
+
+def test_load_many_param_no_ids(sqlalchemy_engine):
+    """
+    Test the load_many function of the param persist sqlalchemy agent with no ids.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    assert agent.load_many([]) == {}
+
+
 def test_delete_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_session_factory,
                                               sqlalchemy_instance_model_complete):
     """
@@ -218,11 +317,10 @@ def test_update_param_using_sqlalchemy_engine(sqlalchemy_engine, sqlalchemy_sess
 
     for p in param_models:
         assert p.instance_id == instance_model_id
-        param_dict = json.loads(p.value)
-        assert getattr(parameterized_class, param_dict['name']) == param_dict['value']
-        parameter_type = type(getattr(parameterized_class.param, param_dict['name']))
+        assert getattr(parameterized_class, p.name) == json.loads(p.value)
+        parameter_type = type(getattr(parameterized_class.param, p.name))
         base_type = '.'.join([parameter_type.__module__, parameter_type.__name__])
-        assert base_type == param_dict['type']
+        assert base_type == p.param_type.name
 
     assert param_model_count == 4
 
@@ -266,10 +364,1179 @@ def test_update_param_removing_attribute(sqlalchemy_engine, sqlalchemy_session_f
 
     for p in param_models:
         assert p.instance_id == instance_model_id
-        param_dict = json.loads(p.value)
-        assert getattr(parameterized_class, param_dict['name']) == param_dict['value']
-        parameter_type = type(getattr(parameterized_class.param, param_dict['name']))
+        assert getattr(parameterized_class, p.name) == json.loads(p.value)
+        parameter_type = type(getattr(parameterized_class.param, p.name))
         base_type = '.'.join([parameter_type.__module__, parameter_type.__name__])
-        assert base_type == param_dict['type']
+        assert base_type == p.param_type.name
 
     assert param_model_count == 3
+
+
+def test_update_param_adding_attribute(sqlalchemy_engine, sqlalchemy_session_factory,
+                                       sqlalchemy_instance_model_missing):
+    """
+    Test that updating an instance model inserts the params that are not in the database yet.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    parameterized_class = AgentTestParam()
+    parameterized_class.number_field = 3.21
+    parameterized_class.integer_field = 123
+    parameterized_class.string_field = "Updated Strings"
+
+    agent.update(parameterized_class, sqlalchemy_instance_model_missing.id)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    param_models = sqlalchemy_session.query(ParamModel).filter_by(instance_id=sqlalchemy_instance_model_missing.id)
+    param_values = {p.name: json.loads(p.value) for p in param_models}
+
+    assert sorted(param_values.keys()) == ['bool_field', 'integer_field', 'number_field', 'string_field']
+    for name, value in param_values.items():
+        assert getattr(parameterized_class, name) == value
+
+
+def test_update_param_removing_extra_attributes(sqlalchemy_engine, sqlalchemy_session_factory,
+                                                sqlalchemy_instance_model_extra):
+    """
+    Test that updating an instance model deletes the params that are not on the instance.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    agent.update(AgentTestParam(), sqlalchemy_instance_model_extra.id)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    param_models = sqlalchemy_session.query(ParamModel).filter_by(instance_id=sqlalchemy_instance_model_extra.id)
+    param_names = sorted(p.name for p in param_models)
+
+    assert param_names == ['bool_field', 'integer_field', 'number_field', 'string_field']
+
+
+def test_update_param_only_writes_changes(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that updating an instance model only writes the params that changed.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+
+    statements = list()
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+    try:
+        agent.update(parameterized_class, instance_id)
+        assert [x for x in statements if x in ('INSERT', 'UPDATE', 'DELETE')] == []
+
+        parameterized_class.integer_field = 42
+        agent.update(parameterized_class, instance_id)
+    finally:
+        event.remove(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+
+    # The params update, then the saved time of the instance
+    assert [x for x in statements if x in ('INSERT', 'UPDATE', 'DELETE')] == ['UPDATE', 'UPDATE']
+
+    assert agent.load(instance_id).integer_field == 42
+
+
+def test_invalid_storage(sqlalchemy_engine):
+    """
+    Test creating an agent with an unknown storage raises.
+    """
+    with pytest.raises(ValueError) as excinfo:
+        SqlAlchemyAgent(sqlalchemy_engine, storage='columns')
+
+    assert 'Storage must be "params" or "document". Given storage is "columns"' in str(excinfo.value)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_save_load_document_storage(sqlalchemy_engine, sqlalchemy_session_factory, compress):
+    """
+    Test that document storage saves an instance as a single row and loads it back.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage='document', compress=compress)
+
+    parameterized_class = AgentTestParam()
+    parameterized_class.number_field = 1.7
+    parameterized_class.string_field = "Testing Strings"
+
+    instance_id = agent.save(parameterized_class)
+    instance_ids = agent.save_many([parameterized_class, AgentTestParam()])
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 3
+    assert sqlalchemy_session.query(ParamModel).count() == 0
+    document = sqlalchemy_session.query(InstanceModel).get(instance_id).document
+    assert document.startswith(b'{') is not compress
+
+    loaded_instance = agent.load(instance_id)
+    assert loaded_instance.number_field == 1.7
+    assert loaded_instance.string_field == "Testing Strings"
+
+    loaded_instances = agent.load_many(instance_ids)
+    assert loaded_instances[instance_ids[0]].number_field == 1.7
+    assert loaded_instances[instance_ids[1]].number_field == 0.5
+
+
+def test_update_delete_document_storage(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that document storage updates and deletes the single row of an instance.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage='document')
+
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+
+    parameterized_class.integer_field = 42
+    agent.update(parameterized_class, instance_id)
+    assert agent.load(instance_id).integer_field == 42
+
+    agent.delete(instance_id)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 0
+
+
+def test_update_converts_between_storages(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that updating an instance saved with the other storage converts it to the storage of the agent.
+    """
+    params_agent = SqlAlchemyAgent(sqlalchemy_engine)
+    document_agent = SqlAlchemyAgent(sqlalchemy_engine, storage='document')
+
+    parameterized_class = AgentTestParam()
+    instance_id = params_agent.save(parameterized_class)
+
+    parameterized_class.integer_field = 42
+    document_agent.update(parameterized_class, instance_id)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(ParamModel).count() == 0
+    assert params_agent.load(instance_id).integer_field == 42
+
+    parameterized_class.integer_field = 43
+    params_agent.update(parameterized_class, instance_id)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(ParamModel).count() == 4
+    assert sqlalchemy_session.query(InstanceModel).get(instance_id).document is None
+    assert document_agent.load_many([instance_id])[instance_id].integer_field == 43
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_load_with_cache(sqlalchemy_engine, storage):
+    """
+    Test that loading with a cache queries the database once and hands out independent instances.
+    """
+    cache = InstanceCache()
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, cache=cache)
+
+    parameterized_class = AgentTestParam()
+    parameterized_class.integer_field = 42
+    instance_id = agent.save(parameterized_class)
+
+    first = agent.load(instance_id)
+    first.integer_field = 7
+
+    statements = list()
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+    try:
+        second = agent.load(instance_id)
+        many = agent.load_many([instance_id])
+    finally:
+        event.remove(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+
+    assert statements == []
+    assert second.integer_field == 42
+    assert many[instance_id].integer_field == 42
+    assert second is not many[instance_id]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_invalidated_by_update_and_delete(sqlalchemy_engine, caplog):
+    """
+    Test that updating and deleting an instance removes it from the cache of the agent.
+    """
+    cache = InstanceCache()
+    agent = SqlAlchemyAgent(sqlalchemy_engine, cache=cache)
+
+    parameterized_class = AgentTestParam()
+    instance_ids = agent.save_many([parameterized_class, parameterized_class])
+    agent.load_many(instance_ids)
+    assert len(cache) == 2
+
+    parameterized_class.integer_field = 42
+    agent.update(parameterized_class, instance_ids[0])
+    assert len(cache) == 1
+    assert agent.load(instance_ids[0]).integer_field == 42
+
+    agent.delete(instance_ids[1])
+    assert len(cache) == 1
+    with caplog.at_level(logging.WARNING):
+        assert agent.load_many([instance_ids[1]])[instance_ids[1]] is None
+
+
+@pytest.mark.parametrize('write', [
+    lambda agent, instance_id: agent.delete(instance_id),
+    lambda agent, instance_id: agent.delete_many([instance_id]),
+    lambda agent, instance_id: agent.purge(class_path=agent.get_class_path_from_param_class(AgentTestParam)),
+    lambda agent, instance_id: agent.save_or_update(AgentTestParam(integer_field=2), instance_id),
+], ids=['delete', 'delete_many', 'purge', 'save_or_update'])
+def test_cache_invalidated_after_commit(sqlalchemy_engine, write):
+    """
+    Test that writes invalidate the cache after they commit, so loads cached while they run do not outlive them.
+    """
+    cache = InstanceCache()
+    agent = SqlAlchemyAgent(sqlalchemy_engine, cache=cache)
+    instance_id = agent.save(AgentTestParam())
+    agent.load(instance_id)
+    class_path, serialized_data = cache.get(instance_id)
+
+    def load_before_commit(conn):
+        cache.put(instance_id, class_path, serialized_data)
+
+    event.listen(sqlalchemy_engine, 'commit', load_before_commit)
+    try:
+        write(agent, instance_id)
+    finally:
+        event.remove(sqlalchemy_engine, 'commit', load_before_commit)
+
+    assert cache.get(instance_id) is None
+
+
+def test_transaction_commits_once(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that the agent functions called in a transaction share one session and commit once at the end.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+    commits = list()
+
+    def record_commit(conn):
+        commits.append(conn)
+
+    event.listen(sqlalchemy_engine, 'commit', record_commit)
+
+    parameterized_class = AgentTestParam()
+    try:
+        with agent.transaction() as tx:
+            instance_id = tx.save(parameterized_class)
+            other_ids = tx.save_many([parameterized_class, parameterized_class])
+            parameterized_class.integer_field = 42
+            tx.update(parameterized_class, instance_id)
+            tx.delete(other_ids[0])
+            assert tx.load(instance_id).integer_field == 42
+            assert tx.load_many(other_ids[1:])[other_ids[1]].integer_field == 1
+            assert commits == []
+    finally:
+        event.remove(sqlalchemy_engine, 'commit', record_commit)
+
+    assert len(commits) == 1
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 2
+    assert agent.load(instance_id).integer_field == 42
+
+
+def test_transaction_rolls_back(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that everything done in a transaction is rolled back when it raises, including the cached loads.
+    """
+    cache = InstanceCache()
+    agent = SqlAlchemyAgent(sqlalchemy_engine, cache=cache)
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+
+    with pytest.raises(RuntimeError):
+        with agent.transaction() as tx:
+            tx.save(parameterized_class)
+            parameterized_class.integer_field = 42
+            tx.update(parameterized_class, instance_id)
+            tx.load(instance_id)
+            raise RuntimeError('Something went wrong.')
+
+    assert len(cache) == 0
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 1
+    assert agent.load(instance_id).integer_field == 1
+
+
+def test_transaction_invalidates_cache_when_it_ends(tmp_path):
+    """
+    Test that instances written in a transaction and cached by other sessions before it ends are invalidated.
+    """
+    engine = create_engine(f'sqlite:///{tmp_path / "agent.db"}')
+    Base.metadata.create_all(engine)
+    agent = SqlAlchemyAgent(engine, cache=InstanceCache())
+    instance_id, deleted_id = agent.save_many([AgentTestParam(number_field=2.0), AgentTestParam()])
+
+    with agent.transaction() as tx:
+        tx.update(AgentTestParam(number_field=4.0), instance_id)
+        tx.delete(deleted_id)
+        assert agent.load(instance_id).number_field == 2.0
+        assert agent.load(deleted_id) is not None
+
+    assert agent.load(instance_id).number_field == 4.0
+    assert agent.load_many([deleted_id])[deleted_id] is None
+
+    with pytest.raises(RuntimeError):
+        with agent.transaction() as tx:
+            tx.update(AgentTestParam(number_field=8.0), instance_id)
+            assert tx.load(instance_id).number_field == 8.0
+            raise RuntimeError('Something went wrong.')
+
+    assert agent.load(instance_id).number_field == 4.0
+
+    with agent.transaction() as tx:
+        tx.purge(class_path=agent.get_class_path_from_param_class(AgentTestParam))
+        assert agent.load(instance_id) is not None
+
+    assert agent.load_many([instance_id])[instance_id] is None
+    engine.dispose()
+
+
+@pytest.mark.parametrize('load_many', [False, True])
+def test_transaction_loads_bypass_cache(tmp_path, load_many):
+    """
+    Test that loads in a transaction do not cache its uncommitted data for other sessions, nor read stale entries.
+    """
+    engine = create_engine(f'sqlite:///{tmp_path / "agent.db"}')
+    Base.metadata.create_all(engine)
+    cache = InstanceCache()
+    agent = SqlAlchemyAgent(engine, cache=cache)
+    instance_id = agent.save(AgentTestParam(integer_field=1))
+
+    def load(target):
+        return target.load_many([instance_id])[instance_id] if load_many else target.load(instance_id)
+
+    with pytest.raises(RuntimeError):
+        with agent.transaction() as tx:
+            tx.update(AgentTestParam(integer_field=99), instance_id)
+            assert load(tx).integer_field == 99
+            assert len(cache) == 0
+            assert load(agent).integer_field == 1
+            assert load(tx).integer_field == 99
+            raise RuntimeError('Something went wrong.')
+
+    assert load(agent).integer_field == 1
+    engine.dispose()
+
+
+class AgentTestListParam(param.Parameterized):
+    """
+    A Test param class with a list param for testing the change tracking.
+    """
+    integer_field = param.Integer(1, doc="A simple integer field.")
+    list_field = param.List([1, 2], doc="A simple list field.")
+
+
+def test_update_tracked_changes(sqlalchemy_engine, mocker):
+    """
+    Test that an agent that tracks changes only serializes and writes the params assigned since save or load.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, track_changes=True)
+
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+    get_serialized_param = mocker.spy(agent, 'get_serialized_param')
+
+    statements = list()
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+    try:
+        agent.update(parameterized_class, instance_id)
+        assert statements == ['SELECT']
+
+        parameterized_class.integer_field = 42
+        agent.update(parameterized_class, instance_id)
+    finally:
+        event.remove(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+
+    assert [x for x in statements if x in ('INSERT', 'UPDATE', 'DELETE')] == ['UPDATE', 'UPDATE']
+    get_serialized_param.assert_called_once_with(parameterized_class, {'integer_field'})
+
+    loaded_instance = agent.load(instance_id)
+    assert loaded_instance.integer_field == 42
+
+    loaded_instance.string_field = "Loaded And Changed"
+    agent.update(loaded_instance, instance_id)
+    assert agent.load(instance_id).string_field == "Loaded And Changed"
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_update_tracked_changes_mark_dirty(sqlalchemy_engine, storage):
+    """
+    Test that params changed in place are written once marked dirty.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, track_changes=True)
+
+    parameterized_class = AgentTestListParam()
+    instance_id = agent.save(parameterized_class)
+
+    parameterized_class.list_field.append(3)
+    agent.update(parameterized_class, instance_id)
+    assert agent.load(instance_id).list_field == [1, 2]
+
+    agent.mark_dirty(parameterized_class, 'list_field')
+    parameterized_class.integer_field = 42
+    agent.update(parameterized_class, instance_id)
+
+    loaded_instance = agent.load(instance_id)
+    assert loaded_instance.list_field == [1, 2, 3]
+    assert loaded_instance.integer_field == 42
+
+
+def test_update_tracked_changes_missing_instance(sqlalchemy_engine):
+    """
+    Test that updating a tracked instance without changes still raises if the instance was deleted.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, track_changes=True)
+
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+    agent.delete(instance_id)
+
+    with pytest.raises(RuntimeError):
+        agent.update(parameterized_class, instance_id)
+
+
+def test_update_tracked_changes_rolled_back(sqlalchemy_engine):
+    """
+    Test that the changes written in a transaction that rolls back are written again by the next update.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, track_changes=True)
+
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+    parameterized_class.integer_field = 5
+
+    with pytest.raises(RuntimeError):
+        with agent.transaction() as tx:
+            tx.update(parameterized_class, instance_id)
+            raise RuntimeError('Something went wrong.')
+    agent.update(parameterized_class, instance_id)
+    assert agent.load(instance_id).integer_field == 5
+
+    with pytest.raises(RuntimeError):
+        with agent.transaction() as tx:
+            saved_id = tx.save(parameterized_class)
+            raise RuntimeError('Something went wrong.')
+    with pytest.raises(RuntimeError):
+        agent.update(parameterized_class, saved_id)
+
+
+def test_update_tracked_changes_other_id(sqlalchemy_engine):
+    """
+    Test that updating another id than the one an instance was tracked with writes all its params.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, track_changes=True)
+
+    instance_ids = agent.save_many([AgentTestParam(), AgentTestParam(integer_field=7)])
+    parameterized_class = agent.load(instance_ids[0])
+
+    agent.update(parameterized_class, instance_ids[1])
+
+    assert agent.load(instance_ids[1]).integer_field == 1
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_load_selected_params(sqlalchemy_engine, storage):
+    """
+    Test that loading selected params only queries those params and loads the others on first access.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, cache=InstanceCache())
+    instance_id = agent.save(AgentTestListParam(integer_field=42, list_field=[3]))
+
+    statements = list()
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(parameters)
+
+    event.listen(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+    try:
+        loaded_instance = agent.load(instance_id, params=['integer_field'])
+    finally:
+        event.remove(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+
+    assert loaded_instance.integer_field == 42
+    if storage == 'params':
+        assert 'integer_field' in statements[-1] and 'list_field' not in statements[-1]
+    assert loaded_instance.list_field == [3]
+    assert len(agent.cache) == 0
+
+    agent.load(instance_id)
+    cached_instance = agent.load(instance_id, params=['list_field'])
+    assert (cached_instance.integer_field, cached_instance.list_field) == (42, [3])
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_load_lazy_params(sqlalchemy_engine, storage, mocker):
+    """
+    Test that lazy params are only loaded and deserialized when they are first accessed.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, track_changes=True)
+    instance_id = agent.save(AgentTestListParam(integer_field=42, list_field=[3]))
+    load_serialized_params = mocker.spy(agent, 'load_serialized_params')
+
+    loaded_instance = agent.load(instance_id, lazy_params=['list_field'])
+
+    assert loaded_instance.integer_field == 42
+    assert type(loaded_instance) is not AgentTestListParam
+    assert agent.get_class_path_from_param_instance(loaded_instance) == \
+        agent.get_class_path_from_param_class(AgentTestListParam)
+    load_serialized_params.assert_not_called()
+
+    assert loaded_instance.list_field == [3]
+    assert type(loaded_instance) is AgentTestListParam
+    assert load_serialized_params.call_count == (1 if storage == 'params' else 0)
+    assert agent.change_tracker.get_dirty_param_names(loaded_instance, instance_id) == set()
+
+    partial_instance = agent.load(instance_id, params=['integer_field'], lazy_params=['integer_field', 'list_field'])
+    partial_instance.integer_field = 7
+    agent.update(partial_instance, instance_id)
+    assert partial_instance.list_field == [3]
+    assert agent.load(instance_id).integer_field == 7
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_update_selected_params(sqlalchemy_engine, storage):
+    """
+    Test that updating an instance loaded with selected params keeps the stored values of the other params.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage)
+    instance_id = agent.save(AgentTestParam(number_field=2.5, integer_field=5, string_field='keep'))
+
+    partial_instance = agent.load(instance_id, params=['bool_field'])
+    partial_instance.bool_field = True
+    agent.update(partial_instance, instance_id)
+
+    loaded_instance = agent.load(instance_id)
+    assert (loaded_instance.number_field, loaded_instance.integer_field, loaded_instance.string_field,
+            loaded_instance.bool_field) == (2.5, 5, 'keep', True)
+
+
+def test_load_selected_params_in_transaction(tmp_path):
+    """
+    Test that params not selected by a load in a transaction are loaded with the uncommitted rows of the transaction.
+    """
+    engine = create_engine(f'sqlite:///{tmp_path / "agent.db"}')
+    Base.metadata.create_all(engine)
+    agent = SqlAlchemyAgent(engine)
+
+    with agent.transaction() as tx:
+        instance_id = tx.save(AgentTestParam(integer_field=3, string_field='saved'))
+        partial_instance = tx.load(instance_id, params=['integer_field'])
+        partial_instance.integer_field = 4
+        tx.update(partial_instance, instance_id)
+        lazy_instance = tx.load(instance_id, params=['integer_field'])
+
+    assert lazy_instance.string_field == 'saved'
+    loaded_instance = agent.load(instance_id)
+    assert (loaded_instance.integer_field, loaded_instance.string_field) == (4, 'saved')
+    engine.dispose()
+
+
+def test_load_selected_params_of_changed_instance(sqlalchemy_engine):
+    """
+    Test that params not selected by a load are loaded from the current storage, and raise once it is deleted.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+    document_agent = SqlAlchemyAgent(sqlalchemy_engine, storage='document')
+    instance_id = agent.save(AgentTestParam(integer_field=3, string_field='saved'))
+
+    partial_instance = agent.load(instance_id, params=['integer_field'])
+    document_agent.update(AgentTestParam(integer_field=3, string_field='converted'), instance_id)
+    assert partial_instance.string_field == 'converted'
+
+    instance_id = agent.save(AgentTestParam(integer_field=3, string_field='saved'))
+    partial_instance = agent.load(instance_id, params=['integer_field'])
+    agent.delete(instance_id)
+    with pytest.raises(RuntimeError) as excinfo:
+        partial_instance.string_field
+
+    assert f'Parameterized instance with id "{instance_id}" does not exist.' in str(excinfo.value)
+
+
+class AgentTestArrayParam(param.Parameterized):
+    """
+    A Test param class with array and list params for testing the codecs.
+    """
+    integer_field = param.Integer(1, doc="A simple integer field.")
+    array_field = param.Array(None, doc="A simple array field.")
+    list_field = param.List([1, 2], doc="A simple list field.")
+
+
+def test_save_load_update_with_codecs(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that params with a codec are stored in the data column and round-trip through save, load and update.
+    """
+    np = pytest.importorskip('numpy')
+
+    agent = SqlAlchemyAgent(sqlalchemy_engine, codecs=default_codecs('zlib', min_list_length=3))
+    parameterized_class = AgentTestArrayParam(array_field=np.arange(6.0).reshape(2, 3), list_field=[1, 2, 3])
+    instance_id = agent.save(parameterized_class)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    rows = {name: (value, data) for name, value, data in
+            sqlalchemy_session.query(ParamModel.name, ParamModel.value, ParamModel.data)}
+    assert rows['integer_field'] == ('1', None)
+    assert rows['array_field'][0] is None and rows['array_field'][1].startswith(b'npy;zlib\n')
+    assert rows['list_field'][0] is None and rows['list_field'][1].startswith(b'list;zlib\n')
+
+    loaded_instance = agent.load(instance_id)
+    np.testing.assert_array_equal(loaded_instance.array_field, np.arange(6.0).reshape(2, 3))
+    assert loaded_instance.list_field == [1, 2, 3]
+
+    parameterized_class.list_field = [4]
+    parameterized_class.array_field = np.ones(2)
+    agent.update(parameterized_class, instance_id)
+
+    loaded_instance = agent.load_many([instance_id])[instance_id]
+    np.testing.assert_array_equal(loaded_instance.array_field, np.ones(2))
+    assert loaded_instance.list_field == [4]
+
+    json_agent = SqlAlchemyAgent(sqlalchemy_engine)
+    json_agent.update(loaded_instance, instance_id)
+    assert sqlalchemy_session.query(ParamModel.data).filter(ParamModel.data.isnot(None)).count() == 0
+    np.testing.assert_array_equal(agent.load(instance_id).array_field, np.ones(2))
+
+
+def test_save_load_update_dedup(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test that an agent with dedup stores each distinct param value once and loads the instances back.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, dedup=True)
+    instance_ids = agent.save_many([AgentTestParam(), AgentTestParam(), AgentTestParam(string_field="Other")])
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(BlobModel).count() == 5
+    assert sqlalchemy_session.query(ParamModel).filter(ParamModel.value.isnot(None)).count() == 0
+
+    loaded_instances = agent.load_many(instance_ids)
+    assert [x.string_field for x in loaded_instances.values()] == ["My String", "My String", "Other"]
+    assert agent.load(instance_ids[0], params=['integer_field']).integer_field == 1
+
+    instance_id = agent.save(AgentTestParam(string_field="Other"))
+    assert sqlalchemy_session.query(BlobModel).count() == 5
+
+    parameterized_class = loaded_instances[instance_ids[2]]
+    parameterized_class.string_field = "Changed"
+    agent.update(parameterized_class, instance_ids[2])
+    agent.delete(instance_id)
+    assert sqlalchemy_session.query(BlobModel).count() == 6
+    assert agent.delete_unused_blobs() == 1
+    assert sqlalchemy_session.query(BlobModel).count() == 5
+    assert agent.load(instance_ids[2]).string_field == "Changed"
+
+    SqlAlchemyAgent(sqlalchemy_engine).update(parameterized_class, instance_ids[2])
+    value = sqlalchemy_session.query(ParamModel.value). \
+        filter_by(instance_id=instance_ids[2], name='string_field').scalar()
+    assert value == '"Changed"'
+    assert agent.load(instance_ids[2]).string_field == "Changed"
+
+
+def test_dedup_with_codecs(sqlalchemy_engine):
+    """
+    Test that values encoded by codecs are deduplicated too.
+    """
+    np = pytest.importorskip('numpy')
+
+    agent = SqlAlchemyAgent(sqlalchemy_engine, codecs=default_codecs(), dedup=True)
+    instance_ids = agent.save_many([AgentTestArrayParam(array_field=np.arange(3)) for _ in range(2)])
+
+    for instance in agent.load_many(instance_ids).values():
+        np.testing.assert_array_equal(instance.array_field, np.arange(3))
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_skip_defaults(sqlalchemy_engine, sqlalchemy_session_factory, storage):
+    """
+    Test that an agent that skips defaults leaves out the params at their class default.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, skip_defaults=True, track_changes=True)
+    parameterized_class = AgentTestParam(integer_field=42)
+    instance_id = agent.save(parameterized_class)
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    if storage == 'params':
+        assert [x for x, in sqlalchemy_session.query(ParamModel.name)] == ['integer_field']
+    else:
+        document = sqlalchemy_session.query(InstanceModel.document).scalar()
+        assert json.loads(document) == {'integer_field': 42}
+
+    loaded_instance = agent.load(instance_id)
+    assert (loaded_instance.integer_field, loaded_instance.string_field) == (42, "My String")
+
+    parameterized_class.integer_field = 1
+    parameterized_class.bool_field = True
+    agent.update(parameterized_class, instance_id)
+
+    if storage == 'params':
+        assert [x for x, in sqlalchemy_session.query(ParamModel.name)] == ['bool_field']
+    else:
+        document = sqlalchemy_session.query(InstanceModel.document).scalar()
+        assert json.loads(document) == {'bool_field': True}
+    loaded_instance = agent.load(instance_id)
+    assert (loaded_instance.integer_field, loaded_instance.bool_field) == (1, True)
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_find(sqlalchemy_engine, storage):
+    """
+    Test finding the ids of instances by class path and param values.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage)
+    instance_ids = agent.save_many([AgentTestParam(integer_field=x % 3, string_field=f'String {x % 2}')
+                                    for x in range(6)])
+    other_id = agent.save(AgentTestParamMissing(integer_field=1))
+    class_path = agent.get_class_path_from_param_class(AgentTestParam)
+
+    assert agent.find() == sorted(instance_ids + [other_id])
+    assert agent.find(class_path=class_path) == sorted(instance_ids)
+    assert agent.find(where={'integer_field': 1}) == sorted([instance_ids[1], instance_ids[4], other_id])
+    assert agent.find(class_path=class_path, where={'integer_field': 1, 'string_field': 'String 0'}) == \
+        [instance_ids[4]]
+    assert agent.find(class_path=class_path, where={'integer_field': 7}) == []
+    assert agent.find(class_path=class_path, where={'garbage_field': 1}) == []
+
+    matching_ids = sorted(instance_ids[x] for x in (0, 2, 4))
+    assert agent.find(class_path=class_path, where={'string_field': 'String 0'}, limit=2) == matching_ids[:2]
+    assert agent.find(class_path=class_path, where={'string_field': 'String 0'}, offset=1) == matching_ids[1:]
+
+
+def test_find_in_transaction(sqlalchemy_engine):
+    """
+    Test finding the ids of instances saved in a transaction that has not committed yet.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+    class_path = agent.get_class_path_from_param_class(AgentTestParam)
+
+    with agent.transaction() as tx:
+        instance_id = tx.save(AgentTestParam(integer_field=42))
+        assert tx.find(class_path=class_path, where={'integer_field': 42}) == [instance_id]
+
+
+def test_find_unimportable_class(sqlalchemy_engine, caplog):
+    """
+    Test finding instances of a class that can not be imported matches the JSON values as given.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+    agent.save(AgentTestParam(integer_field=42))
+
+    with caplog.at_level(logging.WARNING):
+        assert agent.find(class_path='not_a_module.NotAClass', where={'integer_field': 42}) == []
+
+    assert 'unable to import the class to serialize the param values with. class_path="not_a_module.NotAClass"' \
+        in caplog.text
+
+
+def test_find_dedup_skip_defaults(sqlalchemy_engine):
+    """
+    Test finding instances whose params are deduplicated or left out at their class default.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, dedup=True, skip_defaults=True)
+    instance_ids = agent.save_many([AgentTestParam(), AgentTestParam(integer_field=42)])
+    document_id = SqlAlchemyAgent(sqlalchemy_engine, storage='document').save(AgentTestParam(integer_field=42))
+    class_path = agent.get_class_path_from_param_class(AgentTestParam)
+
+    assert agent.find(class_path=class_path, where={'integer_field': 42}) == sorted([instance_ids[1], document_id])
+    assert agent.find(class_path=class_path, where={'integer_field': 1}) == [instance_ids[0]]
+    assert agent.find(class_path=class_path, where={'string_field': 'My String'}, limit=1) == \
+        sorted(instance_ids + [document_id])[:1]
+
+
+def test_iter_instances(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test iterating over the saved instances of both storages in chunks.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, dedup=True)
+    instance_ids = agent.save_many([AgentTestParam(integer_field=x) for x in range(5)])
+    document_id = SqlAlchemyAgent(sqlalchemy_engine, storage='document').save(AgentTestParam(integer_field=42))
+    other_id = agent.save(AgentTestParamMissing())
+
+    instances = list(agent.iter_instances(chunk_size=3))
+    assert [x for x, _ in instances] == sorted(instance_ids + [document_id, other_id])
+
+    instances = dict(instances)
+    assert [instances[x].integer_field for x in instance_ids] == [0, 1, 2, 3, 4]
+    assert instances[document_id].integer_field == 42
+    assert type(instances[other_id]) is AgentTestParamMissing
+
+    class_path = agent.get_class_path_from_param_class(AgentTestParam)
+    raw_instances = dict(agent.iter_instances(class_path=class_path, raw=True))
+    assert sorted(raw_instances) == sorted(instance_ids + [document_id])
+    assert raw_instances[instance_ids[1]] == {
+        'class_path': class_path,
+        'params': {'number_field': 0.5, 'integer_field': 1, 'string_field': 'My String', 'bool_field': False},
+    }
+
+    iterator = agent.iter_instances(chunk_size=1)
+    next(iterator)
+    iterator.close()
+
+    with agent.transaction() as tx:
+        tx.delete(document_id)
+        assert document_id not in dict(tx.iter_instances())
+
+
+def test_iter_instances_rolls_back_on_error(sqlalchemy_engine, mocker):
+    """
+    Test that the session of an iteration is rolled back and closed when creating an instance raises.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+    agent.save(AgentTestParam())
+    sessions = list()
+    make_session = agent.make_session
+
+    def make_spied_session():
+        db_session = make_session()
+        sessions.append((mocker.spy(db_session, 'rollback'), mocker.spy(db_session, 'close')))
+        return db_session
+
+    mocker.patch.object(agent, 'make_session', side_effect=make_spied_session)
+    mocker.patch.object(agent, 'create_from_instance_rows', side_effect=RuntimeError('Something went wrong.'))
+
+    with pytest.raises(RuntimeError):
+        list(agent.iter_instances())
+
+    (rollback, close), = sessions
+    rollback.assert_called_once_with()
+    close.assert_called_once_with()
+
+
+@pytest.mark.parametrize('executor_class', [ThreadPoolExecutor, ProcessPoolExecutor])
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_save_many_load_many_with_executor(sqlalchemy_engine, executor_class, storage, mocker):
+    """
+    Test saving and loading many instances with the serialization spread over the workers of an executor.
+    """
+    mocker.patch('param_persist.agents.sqlalchemy_agent.EXECUTOR_CHUNK_SIZE', 3)
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, track_changes=True)
+    instances = [AgentTestParam(integer_field=x) for x in range(10)]
+
+    with executor_class(max_workers=2) as executor:
+        instance_ids = agent.save_many(instances, executor=executor)
+        loaded_instances = agent.load_many(instance_ids + ['not-a-valid-uuid'], executor=executor)
+
+    assert [loaded_instances[x].integer_field for x in instance_ids] == list(range(10))
+    assert loaded_instances['not-a-valid-uuid'] is None
+    assert list(loaded_instances) == instance_ids + ['not-a-valid-uuid']
+
+    instances[3].integer_field = 42
+    loaded_instances[instance_ids[4]].integer_field = 43
+    agent.update(instances[3], instance_ids[3])
+    agent.update(loaded_instances[instance_ids[4]], instance_ids[4])
+    assert [x.integer_field for x in agent.load_many(instance_ids[3:5]).values()] == [42, 43]
+
+
+def test_load_many_with_thread_executor_uses_agent(sqlalchemy_engine, mocker):
+    """
+    Test thread workers use the agent, so its registered classes are found and its listeners get the events.
+
+    The registered class is local to the test, so it is not importable by its class path.
+    """
+    mocker.patch('param_persist.agents.sqlalchemy_agent.EXECUTOR_CHUNK_SIZE', 2)
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+
+    @agent.register
+    class Local(param.Parameterized):
+        """A registered class that is not importable by its class path."""
+        number = param.Integer(0)
+
+    instance_ids = agent.save_many([Local(number=x) for x in range(5)])
+    events = list()
+    agent.listeners.append(events.append)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        loaded_instances = agent.load_many(instance_ids, executor=executor)
+        agent.save_many(list(loaded_instances.values()), executor=executor)
+
+    assert [x.number for x in loaded_instances.values()] == list(range(5))
+    assert all(type(x) is Local for x in loaded_instances.values())
+    assert {x.operation for x in events} == {'load_many', 'save_many'}
+
+
+def test_process_pool_workers(sqlalchemy_engine):
+    """
+    Test the functions run by process pool workers, in this process so the coverage of their lines is measured.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage='document')
+
+    class Local(param.Parameterized):
+        """A class that is not importable by its class path."""
+        number = param.Integer(0)
+
+    (instance_row, param_rows), = get_rows_in_worker(agent.get_serialization_options(), [Local(number=3)])
+    assert instance_row['document'] == b'{"number":3}'
+    assert param_rows == []
+
+    class_path = agent.get_class_path_from_param_class(Local)
+    instance, = create_param_objects_in_worker([Local], [(class_path, {'number': 4})])
+    assert type(instance) is Local
+    assert instance.number == 4
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_instrumentation_listeners(sqlalchemy_engine, storage):
+    """
+    Test the listeners of the agent are called with the phases of each operation, and only while they are added.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage)
+    events = list()
+
+    agent.save(AgentTestParam())
+    assert events == []
+
+    agent.add_listener(events.append)
+    instance = AgentTestParam(integer_field=5)
+    instance_id = agent.save(instance)
+    assert [(x.operation, x.phase) for x in events] == [
+        ('save', 'serialize'), ('save', 'db_write'), ('save', 'operation'),
+    ]
+    assert events[0].size > 0
+    assert events[0].param_count == (4 if storage == 'params' else None)
+    assert all(x.elapsed >= 0 for x in events)
+
+    events.clear()
+    assert agent.load(instance_id).integer_field == 5
+    assert [(x.operation, x.phase) for x in events] == [
+        ('load', 'db_read'), ('load', 'deserialize'), ('load', 'resolve'), ('load', 'construct'), ('load', 'operation'),
+    ]
+    assert events[1].param_count == 4
+    assert events[1].size > 0
+
+    events.clear()
+    instance.integer_field = 6
+    agent.update(instance, instance_id)
+    assert {x.phase for x in events} == {'db_read', 'serialize', 'db_write', 'operation'}
+    assert all(x.operation == 'update' for x in events)
+
+    events.clear()
+    agent.load_many([instance_id])
+    agent.delete(instance_id)
+    assert [x.operation for x in events if x.phase == 'operation'] == ['load_many', 'delete']
+
+    agent.remove_listener(events.append)
+    events.clear()
+    agent.save(instance)
+    assert events == []
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_save_or_update(sqlalchemy_engine, sqlalchemy_session_factory, storage):
+    """
+    Test saving or updating an instance with a given id inserts it, then replaces it, with few statements.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage, skip_defaults=True)
+    instance = AgentTestParam(integer_field=5, string_field='Changed', bool_field=True)
+
+    instance_id = agent.save_or_update(instance, 'my-instance')
+    assert instance_id == 'my-instance'
+    assert agent.save_or_update(instance, 'my-instance') == 'my-instance'
+    assert agent.load('my-instance').string_field == 'Changed'
+
+    statements = list()
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+    instance.string_field = 'My String'
+    instance.integer_field = 6
+    agent.save_or_update(instance, 'my-instance')
+    event.remove(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+
+    loaded = agent.load('my-instance')
+    assert (loaded.integer_field, loaded.string_field, loaded.bool_field) == (6, 'My String', True)
+    assert statements.count('INSERT') == (2 if storage == 'params' else 1)
+    assert statements.count('UPDATE') == 0
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(InstanceModel).count() == 1
+    param_names = sorted(x.name for x in sqlalchemy_session.query(ParamModel))
+    assert param_names == ([] if storage == 'document' else ['bool_field', 'integer_field'])
+
+    other_id = agent.save_or_update(AgentTestParam())
+    assert other_id != 'my-instance'
+    assert agent.load(other_id).integer_field == 1
+
+
+def test_save_or_update_dedup(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test saving or updating deduplicated instances stores each distinct value once and references it by hash.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, dedup=True)
+    agent.save_or_update(AgentTestParam(string_field='Shared'), 'instance-1')
+    agent.save_or_update(AgentTestParam(string_field='Shared'), 'instance-2')
+    agent.save_or_update(AgentTestParam(string_field='Changed'), 'instance-1')
+
+    assert agent.load('instance-1').string_field == 'Changed'
+    assert agent.load('instance-2').string_field == 'Shared'
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sqlalchemy_session.query(ParamModel).filter(ParamModel.blob_hash.is_(None)).count() == 0
+    blob_values = sorted(x for x, in sqlalchemy_session.query(BlobModel.value))
+    assert blob_values == sorted(set(blob_values))
+    assert json.dumps('Shared') in blob_values and json.dumps('Changed') in blob_values
+
+
+def test_save_or_update_switches_storage(sqlalchemy_engine):
+    """
+    Test saving or updating an instance saved with the other storage replaces its document or param rows.
+    """
+    params_agent = SqlAlchemyAgent(sqlalchemy_engine)
+    document_agent = SqlAlchemyAgent(sqlalchemy_engine, storage='document')
+
+    instance_id = document_agent.save(AgentTestParam(integer_field=2))
+    params_agent.save_or_update(AgentTestParam(integer_field=3), instance_id)
+    assert document_agent.load(instance_id).integer_field == 3
+
+    with params_agent.transaction() as tx:
+        tx.save_or_update(AgentTestParam(integer_field=4), instance_id)
+    document_agent.save_or_update(AgentTestParam(integer_field=5), instance_id)
+    assert params_agent.load(instance_id).integer_field == 5
+
+
+def test_upsert_without_on_conflict(sqlalchemy_engine, sqlalchemy_session_factory, mocker):
+    """
+    Test upserting rows with a dialect without "ON CONFLICT" updates existing rows and inserts the others.
+    """
+    sqlalchemy_session = sqlalchemy_session_factory()
+    mocker.patch.object(sqlalchemy_engine.dialect, 'name', 'mssql')
+
+    table = InstanceModel.__table__
+    upsert(sqlalchemy_session, table, [{'id': 'instance-1', 'class_path': 'a.A'}], ['id'])
+    upsert(sqlalchemy_session, table, [{'id': 'instance-1', 'class_path': 'b.B'},
+                                       {'id': 'instance-2', 'class_path': 'c.C'}], ['id'])
+    upsert(sqlalchemy_session, table, [{'id': 'instance-2'}, {'id': 'instance-3'}], ['id'])
+
+    rows = sorted(sqlalchemy_session.query(InstanceModel.id, InstanceModel.class_path))
+    assert [tuple(x) for x in rows] == [('instance-1', 'b.B'), ('instance-2', 'c.C'), ('instance-3', None)]
+
+
+@pytest.mark.parametrize('dialect_name', ['sqlite', 'mssql'])
+def test_insert_missing(sqlalchemy_engine, sqlalchemy_session_factory, mocker, dialect_name):
+    """
+    Test inserting rows that may already exist, e.g. inserted by another session, only inserts the missing ones.
+    """
+    sqlalchemy_session = sqlalchemy_session_factory()
+    mocker.patch.object(sqlalchemy_engine.dialect, 'name', dialect_name)
+
+    table = BlobModel.__table__
+    insert_missing(sqlalchemy_session, table, [{'hash': 'a' * 64, 'value': '1'}], ['hash'])
+    insert_missing(sqlalchemy_session, table, [{'hash': 'a' * 64, 'value': '2'}, {'hash': 'b' * 64, 'value': '3'}],
+                   ['hash'])
+    insert_missing(sqlalchemy_session, table, [], ['hash'])
+
+    rows = sorted(sqlalchemy_session.query(BlobModel.hash, BlobModel.value))
+    assert [tuple(x) for x in rows] == [('a' * 64, '1'), ('b' * 64, '3')]
+
+
+def test_delete_many(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test deleting many instances deletes their param rows in batches and returns the deleted row counts.
+    """
+    cache = InstanceCache()
+    agent = SqlAlchemyAgent(sqlalchemy_engine, cache=cache)
+    instance_ids = agent.save_many([AgentTestParam(integer_field=x) for x in range(5)])
+    agent.load(instance_ids[0])
+
+    statements = list()
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+    counts = agent.delete_many(instance_ids[:3] + ['not-a-valid-uuid'], batch_size=2)
+    event.remove(sqlalchemy_engine, 'before_cursor_execute', record_statement)
+
+    assert counts == {'instances': 3, 'params': 12}
+    assert statements == ['DELETE'] * 4
+    assert agent.load_many(instance_ids[:1])[instance_ids[0]] is None
+    assert agent.delete_many([]) == {'instances': 0, 'params': 0}
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert sorted(x.id for x in sqlalchemy_session.query(InstanceModel)) == sorted(instance_ids[3:])
+    assert sqlalchemy_session.query(ParamModel).count() == 8
+
+
+def test_purge(sqlalchemy_engine, sqlalchemy_session_factory):
+    """
+    Test purging instances by class path and by the time they were saved.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine)
+    old_id = agent.save(AgentTestParam())
+    agent.save(AgentTestParamMissing())
+    new_id = agent.save(AgentTestParam())
+    with sqlalchemy_engine.begin() as connection:
+        connection.execute(text(f"UPDATE instances SET saved_at = '2020-01-01 00:00:00.000000' WHERE id = '{old_id}'"))
+
+    with pytest.raises(ValueError):
+        agent.purge()
+
+    class_path = agent.get_class_path_from_param_instance(AgentTestParamMissing())
+    assert agent.purge(class_path=class_path) == {'instances': 1, 'params': 3}
+    assert agent.purge(class_path=class_path) == {'instances': 0, 'params': 0}
+    assert agent.purge(older_than=datetime.timedelta(days=1)) == {'instances': 1, 'params': 4}
+    assert agent.purge(older_than=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)) \
+           == {'instances': 0, 'params': 0}
+
+    sqlalchemy_session = sqlalchemy_session_factory()
+    assert [x.id for x in sqlalchemy_session.query(InstanceModel)] == [new_id]
+
+    # Naive datetimes are taken as UTC
+    with agent.transaction() as tx:
+        assert tx.purge(older_than=datetime.datetime(2000, 1, 1)) == {'instances': 0, 'params': 0}
+        assert tx.purge(older_than=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)) \
+               == {'instances': 1, 'params': 4}
+    assert agent.load_many([new_id])[new_id] is None
+
+
+@pytest.mark.parametrize('storage', ['params', 'document'])
+def test_purge_updated_instance(sqlalchemy_engine, storage):
+    """
+    Test that updating an instance with changes refreshes the time purge counts its age from.
+    """
+    agent = SqlAlchemyAgent(sqlalchemy_engine, storage=storage)
+    parameterized_class = AgentTestParam()
+    instance_id = agent.save(parameterized_class)
+    with sqlalchemy_engine.begin() as connection:
+        connection.execute(text("UPDATE instances SET saved_at = '2020-01-01 00:00:00.000000'"))
+
+    agent.update(parameterized_class, instance_id)
+    assert agent.purge(older_than=datetime.timedelta(days=1))['instances'] == 1
+
+    instance_id = agent.save(parameterized_class)
+    with sqlalchemy_engine.begin() as connection:
+        connection.execute(text("UPDATE instances SET saved_at = '2020-01-01 00:00:00.000000'"))
+
+    parameterized_class.integer_field = 42
+    agent.update(parameterized_class, instance_id)
+    assert agent.purge(older_than=datetime.timedelta(days=1))['instances'] == 0
+
+
+def test_delete_many_cascade():
+    """
+    Test deleting many instances relying on the "ON DELETE CASCADE" of the database to delete their param rows.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    event.listen(engine, 'connect', lambda connection, record: connection.execute('PRAGMA foreign_keys=ON'))
+    Base.metadata.create_all(engine)
+
+    agent = SqlAlchemyAgent(engine)
+    instance_ids = agent.save_many([AgentTestParam(), AgentTestParam()])
+    with agent.transaction() as tx:
+        assert tx.delete_many(instance_ids[:1], cascade=True) == {'instances': 1, 'params': None}
+    assert agent.purge(class_path='not.a.Class', cascade=True) == {'instances': 0, 'params': None}
+
+    with engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM params')).scalar() == 4
@@ -3,9 +3,15 @@ Tests for the SqlAlchemy agent.
 
 This file was created on August 06, 2020
 """
+import datetime
+import json
+from types import SimpleNamespace
+
+import param
+from param.serializer import JSONSerialization
 import pytest
 
-from param_persist.agents.base import AgentBase
+from param_persist.agents.base import AgentBase, is_default
 
 
 class BaseTestAgent(AgentBase):
@@ -14,7 +20,7 @@ class BaseTestAgent(AgentBase):
         """A dummy save function for testing the base class."""
         super().save(instance)
 
-    def load(self):
+    def load(self, *args):
         """A dummy load function for testing the base class."""
         super().load()
 
@@ -27,6 +33,20 @@ class BaseTestAgent(AgentBase):
         super().update(instance)
 
 
+class BaseTestParam(param.Parameterized):
+    """A param class for testing the base class."""
+    number_field = param.Number(0.5)
+    constant_field = param.Integer(1, constant=True)
+
+
+class BaseTestSerializationParam(param.Parameterized):
+    """A param class with params that need converting to be JSON compatible."""
+    list_field = param.List([1, 2, 3])
+    dict_field = param.Dict({'key': 'value'})
+    tuple_field = param.NumericTuple((1.0, 2.0))
+    date_field = param.Date(datetime.datetime(2020, 8, 6, 12, 30))
+
+
 def test_base_save():
     """Test the base save function raises a NotImplementedError."""
     base_test_agent = BaseTestAgent(None)
@@ -37,6 +57,18 @@ def test_base_save():
     assert 'The "save" function must be overridden in the agent child class.' in str(excinfo.value)
 
 
+def test_base_save_many():
+    """Test the base save_many function calls save for each instance."""
+    base_test_agent = BaseTestAgent(None)
+
+    assert base_test_agent.save_many([]) == []
+
+    with pytest.raises(NotImplementedError) as excinfo:
+        base_test_agent.save_many([None])
+
+    assert 'The "save" function must be overridden in the agent child class.' in str(excinfo.value)
+
+
 def test_base_load():
     """Test the base load function raises a NotImplementedError."""
     base_test_agent = BaseTestAgent(None)
@@ -47,6 +79,28 @@ def test_base_load():
     assert 'The "load" function must be overridden in the agent child class.' in str(excinfo.value)
 
 
+def test_base_load_many():
+    """Test the base load_many function calls load for each id."""
+    base_test_agent = BaseTestAgent(None)
+
+    assert base_test_agent.load_many([]) == {}
+
+    with pytest.raises(NotImplementedError) as excinfo:
+        base_test_agent.load_many(['an-id'])
+
+    assert 'The "load" function must be overridden in the agent child class.' in str(excinfo.value)
+
+
+def test_base_exists():
+    """Test the base exists function loads the instance."""
+    base_test_agent = BaseTestAgent(None)
+
+    with pytest.raises(NotImplementedError) as excinfo:
+        base_test_agent.exists('an-id')
+
+    assert 'The "load" function must be overridden in the agent child class.' in str(excinfo.value)
+
+
 def test_base_delete():
     """Test the base delete function raises a NotImplementedError."""
     base_test_agent = BaseTestAgent(None)
@@ -65,3 +119,125 @@ def test_base_update():
         base_test_agent.update(None)
 
     assert 'The "update" function must be overridden in the agent child class.' in str(excinfo.value)
+
+
+def test_base_register():
+    """Test registering a class caches its information under its class path."""
+    base_test_agent = BaseTestAgent(None)
+
+    assert base_test_agent.register(BaseTestParam) is BaseTestParam
+
+    class_path = f'{__name__}.BaseTestParam'
+    param_class_info = base_test_agent.get_param_class_info_from_path(class_path)
+
+    assert param_class_info.parameterized_class is BaseTestParam
+    assert param_class_info.param_names == ['constant_field', 'name', 'number_field']
+    assert param_class_info.param_types['number_field'] == 'param.Number'
+
+
+def test_base_get_param_class_info_from_path_imports_once(mocker):
+    """Test the class of a class path is imported once and then served from the cache."""
+    base_test_agent = BaseTestAgent(None)
+    import_module = mocker.patch('param_persist.agents.base.importlib.import_module',
+                                 return_value=SimpleNamespace(BaseTestParam=BaseTestParam))
+
+    class_path = 'a.module.that.moved.BaseTestParam'
+    first = base_test_agent.get_param_class_info_from_path(class_path)
+    second = base_test_agent.get_param_class_info_from_path(class_path)
+
+    assert first is second
+    import_module.assert_called_once_with('a.module.that.moved')
+
+
+def test_base_create_param_object():
+    """Test creating a param object sets constant params and ignores unknown params."""
+    base_test_agent = BaseTestAgent(None)
+    param_object = base_test_agent.create_param_object(
+        f'{__name__}.BaseTestParam', {'number_field': 1.5, 'constant_field': 3, 'garbage_field': True}
+    )
+
+    assert type(param_object) is BaseTestParam
+    assert param_object.number_field == 1.5
+    assert param_object.constant_field == 3
+
+
+def test_base_get_param_object_from_instance():
+    """Test getting a param object with default values from the class path of an instance model."""
+    base_test_agent = BaseTestAgent(None)
+    instance_model = SimpleNamespace(class_path=f'{__name__}.BaseTestParam')
+
+    param_object = base_test_agent.get_param_object_from_instance(instance_model)
+
+    assert type(param_object) is BaseTestParam
+    assert param_object.number_field == 0.5
+
+
+def test_base_get_type_from_param_instance():
+    """Test the type of a param matches the param type recorded by the class information."""
+    base_test_agent = BaseTestAgent(None)
+    param_types = base_test_agent.get_param_class_info(BaseTestParam).param_types
+
+    assert AgentBase.get_type_from_param_instance(BaseTestParam(), 'number_field') == param_types['number_field']
+    assert AgentBase.get_type_from_param_instance(BaseTestParam(), 'constant_field').endswith('.Integer')
+
+
+def test_base_get_param_names():
+    """Test getting the param names of a param object."""
+    assert AgentBase.get_param_names(BaseTestParam()) == ['constant_field', 'name', 'number_field']
+
+
+def test_base_get_serialized_param():
+    """Test the serialized params match the param JSON serialization without the JSON string round-trip."""
+    base_test_agent = BaseTestAgent(None)
+    instance = BaseTestSerializationParam()
+
+    serialized_param = base_test_agent.get_serialized_param(instance)
+
+    assert serialized_param == json.loads(JSONSerialization.serialize_parameters(instance))
+
+
+def test_base_update_param_object():
+    """Test updating a param object deserializes the values and ignores unknown params."""
+    base_test_agent = BaseTestAgent(None)
+    serialized_param = base_test_agent.get_serialized_param(
+        BaseTestSerializationParam(list_field=[4], date_field=datetime.datetime(2021, 1, 2))
+    )
+    serialized_param.pop('name')
+    serialized_param['garbage_field'] = True
+
+    param_object = base_test_agent.update_param_object(BaseTestSerializationParam(), serialized_param)
+
+    assert param_object.list_field == [4]
+    assert param_object.tuple_field == (1.0, 2.0)
+    assert param_object.date_field == datetime.datetime(2021, 1, 2)
+    assert not hasattr(param_object, 'garbage_field')
+
+
+def test_base_get_non_default_param_names():
+    """Test only the params whose value differs from the class default are reported."""
+    base_test_agent = BaseTestAgent(None)
+    param_class_info = base_test_agent.get_param_class_info(BaseTestSerializationParam)
+
+    instance = BaseTestSerializationParam(list_field=[1, 2, 3, 4])
+    assert param_class_info.get_non_default_param_names(instance) == ['list_field', 'name']
+    assert param_class_info.get_non_default_param_names(instance, ['dict_field', 'tuple_field']) == []
+
+    instance.tuple_field = (1.0, 3.0)
+    assert param_class_info.get_non_default_param_names(instance, ['dict_field', 'tuple_field']) == ['tuple_field']
+
+
+class Incomparable:
+    """A value whose comparison raises, like numpy arrays of more than one element."""
+    def __eq__(self, other):
+        """Refuse to compare."""
+        raise ValueError('The truth value is ambiguous.')
+
+
+def test_is_default():
+    """Test values are the default when identical or equal and of the same type, and not when they can't compare."""
+    default = Incomparable()
+
+    assert is_default(default, default)
+    assert is_default([1, 2], [1, 2])
+    assert not is_default(1, 1.0)
+    assert not is_default(Incomparable(), default)
@@ -0,0 +1,129 @@
+"""
+Tests for the binary codecs of the agents.
+
+This file was created on October 17, 2026
+"""
+import io
+
+import param
+import pytest
+
+from param_persist.agents.base import ParamClassInfo
+from param_persist.agents.codecs import (ArrayCodec, Codec, DataFrameCodec, decode, default_codecs, get_compressions,
+                                         ListCodec)
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('compression', [None, 'zlib'])
+def test_array_codec(compression):
+    """Test numpy arrays round-trip through the array codec, keeping their dtype, shape and memory order."""
+    codec = ArrayCodec(compression)
+
+    for array in (np.arange(12, dtype='<i4').reshape(3, 4), np.asfortranarray(np.ones((2, 3))),
+                  np.array([1.5, 2.5], dtype='>f8'), np.zeros((0, 2))):
+        decoded = decode(codec.encode(array))
+        assert decoded.dtype == array.dtype
+        np.testing.assert_array_equal(decoded, array)
+
+    assert codec.encode(np.array([{'a': 1}], dtype=object)) is None
+    assert codec.encode([1, 2]) is None
+
+
+def test_array_codec_zero_copy():
+    """Test uncompressed arrays are decoded without copying the loaded bytes."""
+    data = ArrayCodec().encode(np.arange(1000, dtype=np.float64))
+    decoded = decode(data)
+
+    assert not decoded.flags.writeable
+    assert np.shares_memory(decoded, np.frombuffer(data, dtype=np.uint8))
+
+
+def test_array_codec_version_2_header():
+    """Test .npy bytes with a version 2 header, written by numpy for very long headers, are decoded."""
+    array = np.arange(6, dtype=np.int16).reshape(2, 3)
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, array, version=(2, 0))
+
+    np.testing.assert_array_equal(decode(b'npy;\n' + buffer.getvalue()), array)
+
+
+def test_list_codec():
+    """Test long lists of only ints or only floats round-trip and other lists are left to JSON."""
+    codec = ListCodec('zlib', min_length=3)
+
+    assert decode(codec.encode([1, 2, 3])) == [1, 2, 3]
+    assert decode(codec.encode([1.5, 2.0, 3.25])) == [1.5, 2.0, 3.25]
+    assert type(decode(codec.encode([1, 2, 3]))[0]) is int
+
+    assert codec.encode([1, 2]) is None
+    assert codec.encode([1, 2.0, 3]) is None
+    assert codec.encode([True, False, True]) is None
+    assert codec.encode([2 ** 70, 1, 2]) is None
+    assert codec.encode('not a list') is None
+
+
+def test_dataframe_codec():
+    """Test DataFrames with numeric columns round-trip and other DataFrames are left to JSON."""
+    pd = pytest.importorskip('pandas')
+    codec = DataFrameCodec()
+
+    df = pd.DataFrame({'a': [1, 2, 3], 'b': [0.5, 1.5, 2.5], 'c': [True, False, True]})
+    pd.testing.assert_frame_equal(decode(codec.encode(df)), df)
+
+    assert codec.encode(pd.DataFrame({'a': ['x', 'y']})) is None
+    assert codec.encode(pd.DataFrame({1: [1, 2]})) is None
+    assert codec.encode([1, 2]) is None
+
+
+def test_codec_errors():
+    """Test unavailable compressions and unknown codecs raise RuntimeErrors."""
+    with pytest.raises(RuntimeError) as excinfo:
+        ArrayCodec('not-a-compression')
+
+    assert 'Compression "not-a-compression" is not available.' in str(excinfo.value)
+
+    with pytest.raises(RuntimeError) as excinfo:
+        decode(b'not-a-codec;\npayload')
+
+    assert 'Param value was encoded with unknown codec "not-a-codec".' in str(excinfo.value)
+
+    with pytest.raises(NotImplementedError):
+        Codec().encode_payload([1, 2])
+
+    with pytest.raises(NotImplementedError):
+        Codec.decode_payload(b'payload')
+
+
+def test_optional_compressions(mocker):
+    """Test the zstd and lz4 compressions are available when their packages are installed."""
+    mocker.patch('param_persist.agents.codecs.zstandard')
+    mocker.patch('param_persist.agents.codecs.lz4_frame')
+
+    assert sorted(get_compressions()) == ['lz4', 'zlib', 'zstd']
+
+
+class CodecTestParam(param.Parameterized):
+    """A param class with the params the default codecs encode."""
+    array_field = param.Array(None)
+    data_frame_field = param.DataFrame(None)
+    list_field = param.List([])
+
+
+def test_default_codecs():
+    """Test the default codecs are keyed by the param types the agents record."""
+    codecs = default_codecs('zlib', min_list_length=10)
+    param_types = ParamClassInfo(CodecTestParam).param_types
+
+    assert sorted(codecs) == sorted(param_types[x] for x in ('array_field', 'data_frame_field', 'list_field'))
+    assert isinstance(codecs[param_types['array_field']], ArrayCodec)
+    assert isinstance(codecs[param_types['data_frame_field']], DataFrameCodec)
+    assert codecs[param_types['list_field']].min_length == 10
+    assert all(x.compression == 'zlib' for x in codecs.values())
+
+
+def test_default_codecs_without_numpy(mocker):
+    """Test there are no default codecs when numpy is not installed."""
+    mocker.patch('param_persist.agents.codecs.numpy', None)
+
+    assert default_codecs() == dict()
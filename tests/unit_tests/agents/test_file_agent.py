@@ -0,0 +1,134 @@
+"""
+Tests for the File agent.
+
+This file was created on October 17, 2026
+"""
+import logging
+import os
+
+import param
+import pytest
+
+from param_persist.agents.file_agent import encode_record, FileAgent, iter_records, PUT_RECORD
+
+
+class FileAgentTestParam(param.Parameterized):
+    """A param class for testing the file agent."""
+    number_field = param.Number(0.5)
+    integer_field = param.Integer(1)
+    list_field = param.List([1, 2])
+
+
+@pytest.fixture()
+def file_agent(tmp_path):
+    """Create a file agent in a temporary directory."""
+    agent = FileAgent(str(tmp_path / 'store'))
+    yield agent
+    agent.close()
+
+
+def test_save_load_update_delete(file_agent, caplog):
+    """Test the file agent saves, loads, updates and deletes instances."""
+    instance = FileAgentTestParam(number_field=1.5, list_field=[3])
+    instance_id = file_agent.save(instance)
+    other_ids = file_agent.save_many([FileAgentTestParam(integer_field=x) for x in range(3)])
+
+    loaded = file_agent.load(instance_id)
+    assert isinstance(loaded, FileAgentTestParam)
+    assert (loaded.number_field, loaded.integer_field, loaded.list_field) == (1.5, 1, [3])
+    assert [file_agent.load(x).integer_field for x in other_ids] == [0, 1, 2]
+
+    instance.integer_field = 7
+    assert file_agent.update(instance, instance_id) == instance_id
+    assert file_agent.load(instance_id).integer_field == 7
+    with pytest.raises(RuntimeError):
+        file_agent.update(instance, 'not-a-valid-uuid')
+
+    assert file_agent.exists(instance_id)
+    file_agent.delete(instance_id)
+    assert not file_agent.exists(instance_id)
+    with caplog.at_level(logging.WARNING):
+        assert file_agent.load(instance_id) is None
+        file_agent.delete(instance_id)
+    assert len(caplog.records) == 2
+    assert file_agent.garbage_size > 0
+
+
+def test_reopen_rebuilds_index(tmp_path):
+    """Test a new agent on the same directory finds the latest values and truncates an incomplete record."""
+    path = str(tmp_path / 'store')
+    agent = FileAgent(path)
+    instance = FileAgentTestParam()
+    instance_id = agent.save(instance)
+    deleted_id = agent.save(instance)
+    instance.integer_field = 3
+    agent.update(instance, instance_id)
+    agent.delete(deleted_id)
+    agent.close()
+
+    segment_path = os.path.join(path, os.listdir(path)[0])
+    size = os.path.getsize(segment_path)
+    with open(segment_path, 'ab') as segment_file:
+        segment_file.write(b'\x01\x24\x00')
+
+    agent = FileAgent(path)
+    assert os.path.getsize(segment_path) == size
+    assert agent.load(instance_id).integer_field == 3
+    assert deleted_id not in agent.index
+    assert agent.save(instance) in agent.index
+    agent.close()
+
+
+@pytest.mark.parametrize('corruption', ['kind', 'crc'])
+def test_iter_records_stops_at_corrupt_record(corruption):
+    """Test reading a segment stops at a record with an unknown kind or a CRC mismatch."""
+    first_record = encode_record(PUT_RECORD, 'instance-1', b'{}')
+    corrupt_record = bytearray(encode_record(PUT_RECORD, 'instance-2', b'{"a": 1}'))
+    if corruption == 'kind':
+        corrupt_record[0] = 9
+    else:
+        corrupt_record[-1] ^= 0xFF
+    data = first_record + bytes(corrupt_record) + encode_record(PUT_RECORD, 'instance-3', b'{}')
+
+    assert [x[1] for x in iter_records(data)] == ['instance-1']
+
+
+def test_fsync(tmp_path, mocker):
+    """Test the file agent syncs the segment to disk after each append with "fsync"."""
+    fsync = mocker.spy(os, 'fsync')
+    events = list()
+    agent = FileAgent(str(tmp_path / 'store'), fsync=True)
+    agent.add_listener(events.append)
+
+    instance_id = agent.save(FileAgentTestParam(integer_field=4))
+    agent.close()
+
+    assert fsync.call_count == 1
+    assert events
+    agent = FileAgent(str(tmp_path / 'store'))
+    assert agent.load(instance_id).integer_field == 4
+    agent.close()
+
+
+def test_compact(tmp_path):
+    """Test compaction keeps the latest values, removes the old segments and starts new segments when full."""
+    path = str(tmp_path / 'store')
+    agent = FileAgent(path, segment_size=200)
+    instance_ids = agent.save_many([FileAgentTestParam(integer_field=x) for x in range(5)])
+    for x in range(5):
+        instance = FileAgentTestParam(integer_field=x + 10)
+        agent.update(instance, instance_ids[x])
+    agent.delete(instance_ids[0])
+    old_segment_numbers = agent.get_segment_numbers()
+    assert len(old_segment_numbers) > 1
+
+    assert agent.compact() > 0
+    assert agent.garbage_size == 0
+    assert not set(old_segment_numbers).intersection(agent.get_segment_numbers())
+    assert [agent.load(x).integer_field for x in instance_ids[1:]] == [11, 12, 13, 14]
+    agent.close()
+
+    agent = FileAgent(path)
+    assert sorted(agent.index) == sorted(instance_ids[1:])
+    assert agent.load(instance_ids[4]).integer_field == 14
+    agent.close()
@@ -0,0 +1,96 @@
+"""
+Tests for the instance cache of the agents.
+
+This file was created on October 17, 2026
+"""
+from param_persist.agents.cache import InstanceCache
+
+
+def test_cache_get_put():
+    """Test a cached instance is returned as a copy and counted as a hit."""
+    cache = InstanceCache()
+
+    assert cache.get('an-id') is None
+
+    cache.put('an-id', 'a.ClassPath', {'list_field': [1, 2]})
+    class_path, serialized_data = cache.get('an-id')
+    serialized_data['list_field'].append(3)
+
+    assert class_path == 'a.ClassPath'
+    assert cache.get('an-id')[1] == {'list_field': [1, 2]}
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 0)
+
+
+def test_cache_put_copies():
+    """Test changing the data given to the cache does not change the cached data."""
+    cache = InstanceCache()
+    serialized_data = {'list_field': [1, 2]}
+
+    cache.put('an-id', 'a.ClassPath', serialized_data)
+    serialized_data['list_field'].append(3)
+
+    assert cache.get('an-id')[1] == {'list_field': [1, 2]}
+
+
+def test_cache_max_entries():
+    """Test the least recently used instance is evicted when there are too many instances."""
+    cache = InstanceCache(max_entries=2)
+
+    cache.put('id-1', 'a.ClassPath', {})
+    cache.put('id-2', 'a.ClassPath', {})
+    cache.get('id-1')
+    cache.put('id-3', 'a.ClassPath', {})
+
+    assert len(cache) == 2
+    assert cache.get('id-2') is None
+    assert cache.get('id-1') is not None
+    assert cache.evictions == 1
+
+
+def test_cache_max_bytes():
+    """Test instances are evicted when the cache is too big and instances bigger than the cache are not kept."""
+    cache = InstanceCache(max_entries=None, max_bytes=100)
+
+    cache.put('id-1', 'a.ClassPath', {}, size=60)
+    cache.put('id-2', 'a.ClassPath', {}, size=60)
+
+    assert cache.get('id-1') is None
+    assert cache.size == 60
+    assert cache.evictions == 1
+
+    cache.put('id-2', 'a.ClassPath', {}, size=101)
+
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_cache_ttl(mocker):
+    """Test instances expire after the ttl."""
+    monotonic = mocker.patch('param_persist.agents.cache.time.monotonic', return_value=100.0)
+    cache = InstanceCache(ttl=10)
+
+    cache.put('an-id', 'a.ClassPath', {})
+    monotonic.return_value = 109.0
+    assert cache.get('an-id') is not None
+
+    monotonic.return_value = 110.0
+    assert cache.get('an-id') is None
+    assert len(cache) == 0
+
+
+def test_cache_invalidate_clear():
+    """Test removing instances from the cache."""
+    cache = InstanceCache()
+
+    cache.put('id-1', 'a.ClassPath', {}, size=10)
+    cache.put('id-2', 'a.ClassPath', {}, size=10)
+    cache.invalidate('id-1')
+    cache.invalidate('not-cached')
+
+    assert cache.get('id-1') is None
+    assert cache.size == 10
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.size == 0
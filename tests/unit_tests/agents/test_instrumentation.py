@@ -0,0 +1,62 @@
+"""
+Tests for the instrumentation of agent operations.
+
+This file was created on October 17, 2026
+"""
+import logging
+
+import pytest
+
+from param_persist.agents.instrumentation import current_operation, InstrumentationEvent, instrumented, \
+    LoggingListener
+
+
+class InstrumentedTestAgent:
+    """An object with the listeners of an agent, for testing the instrumented decorator."""
+
+    def __init__(self):
+        """Create the test agent without listeners."""
+        self.listeners = list()
+        self.operations = list()
+
+    def emit_event(self, event):
+        """Call the first listener."""
+        self.listeners[0](event)
+
+    @instrumented
+    def save(self, fail=False):
+        """Record the current operation."""
+        self.operations.append(current_operation.get())
+        if fail:
+            raise RuntimeError('Failed')
+        return 'saved'
+
+
+def test_instrumented_reports_operation():
+    """Test the instrumented decorator sets the current operation and reports the whole function."""
+    agent = InstrumentedTestAgent()
+    assert agent.save() == 'saved'
+    assert agent.operations == [None]
+
+    events = list()
+    agent.listeners.append(events.append)
+    assert agent.save() == 'saved'
+    with pytest.raises(RuntimeError):
+        agent.save(fail=True)
+
+    assert agent.operations == [None, 'save', 'save']
+    assert [(x.operation, x.phase) for x in events] == [('save', 'operation'), ('save', 'operation')]
+    assert current_operation.get() is None
+
+
+def test_logging_listener(caplog):
+    """Test the logging listener logs events at the given level."""
+    listener = LoggingListener()
+    event = InstrumentationEvent('load', 'db_read', 0.0015, 4, 120)
+
+    with caplog.at_level(logging.DEBUG, logger='param_persist'):
+        listener(event)
+
+    assert caplog.records[0].levelno == logging.DEBUG
+    assert caplog.records[0].getMessage() == 'load db_read took 1.500 ms. params="4" bytes="120"'
+    assert 'phase="db_read"' in repr(event)
@@ -0,0 +1,107 @@
+"""
+Tests for the lazy loading of params.
+
+This file was created on October 17, 2026
+"""
+import copy
+import pickle
+
+import param
+
+from param_persist.agents.lazy import get_lazy_param_names, get_persisted_class, load_lazy_params, make_lazy
+
+
+class LazyTestParam(param.Parameterized):
+    """A param class for testing the lazy loading."""
+    number_field = param.Number(0.5)
+    list_field = param.List([1, 2])
+    constant_field = param.Integer(1, constant=True)
+
+
+def test_make_lazy_loads_on_access():
+    """Test deferred params are loaded once, on first access, without triggering watchers."""
+    loaded = list()
+    events = list()
+
+    def loader(param_names):
+        loaded.append(param_names)
+        return {'list_field': [3, 4], 'constant_field': 5}
+
+    instance = LazyTestParam()
+    instance.param.watch(events.append, ['list_field', 'constant_field'])
+    make_lazy(instance, ['list_field', 'constant_field', 'garbage_field'], loader)
+
+    assert isinstance(instance, LazyTestParam)
+    assert type(instance).__name__ == 'LazyTestParam'
+    assert get_persisted_class(type(instance)) is LazyTestParam
+    assert get_lazy_param_names(instance) == {'list_field', 'constant_field'}
+    assert loaded == []
+
+    assert instance.number_field == 0.5
+    assert loaded == []
+
+    assert instance.list_field == [3, 4]
+    assert instance.list_field == [3, 4]
+    assert loaded == [['list_field']]
+    assert get_lazy_param_names(instance) == {'constant_field'}
+
+    assert instance.constant_field == 5
+    assert type(instance) is LazyTestParam
+    assert get_lazy_param_names(instance) == set()
+    assert events == []
+
+
+def test_make_lazy_assigned_before_access():
+    """Test deferred params that are assigned before they are accessed are never loaded."""
+    def loader(param_names):
+        raise AssertionError('Assigned params must not be loaded.')
+
+    instance = make_lazy(LazyTestParam(), ['list_field'], loader)
+    instance.list_field = [5]
+
+    assert type(instance) is LazyTestParam
+    assert instance.list_field == [5]
+
+
+def test_load_lazy_params():
+    """Test loading all the deferred params at once, e.g. to copy the instance."""
+    loaded = list()
+
+    def loader(param_names):
+        loaded.append(param_names)
+        return {'number_field': 1.5}
+
+    instance = make_lazy(LazyTestParam(), ['list_field', 'number_field'], loader)
+    copied_instance = copy.deepcopy(load_lazy_params(instance))
+
+    assert loaded == [['list_field', 'number_field']]
+    assert type(copied_instance) is LazyTestParam
+    assert copied_instance.number_field == 1.5
+    assert copied_instance.list_field == [1, 2]
+    assert make_lazy(instance, [], loader) is instance
+    assert type(instance) is LazyTestParam
+
+
+def test_load_selected_lazy_params():
+    """Test loading some deferred params, including dynamic params that param reads without accessing them."""
+    instance = make_lazy(LazyTestParam(), ['number_field', 'list_field'], lambda x: {'number_field': 1.5})
+
+    load_lazy_params(instance, ['number_field', 'garbage_field'])
+
+    assert instance.param.get_value_generator('number_field') == 1.5
+    assert get_lazy_param_names(instance) == {'list_field'}
+
+
+def test_pickle_lazy_instance():
+    """Test pickling an instance with deferred params loads them and pickles it as an instance of its class."""
+    instance = make_lazy(LazyTestParam(), ['list_field'], lambda param_names: {'list_field': [7]})
+    unpickled_instance = pickle.loads(pickle.dumps(instance))
+
+    assert type(instance) is LazyTestParam
+    assert type(unpickled_instance) is LazyTestParam
+    assert unpickled_instance.list_field == [7]
+
+    instance = make_lazy(LazyTestParam(), ['list_field'], lambda param_names: {'list_field': [8]})
+    assert instance.__reduce__()[0] is not None
+    assert type(instance) is LazyTestParam
+    assert instance.list_field == [8]
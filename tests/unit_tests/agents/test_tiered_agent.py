@@ -0,0 +1,250 @@
+"""
+Tests for the Tiered agent.
+
+This file was created on October 17, 2026
+"""
+import logging
+import time
+
+import param
+import pytest
+from sqlalchemy import create_engine
+
+from param_persist.agents.file_agent import FileAgent
+from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
+from param_persist.agents.tiered_agent import close_at_exit, TieredAgent
+from param_persist.sqlalchemy.migrations import upgrade
+
+
+class TieredAgentTestParam(param.Parameterized):
+    """A param class for testing the tiered agent."""
+    integer_field = param.Integer(1)
+    list_field = param.List([1, 2])
+
+
+@pytest.fixture()
+def file_agent(tmp_path):
+    """Create a file agent to back the tiered agent."""
+    agent = FileAgent(str(tmp_path / 'store'))
+    yield agent
+    agent.close()
+
+
+@pytest.fixture()
+def sqlalchemy_agent(tmp_path):
+    """Create a sqlalchemy agent with a SQLite database to back the tiered agent."""
+    engine = create_engine(f'sqlite:///{tmp_path / "tiered.db"}')
+    upgrade(engine)
+    yield SqlAlchemyAgent(engine)
+    engine.dispose()
+
+
+def test_writes_are_coalesced_and_flushed(file_agent, mocker, caplog):
+    """Test updates and deletes are buffered, coalesced and only written to the backing agent on flush."""
+    update = mocker.spy(file_agent, 'update')
+    delete = mocker.spy(file_agent, 'delete')
+
+    with TieredAgent(file_agent, flush_interval=None) as agent:
+        instance = TieredAgentTestParam()
+        instance_id, deleted_id = agent.save_many([instance, TieredAgentTestParam()])
+
+        for x in range(5):
+            instance.integer_field = x
+            instance.list_field.append(x)
+            agent.update(instance, instance_id)
+        agent.delete(deleted_id)
+
+        loaded = agent.load(instance_id)
+        assert (loaded.integer_field, loaded.list_field) == (4, [1, 2, 0, 1, 2, 3, 4])
+        loaded.list_field.append(5)
+        assert agent.load(instance_id).list_field == [1, 2, 0, 1, 2, 3, 4]
+        with caplog.at_level(logging.WARNING):
+            assert agent.load(deleted_id) is None
+        with pytest.raises(RuntimeError):
+            agent.update(instance, deleted_id)
+        with pytest.raises(RuntimeError):
+            agent.update(instance, 'not-a-valid-uuid')
+
+        assert update.call_count == 0
+        assert file_agent.load(instance_id).integer_field == 1
+
+        assert agent.flush() == 2
+        assert agent.flush() == 0
+        assert update.call_count == 1
+        assert delete.call_count == 1
+        assert file_agent.load(instance_id).integer_field == 4
+        assert agent.load(instance_id).integer_field == 4
+
+        instance.integer_field = 9
+        agent.update(instance, instance_id)
+
+    assert agent.closed
+    assert file_agent.load(instance_id).integer_field == 9
+    with pytest.raises(RuntimeError):
+        agent.update(instance, instance_id)
+
+
+def test_load_from_backing_agent(file_agent):
+    """Test loads that miss the memory tier are loaded from the backing agent and kept in the memory tier."""
+    instance_id = file_agent.save(TieredAgentTestParam(integer_field=3))
+
+    with TieredAgent(file_agent, flush_interval=None) as agent:
+        assert agent.load(instance_id).integer_field == 3
+        assert agent.cache.misses == 1
+        assert agent.load(instance_id).integer_field == 3
+        assert agent.cache.hits == 1
+
+
+def test_background_flush(file_agent):
+    """Test the background thread flushes when too many writes are pending."""
+    instance_id = file_agent.save(TieredAgentTestParam())
+
+    with TieredAgent(file_agent, max_pending=1, flush_interval=60) as agent:
+        agent.update(TieredAgentTestParam(integer_field=2), instance_id)
+        deadline = time.monotonic() + 5
+        while agent.pending or agent.flushing:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert file_agent.load(instance_id).integer_field == 2
+
+
+def test_failed_flush_keeps_writes(file_agent, mocker):
+    """Test the writes of a failed flush stay pending, without overwriting newer writes."""
+    instance_id = file_agent.save(TieredAgentTestParam())
+    agent = TieredAgent(file_agent, flush_interval=None)
+    agent.update(TieredAgentTestParam(integer_field=2), instance_id)
+
+    mocker.patch.object(file_agent, 'update', side_effect=RuntimeError('Failed'))
+    with pytest.raises(RuntimeError):
+        agent.flush()
+    assert agent.load(instance_id).integer_field == 2
+
+    mocker.stopall()
+    agent.close()
+    assert file_agent.load(instance_id).integer_field == 2
+
+
+def test_failed_flush_writes_each_id(file_agent, mocker, caplog):
+    """Test one failing write does not hold back the others, and writes to deleted instances are dropped."""
+    instance_ids = [file_agent.save(TieredAgentTestParam()) for _ in range(4)]
+    agent = TieredAgent(file_agent, flush_interval=None)
+    for instance_id in instance_ids[:3]:
+        agent.update(TieredAgentTestParam(integer_field=2), instance_id)
+    agent.delete(instance_ids[3])
+    file_agent.delete(instance_ids[0])
+
+    update = file_agent.update
+    exists = file_agent.exists
+
+    def failing_update(instance, instance_id, **kwargs):
+        if instance_id == instance_ids[1]:
+            raise OSError('Failed')
+        return update(instance, instance_id, **kwargs)
+
+    def failing_exists(instance_id, **kwargs):
+        if instance_id == instance_ids[1]:
+            raise OSError('Failed')
+        return exists(instance_id, **kwargs)
+
+    mocker.patch.object(file_agent, 'update', side_effect=failing_update)
+    mocker.patch.object(file_agent, 'exists', side_effect=failing_exists)
+    mocker.patch.object(file_agent, 'delete', side_effect=OSError('Failed'))
+    with caplog.at_level(logging.ERROR, logger='param_persist'):
+        with pytest.raises(OSError):
+            agent.flush()
+    assert f'dropping pending write that can not be written. id="{instance_ids[0]}"' in caplog.text
+    assert sorted(agent.pending) == sorted([instance_ids[1], instance_ids[3]])
+    assert file_agent.load(instance_ids[2]).integer_field == 2
+
+    mocker.stopall()
+    agent.close()
+    assert agent.pending == dict()
+    assert file_agent.load(instance_ids[1]).integer_field == 2
+    assert file_agent.load(instance_ids[3]) is None
+
+
+def test_flush_drops_undeserializable_writes(file_agent, caplog):
+    """Test pending writes that can not be deserialized are dropped instead of failing every flush."""
+    instance_id = file_agent.save(TieredAgentTestParam())
+    agent = TieredAgent(file_agent, flush_interval=None)
+    agent.pending[instance_id] = ('tests.unit_tests.agents.test_tiered_agent.MissingParam', dict())
+
+    with caplog.at_level(logging.ERROR, logger='param_persist'):
+        assert agent.flush() == 0
+    assert 'dropping pending write' in caplog.text
+    agent.close()
+
+
+def test_close_at_exit_logs_failed_flush(file_agent, mocker, caplog):
+    """Test closing the agent at exit logs the writes that could not be flushed instead of raising."""
+    instance_id = file_agent.save(TieredAgentTestParam())
+    agent = TieredAgent(file_agent, flush_interval=None)
+    agent.update(TieredAgentTestParam(integer_field=2), instance_id)
+
+    mocker.patch.object(file_agent, 'update', side_effect=OSError('Failed'))
+    with caplog.at_level(logging.ERROR, logger='param_persist'):
+        close_at_exit(lambda: agent)
+    assert 'unable to flush pending writes at exit, 1 writes are lost' in caplog.text
+    close_at_exit(lambda: None)
+
+
+def test_sqlalchemy_backing_agent(sqlalchemy_agent, mocker):
+    """Test writes are flushed in a transaction of a sqlalchemy agent, with cheap existence checks on update."""
+    load_many = mocker.spy(sqlalchemy_agent, 'load_many')
+    instance_id = sqlalchemy_agent.save(TieredAgentTestParam())
+    deleted_id = sqlalchemy_agent.save(TieredAgentTestParam())
+    agent = TieredAgent(sqlalchemy_agent, flush_interval=None)
+
+    saved_id = agent.save(TieredAgentTestParam(integer_field=5))
+    assert agent.load(saved_id).integer_field == 5
+    assert agent.exists(saved_id)
+
+    agent.update(TieredAgentTestParam(integer_field=2, list_field=[3]), instance_id)
+    agent.update(TieredAgentTestParam(integer_field=6), saved_id)
+    agent.delete(deleted_id)
+    assert not agent.exists(deleted_id)
+    load_many.assert_not_called()
+
+    transaction = mocker.spy(sqlalchemy_agent, 'transaction')
+    assert agent.flush() == 3
+    transaction.assert_called_once_with()
+
+    loaded_instance = sqlalchemy_agent.load(instance_id)
+    assert (loaded_instance.integer_field, loaded_instance.list_field) == (2, [3])
+    assert sqlalchemy_agent.load(saved_id).integer_field == 6
+    assert not sqlalchemy_agent.exists(deleted_id)
+
+    agent.close()
+    agent.close()
+
+
+def test_sqlalchemy_backing_agent_failed_batch(sqlalchemy_agent, caplog):
+    """Test a write to an instance deleted behind the tiered agent rolls back the batch and only it is dropped."""
+    instance_ids = sqlalchemy_agent.save_many([TieredAgentTestParam(), TieredAgentTestParam()])
+    agent = TieredAgent(sqlalchemy_agent, flush_interval=None)
+    for instance_id in instance_ids:
+        agent.update(TieredAgentTestParam(integer_field=2), instance_id)
+    sqlalchemy_agent.delete(instance_ids[0])
+
+    with caplog.at_level(logging.ERROR, logger='param_persist'):
+        assert agent.flush() == 1
+    assert f'dropping pending write that can not be written. id="{instance_ids[0]}"' in caplog.text
+    assert sqlalchemy_agent.load(instance_ids[1]).integer_field == 2
+    assert agent.pending == dict()
+    agent.close()
+
+
+def test_background_flush_failure_is_logged(file_agent, mocker, caplog):
+    """Test the background thread logs failed flushes and keeps running."""
+    agent = TieredAgent(file_agent, flush_interval=0.01)
+    flush = mocker.patch.object(agent, 'flush', side_effect=OSError('Failed'))
+
+    with caplog.at_level(logging.ERROR, logger='param_persist'):
+        deadline = time.monotonic() + 5
+        while flush.call_count < 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        mocker.stopall()
+        agent.close()
+
+    assert 'unable to flush pending writes to the backing agent' in caplog.text
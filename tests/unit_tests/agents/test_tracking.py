@@ -0,0 +1,76 @@
+"""
+Tests for the change tracking of the agents.
+
+This file was created on October 17, 2026
+"""
+import param
+
+from param_persist.agents.tracking import ChangeTracker
+
+
+class TrackingTestParam(param.Parameterized):
+    """A param class for testing the change tracker."""
+    number_field = param.Number(0.5)
+    list_field = param.List([1, 2])
+
+
+def test_track_assignments():
+    """Test assigned params are dirty for the tracked id only."""
+    tracker = ChangeTracker()
+    instance = TrackingTestParam()
+
+    assert tracker.get_dirty_param_names(instance, 'an-id') is None
+
+    tracker.track(instance, 'an-id')
+    assert tracker.get_dirty_param_names(instance, 'an-id') == set()
+
+    instance.number_field = 0.5
+    assert tracker.get_dirty_param_names(instance, 'an-id') == set()
+
+    instance.number_field = 1.5
+    assert tracker.get_dirty_param_names(instance, 'an-id') == {'number_field'}
+    assert tracker.get_dirty_param_names(instance, 'another-id') is None
+
+
+def test_mark_dirty_clean():
+    """Test marking params changed in place as dirty and written params as clean."""
+    tracker = ChangeTracker()
+    instance = TrackingTestParam()
+    tracker.track(instance, 'an-id')
+
+    instance.list_field.append(3)
+    assert tracker.get_dirty_param_names(instance, 'an-id') == set()
+
+    tracker.mark_dirty(instance, 'list_field')
+    instance.number_field = 1.5
+    tracker.mark_clean(instance, {'number_field'})
+
+    assert tracker.get_dirty_param_names(instance, 'an-id') == {'list_field'}
+
+
+def test_track_again_resets():
+    """Test tracking an instance again changes its id and clears its dirty params."""
+    tracker = ChangeTracker()
+    instance = TrackingTestParam()
+    tracker.track(instance, 'an-id')
+    instance.number_field = 1.5
+
+    tracker.track(instance, 'another-id')
+
+    assert tracker.get_dirty_param_names(instance, 'another-id') == set()
+    assert tracker.get_dirty_param_names(instance, 'an-id') is None
+
+
+def test_untrack():
+    """Test an untracked instance has no dirty params for any id until it is tracked again."""
+    tracker = ChangeTracker()
+    instance = TrackingTestParam()
+    tracker.track(instance, 'an-id')
+    instance.number_field = 1.5
+
+    tracker.untrack(instance)
+    tracker.untrack(TrackingTestParam())
+
+    assert tracker.get_dirty_param_names(instance, 'an-id') is None
+    tracker.track(instance, 'an-id')
+    assert tracker.get_dirty_param_names(instance, 'an-id') == set()
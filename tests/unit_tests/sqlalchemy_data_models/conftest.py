@@ -9,7 +9,7 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 
-from param_persist.sqlalchemy.models import Base, InstanceModel, ParamModel
+from param_persist.sqlalchemy.models import Base, InstanceModel, ParamModel, ParamTypeModel
 
 
 @pytest.fixture(scope='session')
@@ -57,22 +57,30 @@ def db(engine, session):
     session.add(instance_2)
     session.add(instance_3)
 
+    # Param types
+    param_types = dict()
+    for name in ('string', 'int', 'float'):
+        param_type = ParamTypeModel(name=name)
+        session.add(param_type)
+        session.flush()
+        param_types[name] = param_type.id
+
     # Params for Instance 1
-    param_1 = ParamModel(id=str(uuid.uuid4()), value='{"name": "param1_1", "type": "string", "value": "string_value1"}',
+    param_1 = ParamModel(name='param1_1', type_id=param_types['string'], value='"string_value1"',
                          instance_id=instance_1.id)
 
     # Params for Instance 2
-    param_2 = ParamModel(id=str(uuid.uuid4()), value='{"name": "param2_1", "type": "string", "value": "string_value1"}',
+    param_2 = ParamModel(name='param2_1', type_id=param_types['string'], value='"string_value1"',
                          instance_id=instance_2.id)
-    param_3 = ParamModel(id=str(uuid.uuid4()), value='{"name": "param2_2", "type": "string", "value": "1234"}',
+    param_3 = ParamModel(name='param2_2', type_id=param_types['string'], value='"1234"',
                          instance_id=instance_2.id)
 
     # Params for Instance 2
-    param_4 = ParamModel(id=str(uuid.uuid4()), value='{"name": "param3_1", "type": "int", "value": 12}',
+    param_4 = ParamModel(name='param3_1', type_id=param_types['int'], value='12',
                          instance_id=instance_3.id)
-    param_5 = ParamModel(id=str(uuid.uuid4()), value='{"name": "param3_2", "type": "string", "value": "1234"}',
+    param_5 = ParamModel(name='param3_2', type_id=param_types['string'], value='"1234"',
                          instance_id=instance_3.id)
-    param_6 = ParamModel(id=str(uuid.uuid4()), value='{"name": "param3_3", "type": "float", "value": 123.321}',
+    param_6 = ParamModel(name='param3_3', type_id=param_types['float'], value='123.321',
                          instance_id=instance_3.id)
 
     session.add(param_1)
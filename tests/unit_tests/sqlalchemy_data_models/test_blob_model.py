@@ -0,0 +1,32 @@
+"""
+Tests for the blob model in the sqlalchemy data model.
+
+This file was generated on October 17, 2026
+"""
+from param_persist.sqlalchemy.models import BlobModel, InstanceModel, ParamModel
+
+
+def test_blob_repr(db, session):
+    """
+    Test the blob __repr__ function.
+    """
+    blob = BlobModel(hash='a' * 64, value='"string_value"')
+
+    assert blob.__repr__() == f'<Blob(hash="{"a" * 64}")>'
+
+
+def test_blob_relationship(db, session):
+    """
+    Test the param rows reference their deduplicated value by hash.
+    """
+    blob = BlobModel(hash='b' * 64, value='"string_value"')
+    instance = session.query(InstanceModel).first()
+    param = ParamModel(name='blob_param', blob_hash=blob.hash, instance_id=instance.id)
+    session.add_all([blob, param])
+    session.flush()
+
+    assert session.query(ParamModel).filter_by(name='blob_param').one().blob.value == '"string_value"'
+
+    session.delete(param)
+    session.delete(blob)
+    session.flush()
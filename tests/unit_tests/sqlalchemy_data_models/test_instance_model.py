@@ -36,3 +36,18 @@ def test_instance_repr(db, session):
     expected = f'<Instance(id="{instance.id}", class_path="{instance.class_path}")>'
 
     assert instance_repr == expected
+
+
+def test_instance_default_id(db, session):
+    """
+    Test every new instance gets its own id by default.
+    """
+    instances = [InstanceModel(class_path='paramclass.param.ParamClass1') for _ in range(2)]
+    session.add_all(instances)
+    session.flush()
+
+    assert instances[0].id != instances[1].id
+
+    for instance in instances:
+        session.delete(instance)
+    session.flush()
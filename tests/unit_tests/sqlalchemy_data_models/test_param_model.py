@@ -13,6 +13,6 @@ def test_param_repr(db, session):
     param = session.query(ParamModel).first()
     param_repr = param.__repr__()
 
-    expected = f'<Param(id="{param.id}", instance_id="{param.instance_id}")>'
+    expected = f'<Param(instance_id="{param.instance_id}", name="{param.name}")>'
 
     assert param_repr == expected
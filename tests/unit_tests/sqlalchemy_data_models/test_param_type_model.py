@@ -0,0 +1,28 @@
+"""
+Tests for the param type model in the sqlalchemy data model.
+
+This file was generated on October 17, 2026
+"""
+from param_persist.sqlalchemy.models import ParamModel, ParamTypeModel
+
+
+def test_param_type_repr(db, session):
+    """
+    Test the param type __repr__ function.
+    """
+    param_type = session.query(ParamTypeModel).first()
+    param_type_repr = param_type.__repr__()
+
+    expected = f'<ParamType(id="{param_type.id}", name="{param_type.name}")>'
+
+    assert param_type_repr == expected
+
+
+def test_param_type_relationship(db, session):
+    """
+    Test the param types are shared between the param rows.
+    """
+    param_types = [x.param_type.name for x in session.query(ParamModel).filter_by(name='param2_2')]
+
+    assert param_types == ['string']
+    assert session.query(ParamTypeModel).count() == 3
@@ -0,0 +1,22 @@
+"""
+Tests for the schema version model in the sqlalchemy data model.
+
+This file was generated on October 17, 2026
+"""
+from param_persist.sqlalchemy.models import SCHEMA_VERSION, SchemaVersionModel
+
+
+def test_schema_version_not_stamped(db, session):
+    """
+    Test creating the tables does not stamp a schema version, since the database may have an older schema.
+    """
+    assert session.query(SchemaVersionModel).count() == 0
+
+
+def test_schema_version_repr():
+    """
+    Test the schema version __repr__ function.
+    """
+    schema_version = SchemaVersionModel(version=SCHEMA_VERSION)
+
+    assert schema_version.__repr__() == f'<SchemaVersion(version="{SCHEMA_VERSION}")>'
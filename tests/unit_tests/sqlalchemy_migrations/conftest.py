@@ -0,0 +1,43 @@
+"""
+PyTest configuration for the sqlalchemy migrations tests.
+
+This file was generated on October 17, 2026
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+VERSION_1_SCHEMA = [
+    'CREATE TABLE instances (id CHAR(36) NOT NULL, class_path VARCHAR, PRIMARY KEY (id), UNIQUE (id))',
+    'CREATE TABLE params (id CHAR(36) NOT NULL, instance_id VARCHAR, value VARCHAR, PRIMARY KEY (id), UNIQUE (id), '
+    'FOREIGN KEY(instance_id) REFERENCES instances (id))',
+]
+
+
+@pytest.fixture()
+def empty_engine():
+    """
+    Create an engine for an empty database.
+    """
+    engine = create_engine('sqlite:///:memory:', echo=False)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def version_1_engine(empty_engine):
+    """
+    Create an engine for a database created before the schema was versioned.
+    """
+    with empty_engine.begin() as connection:
+        for statement in VERSION_1_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO instances (id, class_path) VALUES ('instance-1', "
+            "'tests.unit_tests.agents.sqlalchemy_agent.test_sqlalchemy_agent.AgentTestParam')"
+        ))
+        connection.execute(text(
+            "INSERT INTO params (id, instance_id, value) VALUES ('param-1', 'instance-1', "
+            "'{\"name\": \"integer_field\", \"type\": \"param.Integer\", \"value\": 9}')"
+        ))
+
+    return empty_engine
@@ -0,0 +1,270 @@
+"""
+Tests for the schema versioning and upgrades of the sqlalchemy data model.
+
+This file was generated on October 17, 2026
+"""
+import datetime
+import logging
+
+import pytest
+from sqlalchemy import inspect, text
+
+from param_persist.agents.sqlalchemy_agent import SqlAlchemyAgent
+from param_persist.sqlalchemy.migrations import get_alter_column_type_statement, get_schema_version, \
+    get_stamped_schema_version, upgrade, upgrade_to_version_2
+from param_persist.sqlalchemy.models import Base, SCHEMA_VERSION
+
+
+def test_get_schema_version_empty_database(empty_engine):
+    """
+    Test the schema version of a database without tables.
+    """
+    assert get_schema_version(empty_engine) is None
+
+
+def test_get_schema_version_created_database(empty_engine):
+    """
+    Test that a database created from the models is reported at the current schema version without being stamped.
+    """
+    Base.metadata.create_all(empty_engine)
+
+    assert get_stamped_schema_version(empty_engine) is None
+    assert get_schema_version(empty_engine) == SCHEMA_VERSION
+
+
+def test_get_schema_version_unversioned_database(version_1_engine):
+    """
+    Test the schema version of a database created before the schema was versioned.
+    """
+    assert get_schema_version(version_1_engine) == 1
+
+
+def test_upgrade_empty_database(empty_engine):
+    """
+    Test upgrading a database without tables creates them.
+    """
+    assert upgrade(empty_engine) == SCHEMA_VERSION
+    assert get_stamped_schema_version(empty_engine) == SCHEMA_VERSION
+    assert {'instances', 'params'} <= set(inspect(empty_engine).get_table_names())
+
+
+def test_upgrade_current_database(empty_engine):
+    """
+    Test upgrading a database that is already at the current version does nothing.
+    """
+    Base.metadata.create_all(empty_engine)
+
+    assert upgrade(empty_engine) == SCHEMA_VERSION
+    assert get_stamped_schema_version(empty_engine) == SCHEMA_VERSION
+
+
+def test_upgrade_version_1_database(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned.
+    """
+    assert upgrade(version_1_engine) == SCHEMA_VERSION
+    assert get_schema_version(version_1_engine) == SCHEMA_VERSION
+
+    primary_key = inspect(version_1_engine).get_pk_constraint('params')
+    assert primary_key['constrained_columns'] == ['instance_id', 'name']
+
+    agent = SqlAlchemyAgent(version_1_engine)
+    assert agent.load('instance-1').integer_field == 9
+
+
+def test_upgrade_version_1_database_duplicated_params(version_1_engine, caplog):
+    """
+    Test upgrading a database with params duplicated by name keeps one of them and logs how many rows were dropped.
+    """
+    with version_1_engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO params (id, instance_id, value) VALUES ('param-2', 'instance-1', "
+            "'{\"name\": \"integer_field\", \"type\": \"param.Integer\", \"value\": 10}')"
+        ))
+
+    with caplog.at_level(logging.WARNING, logger='param_persist'):
+        upgrade(version_1_engine)
+
+    assert 'dropped duplicated or incomplete param rows keyed by instance id and name. count="1"' in caplog.text
+    with version_1_engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM params')).scalar() == 1
+
+
+def test_upgrade_version_1_database_after_create_all(version_1_engine):
+    """
+    Test creating the tables in a database created before the schema was versioned does not stamp it, so it is upgraded.
+    """
+    Base.metadata.create_all(version_1_engine)
+    assert get_schema_version(version_1_engine) == 1
+
+    assert upgrade(version_1_engine) == SCHEMA_VERSION
+    assert get_stamped_schema_version(version_1_engine) == SCHEMA_VERSION
+
+    agent = SqlAlchemyAgent(version_1_engine)
+    instance = agent.load('instance-1')
+    assert instance.integer_field == 9
+    assert agent.load(agent.save(instance)).integer_field == 9
+
+
+def test_upgrade_version_1_database_splits_params(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned splits the param documents into columns.
+    """
+    upgrade(version_1_engine)
+
+    with version_1_engine.connect() as connection:
+        rows = connection.execute(text(
+            'SELECT params.name, param_types.name, params.value FROM params '
+            'JOIN param_types ON params.type_id = param_types.id'
+        )).fetchall()
+
+    assert [tuple(x) for x in rows] == [('integer_field', 'param.Integer', '9')]
+
+
+def test_upgrade_version_1_database_adds_document(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned adds the instances.document column.
+    """
+    upgrade(version_1_engine)
+
+    columns = [x['name'] for x in inspect(version_1_engine).get_columns('instances')]
+    assert 'document' in columns
+
+    agent = SqlAlchemyAgent(version_1_engine, storage='document', compress=True)
+    instance_id = agent.save(agent.load('instance-1'))
+    assert agent.load(instance_id).integer_field == 9
+
+
+def test_upgrade_version_1_database_adds_param_data(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned adds the params.data column.
+    """
+    upgrade(version_1_engine)
+
+    columns = [x['name'] for x in inspect(version_1_engine).get_columns('params')]
+    assert 'data' in columns
+
+    agent = SqlAlchemyAgent(version_1_engine)
+    assert agent.load('instance-1').integer_field == 9
+
+
+def test_upgrade_version_1_database_adds_blobs(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned adds the blobs table and params.blob_hash column.
+    """
+    upgrade(version_1_engine)
+
+    columns = [x['name'] for x in inspect(version_1_engine).get_columns('params')]
+    assert 'blob_hash' in columns
+
+    agent = SqlAlchemyAgent(version_1_engine, dedup=True)
+    instance_id = agent.save(agent.load('instance-1'))
+    assert agent.load(instance_id).integer_field == 9
+
+
+def test_upgrade_version_1_database_indexes_class_path(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned indexes instances.class_path.
+    """
+    upgrade(version_1_engine)
+
+    indexes = [x['column_names'] for x in inspect(version_1_engine).get_indexes('instances')]
+    assert ['class_path'] in indexes
+
+
+def test_upgrade_version_1_database_keys_params_by_name(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned keys params by instance and name.
+    """
+    with version_1_engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO params (id, instance_id, value) VALUES ('param-2', 'instance-1', "
+            "'{\"name\": \"integer_field\", \"type\": \"param.Integer\", \"value\": 10}')"
+        ))
+
+    upgrade(version_1_engine)
+
+    columns = [x['name'] for x in inspect(version_1_engine).get_columns('params')]
+    assert 'id' not in columns
+    with version_1_engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM params')).scalar() == 1
+
+    agent = SqlAlchemyAgent(version_1_engine)
+    instance = agent.load('instance-1')
+    assert instance.integer_field == 9
+    instance.integer_field = 11
+    agent.update(instance, 'instance-1')
+    assert agent.load('instance-1').integer_field == 11
+
+
+def test_upgrade_version_1_database_adds_saved_at(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned adds instances.saved_at, set to the upgrade time.
+    """
+    upgrade(version_1_engine)
+
+    columns = [x['name'] for x in inspect(version_1_engine).get_columns('instances')]
+    assert 'saved_at' in columns
+    indexes = [x['column_names'] for x in inspect(version_1_engine).get_indexes('instances')]
+    assert ['saved_at'] in indexes
+
+    agent = SqlAlchemyAgent(version_1_engine)
+    assert agent.purge(older_than=datetime.timedelta(days=1)) == {'instances': 0, 'params': 0}
+    assert agent.purge(older_than=datetime.timedelta(days=-1)) == {'instances': 1, 'params': 1}
+
+
+def test_upgrade_version_1_database_cascades_param_deletes(version_1_engine):
+    """
+    Test upgrading a database created before the schema was versioned deletes params with their instance.
+    """
+    upgrade(version_1_engine)
+
+    with version_1_engine.begin() as connection:
+        connection.execute(text('PRAGMA foreign_keys=ON'))
+    agent = SqlAlchemyAgent(version_1_engine)
+    assert agent.delete_many(['instance-1'], cascade=True) == {'instances': 1, 'params': None}
+
+    with version_1_engine.connect() as connection:
+        assert connection.execute(text('SELECT COUNT(*) FROM params')).scalar() == 0
+
+
+def test_upgrade_newer_database(empty_engine):
+    """
+    Test upgrading a database with a newer schema version than supported raises.
+    """
+    upgrade(empty_engine)
+    with empty_engine.begin() as connection:
+        connection.execute(text(f'UPDATE schema_version SET version = {SCHEMA_VERSION + 1}'))
+
+    with pytest.raises(RuntimeError) as excinfo:
+        upgrade(empty_engine)
+
+    assert f'Database schema version "{SCHEMA_VERSION + 1}" is newer than the supported schema version' \
+           in str(excinfo.value)
+
+
+@pytest.mark.parametrize('dialect_name, expected', [
+    ('sqlite', None),
+    ('mysql', 'ALTER TABLE params MODIFY instance_id CHAR(36)'),
+    ('mariadb', 'ALTER TABLE params MODIFY instance_id CHAR(36)'),
+    ('postgresql', 'ALTER TABLE params ALTER COLUMN instance_id TYPE CHAR(36)'),
+])
+def test_get_alter_column_type_statement(dialect_name, expected):
+    """
+    Test the statement used to change the type of a column for each dialect.
+    """
+    assert get_alter_column_type_statement(dialect_name, 'params', 'instance_id', 'CHAR(36)') == expected
+
+
+def test_upgrade_to_version_2_alters_column_type(mocker):
+    """
+    Test upgrading to version 2 changes the type of params.instance_id on dialects that need it.
+    """
+    connection = mocker.MagicMock()
+    connection.dialect.name = 'postgresql'
+
+    upgrade_to_version_2(connection)
+
+    statements = [str(x.args[0]) for x in connection.execute.call_args_list]
+    assert statements == ['ALTER TABLE params ALTER COLUMN instance_id TYPE CHAR(36)',
+                          'CREATE INDEX ix_params_instance_id ON params (instance_id)']